@@ -0,0 +1,222 @@
+import email.policy
+import json
+import re
+import threading
+import time
+from collections import deque
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+
+class MockChatCompletions(ThreadingHTTPServer):
+    # Local stand-in for the OpenAI chat completions endpoint. Answers structured-output requests
+    # with an object that fills every property of the requested schema, after `latency` seconds,
+    # and when streaming sends one chunk per property `chunk_delay` seconds apart.
+    # Point the client at base_url, e.g. configure_client(api_key='mock', base_url=server.base_url).
+    # fail_next() queues error answers, to exercise retries.
+    # Also stands in for the Batch API (file upload and download, batch create, retrieve and cancel):
+    # a batch completes `batch_delay` seconds after it was created, and the first
+    # `batch_failed_requests` requests of each batch go to its error file.
+    daemon_threads = True
+
+    def __init__(self, latency: float = 0.05, chunk_delay: float = 0.001, port: int = 0,
+                 batch_delay: float = 0.0, batch_failed_requests: int = 0):
+        super().__init__(('127.0.0.1', port), MockHandler)
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.batch_delay = batch_delay
+        self.batch_failed_requests = batch_failed_requests
+        self.requests = 0
+        self.failures = deque()  # (status, Retry-After seconds or None) answered before anything else
+        self.files: Dict[str, bytes] = {}
+        self.batches: Dict[str, dict] = {}
+        self.batch_ready: Dict[str, float] = {}  # batch id -> when it completes
+        self.lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1/"
+
+    def fail_next(self, status: int = 429, count: int = 1, retry_after: Optional[float] = None):
+        self.failures.extend([(status, retry_after)] * count)
+
+    def add_file(self, data: bytes, purpose: str, filename: str) -> dict:
+        with self.lock:
+            file_id = f"file-mock{len(self.files)}"
+            self.files[file_id] = data
+        return {'id': file_id, 'object': 'file', 'bytes': len(data), 'created_at': int(time.time()),
+                'filename': filename, 'purpose': purpose, 'status': 'processed'}
+
+    def batch(self, batch_id: str) -> Optional[dict]:
+        # Runs the batch's requests once its delay has passed
+        with self.lock:
+            batch = self.batches.get(batch_id)
+        if batch is None or batch['status'] != 'in_progress' or time.time() < self.batch_ready[batch_id]:
+            return batch
+        output, errors = [], []
+        for index, line in enumerate(self.files[batch['input_file_id']].decode('utf-8').splitlines()):
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            if index < self.batch_failed_requests:
+                errors.append({'id': f"batch_req_{index}", 'custom_id': request['custom_id'], 'response': {
+                    'status_code': 500, 'body': {'error': {'message': 'Mock failure', 'type': 'server_error'}}},
+                    'error': None})
+                continue
+            output.append({'id': f"batch_req_{index}", 'custom_id': request['custom_id'], 'response': {
+                'status_code': 200, 'request_id': f"req_{index}", 'body': chat_completion(request['body'])},
+                'error': None})
+        for name, records in (('output_file_id', output), ('error_file_id', errors)):
+            if records:
+                payload = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records)
+                batch[name] = self.add_file(payload.encode('utf-8'), 'batch_output', f"{batch_id}.jsonl")['id']
+        batch.update(status='completed', completed_at=int(time.time()),
+                     request_counts={'total': len(output) + len(errors), 'completed': len(output),
+                                     'failed': len(errors)})
+        return batch
+
+    def start(self) -> 'MockChatCompletions':
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def mock_content(body: dict) -> dict:
+    schema = body.get('response_format', {}).get('json_schema', {}).get('schema', {})
+    return {name: f"{name} (translated)" for name in schema.get('properties', {})}
+
+
+def chat_completion(body: dict) -> dict:
+    text = json.dumps(mock_content(body), ensure_ascii=False)
+    return {'id': 'chatcmpl-mock', 'object': 'chat.completion', 'created': int(time.time()),
+            'model': body.get('model', 'mock'), 'choices': [
+                {'index': 0, 'message': {'role': 'assistant', 'content': text}, 'finish_reason': 'stop'}
+            ], 'usage': {'prompt_tokens': 0, 'completion_tokens': len(text) // 4, 'total_tokens': len(text) // 4}}
+
+
+def parse_multipart(content_type: str, data: bytes) -> Dict[str, Tuple[Optional[str], bytes]]:
+    # field name -> (file name, content)
+    message = BytesParser(policy=email.policy.default).parsebytes(
+        b'Content-Type: ' + content_type.encode('latin-1') + b'\r\n\r\n' + data)
+    fields = {}
+    for part in message.iter_parts():
+        fields[part.get_param('name', header='content-disposition')] = (part.get_filename(),
+                                                                          part.get_payload(decode=True))
+    return fields
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        path = self.path.rstrip('/')
+        match = re.search(r'/files/([^/]+)/content$', path)
+        if match and match.group(1) in self.server.files:
+            data = self.server.files[match.group(1)]
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/octet-stream')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+        match = re.search(r'/batches/([^/]+)$', path)
+        batch = self.server.batch(match.group(1)) if match else None
+        if batch is None:
+            self.send_error(404)
+            return
+        self.send_json(batch)
+
+    def do_POST(self):
+        path = self.path.rstrip('/')
+        data = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if path.endswith('/files'):
+            fields = parse_multipart(self.headers['Content-Type'], data)
+            filename, content = fields['file']
+            self.send_json(self.server.add_file(content, fields['purpose'][1].decode(), filename or 'upload'))
+            return
+        if path.endswith('/batches'):
+            body = json.loads(data)
+            with self.server.lock:
+                batch_id = f"batch_mock{len(self.server.batches)}"
+                batch = self.server.batches[batch_id] = {
+                    'id': batch_id, 'object': 'batch', 'endpoint': body['endpoint'], 'errors': None,
+                    'input_file_id': body['input_file_id'], 'completion_window': body['completion_window'],
+                    'status': 'in_progress', 'output_file_id': None, 'error_file_id': None,
+                    'created_at': int(time.time()), 'metadata': body.get('metadata'),
+                    'request_counts': {'total': 0, 'completed': 0, 'failed': 0}}
+                self.server.batch_ready[batch_id] = time.time() + self.server.batch_delay
+            self.send_json(batch)
+            return
+        match = re.search(r'/batches/([^/]+)/cancel$', path)
+        if match and match.group(1) in self.server.batches:
+            batch = self.server.batches[match.group(1)]
+            if batch['status'] == 'in_progress':
+                batch['status'] = 'cancelled'
+            self.send_json(batch)
+            return
+        if not path.endswith('/chat/completions'):
+            self.send_error(404)
+            return
+        body = json.loads(data or b'{}')
+        self.server.requests += 1
+        try:
+            status, retry_after = self.server.failures.popleft()
+        except IndexError:
+            pass
+        else:
+            headers = {} if retry_after is None else {'Retry-After': f"{retry_after:g}"}
+            self.send_json({'error': {'message': 'Mock failure', 'type': 'mock', 'code': str(status)}},
+                           status, headers)
+            return
+        time.sleep(self.server.latency)
+
+        if not body.get('stream'):
+            self.send_json(chat_completion(body))
+            return
+
+        content = mock_content(body)
+        base = {'id': 'chatcmpl-mock', 'created': int(time.time()), 'model': body.get('model', 'mock')}
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        items = list(content.items())
+        pieces = ['{'] + [
+            ('' if index == 0 else ',') + json.dumps(name) + ':' + json.dumps(value, ensure_ascii=False)
+            for index, (name, value) in enumerate(items)
+        ] + ['}']
+        for piece in pieces:
+            self.send_event(dict(base, object='chat.completion.chunk', choices=[
+                {'index': 0, 'delta': {'content': piece}, 'finish_reason': None}
+            ]))
+            time.sleep(self.server.chunk_delay)
+        self.send_event(dict(base, object='chat.completion.chunk', choices=[
+            {'index': 0, 'delta': {}, 'finish_reason': 'stop'}
+        ]))
+        if body.get('stream_options', {}).get('include_usage'):
+            completion = sum(len(piece) for piece in pieces) // 4
+            self.send_event(dict(base, object='chat.completion.chunk', choices=[], usage={
+                'prompt_tokens': 0, 'completion_tokens': completion, 'total_tokens': completion}))
+        self.wfile.write(b'data: [DONE]\n\n')
+        self.wfile.flush()
+
+    def send_json(self, payload: dict, status: int = 200, headers: Optional[dict] = None):
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_event(self, payload: dict):
+        self.wfile.write(b'data: ' + json.dumps(payload, ensure_ascii=False).encode('utf-8') + b'\n\n')
+        self.wfile.flush()
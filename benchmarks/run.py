@@ -0,0 +1,432 @@
+# Timing and memory benchmarks for the editor's hot paths, on a synthetic locale tree and against a
+# local stand-in for the OpenAI endpoint, so runs are repeatable and cost nothing:
+#
+#     python -m benchmarks.run --output baseline.json
+#     python -m benchmarks.run --compare baseline.json [--tolerance 0.25]
+#
+# Each benchmark is timed `--repeat` times (median, min and max are kept, comparisons use the min)
+# and then run once more under tracemalloc for its peak allocation. The editor benchmarks need Tk; without a display an
+# Xvfb server is started when one is installed, otherwise they are reported as skipped.
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from benchmarks.mock_openai import MockChatCompletions
+from benchmarks.synthetic import generate_locale_tree
+
+DEFAULT_TOLERANCE = 0.25  # allowed slowdown or memory growth before a result counts as a regression
+MIN_TIME_DELTA = 0.002  # seconds; smaller differences are noise
+MIN_MEMORY_DELTA = 256  # KiB
+
+
+class Benchmark(NamedTuple):
+    name: str
+    prepare: Callable[['Environment'], Callable[[], Any]]  # returns the step to time
+    needs: tuple  # 'tk', 'openai'
+    setup: Optional[Callable[['Environment'], None]] = None  # untimed, before every step
+
+
+class Environment:
+    # Shared state for one run: the synthetic tree, the mock endpoint and, when needed, the editor
+    def __init__(self, args, work_dir: str):
+        self.args = args
+        self.work_dir = work_dir
+        self.locales_path = os.path.join(work_dir, 'locales')
+        self.cache_path = os.path.join(work_dir, 'scan_cache.pickle')
+        self.server: Optional[MockChatCompletions] = None
+        self.app = None
+        self.state: Dict[str, Any] = {}
+
+    def catalog(self, **scan_options):
+        from catalog.core import Catalog
+        catalog = Catalog(self.locales_path)
+        catalog.scan(**scan_options)
+        return catalog
+
+    def openai(self) -> MockChatCompletions:
+        if self.server is None:
+            from clients.oai import configure_client
+            self.server = MockChatCompletions(self.args.latency, self.args.chunk_delay).start()
+            configure_client(api_key='mock', base_url=self.server.base_url)
+        return self.server
+
+    def editor(self):
+        if self.app is None:
+            from main import LocalizationEditor
+            self.app = LocalizationEditor()
+            self.app.withdraw()
+            self.app.locales_path = self.locales_path
+            self.app.scan_locales()
+            self.app.populate_tree()
+            self.app.update()
+        return self.app
+
+    def close(self):
+        if self.server is not None:
+            self.server.stop()
+        if self.app is not None:
+            self.app.runner.shutdown()
+            self.app.destroy()
+
+
+def first_file(env: Environment) -> str:
+    return sorted(os.listdir(os.path.join(env.locales_path, 'en')))[0]
+
+
+def bench_scan_cold(env):
+    return lambda: env.catalog()
+
+
+def bench_scan_warm(env):
+    env.catalog(cache_path=env.cache_path)  # fills the parse cache
+    return lambda: env.catalog(cache_path=env.cache_path)
+
+
+def bench_lazy_first_file(env):
+    def step():
+        catalog = env.catalog(lazy=True)
+        catalog.ensure_file_loaded(first_file(env))
+    return step
+
+
+def dirty_values(env):
+    # Changes one value in every file and locale, so save writes the whole tree
+    catalog = env.state.get('save_catalog')
+    if catalog is None:
+        catalog = env.state['save_catalog'] = env.catalog()
+    env.state['save_round'] = env.state.get('save_round', 0) + 1
+    for file_name in catalog.all_files:
+        key = sorted(catalog.file_keys(file_name))[0]
+        for locale in catalog.locales:
+            catalog.set_value(locale, file_name, key, f"edit {env.state['save_round']}")
+
+
+def bench_save(env):
+    return lambda: env.state['save_catalog'].save()
+
+
+def bench_search_build(env):
+    catalog = env.catalog()
+    return lambda: catalog.build_search_index(catalog.prepare_search_index())
+
+
+def bench_search_query(env):
+    catalog = env.catalog()
+    catalog.attach_search_index(catalog.build_search_index(catalog.prepare_search_index()))
+    queries = ['sav', 'save doc', 'conversation', 'ple', 'export fol', 'xyz']
+
+    def step():
+        for query in queries:
+            catalog.search.search(query)
+    return step
+
+
+def bench_generate_object(env):
+    env.openai()
+    from clients.oai import generate_localization_object
+    return lambda: generate_localization_object("Save the conversation", 'en', target_locales=env.state['targets'])
+
+
+def bench_generate_object_streamed(env):
+    env.openai()
+    from clients.oai import generate_localization_object
+    return lambda: generate_localization_object("Save the conversation", 'en', target_locales=env.state['targets'],
+                                                on_translation=lambda locale, value: None)
+
+
+def bench_generate_object_after_429(env):
+    # One rate-limited answer with Retry-After: 0 before each success, so this is the retry overhead
+    server = env.openai()
+    from clients.oai import generate_localization_object
+
+    def step():
+        server.fail_next(429, retry_after=0)
+        generate_localization_object("Save the conversation", 'en', target_locales=env.state['targets'])
+    return step
+
+
+def bench_fill_first_file(env):
+    env.openai()
+    from catalog.fill import find_missing_translations, plan_fill_batches, run_fill_batches
+    from clients.oai import generate_localization_batch
+    catalog = env.catalog()
+    file_name = first_file(env)
+    batches = plan_fill_batches(file_name, 'en', find_missing_translations(catalog.locales, file_name, 'en'))
+    return lambda: run_fill_batches(batches, generate_localization_batch)
+
+
+def bench_batch_round_trip(env):
+    # Builds, uploads and submits the first file's fill as a batch, then downloads and parses the results
+    server = env.openai()
+    from catalog.fill import find_missing_translations, plan_fill_batches
+    from clients.batch import download_batch_results, refresh_batch_job, submit_batch_jobs
+    server.batch_delay = 0
+    catalog = env.catalog()
+    file_name = first_file(env)
+    batches = plan_fill_batches(file_name, 'en', find_missing_translations(catalog.locales, file_name, 'en'))
+
+    def step():
+        for job in submit_batch_jobs(batches, env.locales_path):
+            download_batch_results(refresh_batch_job(job))
+    return step
+
+
+# Opens the editor on the synthetic tree and returns once the folder is in the tree
+STARTUP_SCRIPT = """
+import time
+import main
+app = main.LocalizationEditor()
+while not app.catalog.all_files:
+    app.update()
+    time.sleep(0.001)
+app.update()
+app.runner.shutdown()
+app.destroy()
+"""
+
+
+def startup_command(env, code, options=()):
+    # A fresh interpreter per run, in its own directory with a config.json naming the tree as last folder.
+    # Returns the completed process, with its stderr.
+    directory = os.path.join(env.work_dir, 'startup')
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, 'config.json'), 'w') as f:
+        json.dump({'last_folder': env.locales_path}, f)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    environment = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get('PYTHONPATH')])))
+    return lambda: subprocess.run([sys.executable, *options, '-c', code], cwd=directory, env=environment,
+                                  check=True, timeout=120, stderr=subprocess.PIPE, text=True)
+
+
+def slowest_imports(importtime: str, count: int = 10) -> Dict[str, int]:
+    # module -> microseconds spent importing it alone, from -X importtime output
+    times = {}
+    for line in importtime.splitlines():
+        fields = line.split('|')
+        if not line.startswith('import time:') or len(fields) != 3:
+            continue
+        try:
+            times[fields[2].strip()] = int(fields[0].split(':', 1)[1])
+        except ValueError:
+            continue  # the header line
+    return dict(sorted(times.items(), key=lambda item: item[1], reverse=True)[:count])
+
+
+def bench_import_main(env):
+    # The editor's own startup spans begin once main.py is imported, so the imports are measured here.
+    # The slowest modules of the last run go into the output under "imports".
+    command = startup_command(env, 'import main', ('-X', 'importtime'))
+
+    def step():
+        env.state['imports'] = slowest_imports(command().stderr)
+    return step
+
+
+def bench_startup(env):
+    return startup_command(env, STARTUP_SCRIPT)
+
+
+def bench_populate_table(env):
+    app = env.editor()
+    file_name = first_file(env)
+
+    def step():
+        app.populate_table(file_name)
+        app.update_idletasks()
+    return step
+
+
+def bench_highlight_cell(env):
+    # Pointer motion over every visible cell of the first file
+    app = env.editor()
+    app.populate_table(first_file(env))
+    app.update()
+    columns = len(app.table_view.columns)
+    width = max(1, app.table.winfo_width())
+    height = max(1, app.table.winfo_height())
+    events = [type('Motion', (), {'x': int((column + 0.5) * width / columns), 'y': y})
+              for column in range(columns) for y in range(30, height, 10)]
+
+    def step():
+        for event in events:
+            app.highlight_cell(event)
+        app.update_idletasks()
+    return step
+
+
+BENCHMARKS = [
+    Benchmark('scan_cold', bench_scan_cold, ()),
+    Benchmark('scan_warm_cache', bench_scan_warm, ()),
+    Benchmark('lazy_first_file', bench_lazy_first_file, ()),
+    Benchmark('save_all_files', bench_save, (), setup=dirty_values),
+    Benchmark('search_build', bench_search_build, ()),
+    Benchmark('search_queries', bench_search_query, ()),
+    Benchmark('generate_object', bench_generate_object, ('openai',)),
+    Benchmark('generate_object_streamed', bench_generate_object_streamed, ('openai',)),
+    Benchmark('generate_object_after_429', bench_generate_object_after_429, ('openai',)),
+    Benchmark('fill_first_file', bench_fill_first_file, ('openai',)),
+    Benchmark('batch_round_trip', bench_batch_round_trip, ('openai',)),
+    Benchmark('import_main', bench_import_main, ()),
+    Benchmark('startup_folder_loaded', bench_startup, ('tk',)),
+    Benchmark('populate_table', bench_populate_table, ('tk',)),
+    Benchmark('highlight_cell', bench_highlight_cell, ('tk',)),
+]
+
+
+@contextlib.contextmanager
+def headless_display():
+    # Yields a usable X display name, starting Xvfb when there is none; None if Tk cannot run
+    if os.environ.get('DISPLAY') or sys.platform in ('win32', 'darwin'):
+        yield os.environ.get('DISPLAY', '')
+        return
+    if not shutil.which('Xvfb'):
+        yield None
+        return
+    display = f":{os.getpid() % 500 + 100}"
+    server = subprocess.Popen(['Xvfb', display, '-screen', '0', '1280x1024x24'],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(0.5)
+    os.environ['DISPLAY'] = display
+    try:
+        yield display
+    finally:
+        del os.environ['DISPLAY']
+        server.terminate()
+        server.wait()
+
+
+def missing_requirement(needs, display) -> Optional[str]:
+    if 'tk' in needs and display is None:
+        return "no display and no Xvfb"
+    if 'openai' in needs:
+        try:
+            import openai  # noqa: F401
+        except ImportError:
+            return "openai is not installed"
+    return None
+
+
+def measure(benchmark: Benchmark, env: Environment, repeat: int) -> Dict[str, Any]:
+    step = benchmark.prepare(env)
+    timings = []
+    # Anything the code under test prints is not part of the measurement
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(repeat):
+            if benchmark.setup:
+                benchmark.setup(env)
+            start = time.perf_counter()
+            step()
+            timings.append(time.perf_counter() - start)
+        if benchmark.setup:
+            benchmark.setup(env)
+        tracemalloc.start()
+        step()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {'median': statistics.median(timings), 'min': min(timings), 'max': max(timings),
+            'repeat': repeat, 'peak_kib': round(peak / 1024, 1)}
+
+
+def run(args) -> Dict[str, Any]:
+    selected = [benchmark for benchmark in BENCHMARKS if not args.only or benchmark.name in args.only]
+    results: Dict[str, Any] = {}
+    skipped: Dict[str, str] = {}
+    with tempfile.TemporaryDirectory() as work_dir, headless_display() as display:
+        # Caches, the translation memory and config.json stay inside the run's directory
+        os.environ['LOCALIZATION_EDITOR_HOME'] = os.path.join(work_dir, 'home')
+        previous_dir = os.getcwd()
+        os.chdir(work_dir)
+        env = Environment(args, work_dir)
+        try:
+            generate_locale_tree(env.locales_path, args.locales, args.files, args.keys, args.empty, args.seed)
+            env.state['targets'] = sorted(os.listdir(env.locales_path))[:args.targets]
+            for benchmark in selected:
+                reason = missing_requirement(benchmark.needs, display)
+                if reason:
+                    skipped[benchmark.name] = reason
+                    print(f"{benchmark.name:28} skipped: {reason}")
+                    continue
+                results[benchmark.name] = result = measure(benchmark, env, args.repeat)
+                print(f"{benchmark.name:28} median {result['median'] * 1000:9.1f} ms   "
+                      f"min {result['min'] * 1000:9.1f} ms   peak {result['peak_kib']:10.1f} KiB")
+        finally:
+            env.close()
+            os.chdir(previous_dir)
+    return {
+        'meta': {'locales': args.locales, 'files': args.files, 'keys': args.keys, 'empty': args.empty,
+                 'seed': args.seed, 'latency': args.latency, 'chunk_delay': args.chunk_delay,
+                 'targets': args.targets, 'python': platform.python_version(), 'platform': platform.platform()},
+        'results': results,
+        'skipped': skipped,
+        'imports': env.state.get('imports', {}),
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    # Names of the benchmarks that got slower or use more memory than the baseline allows
+    differing = [name for name, value in baseline.get('meta', {}).items()
+                 if name not in ('python', 'platform') and current['meta'].get(name) != value]
+    if differing:
+        print(f"Warning: baseline was recorded with different {', '.join(differing)}")
+    regressions = []
+    for name, result in current['results'].items():
+        before = baseline.get('results', {}).get(name)
+        if before is None:
+            print(f"{name:28} no baseline")
+            continue
+        # The fastest run is compared, being the least disturbed by the rest of the machine
+        time_ratio = result['min'] / before['min'] if before['min'] else 1.0
+        memory_ratio = result['peak_kib'] / before['peak_kib'] if before['peak_kib'] else 1.0
+        slower = result['min'] - before['min'] > max(MIN_TIME_DELTA, before['min'] * tolerance)
+        larger = result['peak_kib'] - before['peak_kib'] > max(MIN_MEMORY_DELTA, before['peak_kib'] * tolerance)
+        flag = 'REGRESSION' if slower or larger else 'ok'
+        if slower or larger:
+            regressions.append(name)
+        print(f"{name:28} time x{time_ratio:5.2f}   memory x{memory_ratio:5.2f}   {flag}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the localization editor on a synthetic catalog.")
+    parser.add_argument('--locales', type=int, default=30)
+    parser.add_argument('--files', type=int, default=10)
+    parser.add_argument('--keys', type=int, default=500, help="Keys per file")
+    parser.add_argument('--empty', type=float, default=0.2, help="Share of empty values outside 'en'")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.05, help="Mock endpoint seconds before answering")
+    parser.add_argument('--chunk-delay', type=float, default=0.001, help="Mock endpoint seconds between chunks")
+    parser.add_argument('--targets', type=int, default=29, help="Locales requested by generate_object")
+    parser.add_argument('--only', action='append', help="Run only this benchmark (repeatable)")
+    parser.add_argument('--output', help="Write the results to this JSON file, e.g. as a new baseline")
+    parser.add_argument('--compare', help="Baseline JSON to compare with; exits 1 on regressions")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f"Allowed relative slowdown or memory growth (default {DEFAULT_TOLERANCE})")
+    args = parser.parse_args(argv)
+
+    current = run(args)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
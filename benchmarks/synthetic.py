@@ -0,0 +1,41 @@
+import json
+import os
+import random
+from typing import List
+
+WORDS = [
+    'save', 'cancel', 'upload', 'document', 'message', 'error', 'settings', 'language', 'conversation',
+    'model', 'prompt', 'network', 'delete', 'export', 'import', 'search', 'folder', 'assistant', 'file',
+    'retry', 'loading', 'invalid', 'please', 'select', 'the', 'your', 'new', 'chat', 'clear', 'copy',
+]
+
+
+def locale_names(count: int) -> List[str]:
+    # 'en' first, then two-letter codes so the trees look like the real ones
+    names = ['en']
+    for first in 'abcdefghijklmnopqrstuvwxyz':
+        for second in 'abcdefghijklmnopqrstuvwxyz':
+            if len(names) >= count:
+                return names
+            if first + second != 'en':
+                names.append(first + second)
+    return names
+
+
+def generate_locale_tree(path: str, locales: int, files: int, keys: int, empty_ratio: float = 0.2,
+                         seed: int = 1) -> str:
+    # Writes locales x files x keys of UI-like strings in the editor's own layout, the same tree for
+    # the same arguments. The first locale is complete; the others leave about empty_ratio of the
+    # values empty. Returns the locales folder.
+    rng = random.Random(seed)
+    phrases = [' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 8))).capitalize() for _ in range(keys)]
+    for locale in locale_names(locales):
+        os.makedirs(os.path.join(path, locale), exist_ok=True)
+        for index in range(files):
+            data = {}
+            for key_index, phrase in enumerate(phrases):
+                filled = locale == 'en' or rng.random() >= empty_ratio
+                data[f"{phrase} {index}.{key_index}"] = f"[{locale}] {phrase}" if filled else ""
+            with open(os.path.join(path, locale, f"file{index:03d}.json"), 'w', encoding='utf-8') as f:
+                f.write(json.dumps(data, ensure_ascii=False, indent=2))
+    return path
@@ -0,0 +1,8 @@
+import os
+
+
+def config_dir() -> str:
+    # Per-user directory for caches and other state that should survive restarts
+    path = os.environ.get('LOCALIZATION_EDITOR_HOME') or os.path.join(os.path.expanduser('~'), '.localization-editor')
+    os.makedirs(path, exist_ok=True)
+    return path
@@ -0,0 +1,433 @@
+import os
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple, Optional, Set, Tuple
+
+from catalog.index import ABSENT, CompletionIndex, FileStats
+from catalog.journal import DEFAULT_UNDO_LIMIT, Change, Edit, EditJournal, ReplayResult, WriteAheadLog, same_value
+from catalog.lazy import DEFAULT_MEMORY_BUDGET, LazyLocaleLoader
+from catalog.merge import merge_locale_file
+from catalog.metrics import METRICS
+from catalog.scanner import ScanCache, parse_locale_file, scan_locales_folder
+from catalog.search import SearchIndex
+from catalog.store import CompactStore
+from catalog.writer import write_dirty_files
+
+
+class SaveResult(NamedTuple):
+    files_written: int
+    bytes_written: int
+    failures: List[Tuple[Tuple[str, str], Exception]]
+
+
+class Conflict(NamedTuple):
+    locale: str
+    file_name: str
+    key: str
+    mine: Any  # the unsaved value that was kept, ABSENT if the key was removed in the editor
+    theirs: Any  # the value on disk, ABSENT if the key was removed there
+
+
+class ReloadResult(NamedTuple):
+    changed_keys: Dict[str, Set[str]]  # file_name -> keys whose value in memory changed
+    added_files: List[str]
+    conflicts: List[Conflict]
+    failures: List[Tuple[Tuple[str, str], Exception]]
+
+
+class Catalog:
+    # The locale files of one folder (locale -> file name -> {key: value}) and their unsaved edits.
+    # Has no display dependencies, so the editor and the command line share it.
+    def __init__(self, locales_path: str, undo_limit: int = DEFAULT_UNDO_LIMIT):
+        self.locales_path = locales_path
+        self.locales = CompactStore()  # behaves like the nested dicts, with keys stored once per file
+        self.all_files: Set[str] = set()
+        self.dirty_files: Set[Tuple[str, str]] = set()  # (locale, file_name) pairs that differ from disk
+        self.lazy_loader: Optional[LazyLocaleLoader] = None  # Set when scanned in lazy loading mode
+        self.file_locales: Dict[str, Set[str]] = {}  # file_name -> locales that have it on disk
+        # Disk contents of dirty files as of their first edit, to merge external changes against
+        self.baselines: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.conflicts: Dict[Tuple[str, str, str], Conflict] = {}  # (locale, file_name, key) -> conflict
+        self.search: Optional[SearchIndex] = None  # Attached once built in the background
+        # While the search index is being built: (file_name, key) pairs edited meanwhile, key None for a whole file
+        self.search_pending: Optional[Set[Tuple[str, Optional[str]]]] = None
+        # Completion counts for every loaded file; in lazy mode files are indexed as they load
+        self.index = CompletionIndex(())
+        self.journal = EditJournal(undo_limit)  # undo/redo, and the write-ahead log once opened
+
+    @property
+    def unsaved_changes(self) -> bool:
+        return bool(self.dirty_files)
+
+    def scan(self, lazy: bool = False, memory_budget: int = DEFAULT_MEMORY_BUDGET, cache_path: Optional[str] = None):
+        with METRICS.span('catalog.scan', lazy=lazy) as span:
+            self.dirty_files.clear()
+            self.baselines.clear()
+            self.conflicts.clear()
+            self.search = None
+            self.search_pending = None
+            if lazy:
+                # Only the directory listing is read here; file contents load on first use
+                self.lazy_loader = LazyLocaleLoader(self.locales_path, memory_budget=memory_budget)
+                self.locales = self.lazy_loader.skeleton()
+                self.all_files = self.lazy_loader.all_files
+                self.index = CompletionIndex(self.locales)
+                span['files'] = len(self.all_files)
+                return
+
+            self.lazy_loader = None
+            # Files are parsed on a worker pool; unchanged files come from the on-disk parse cache
+            cache = ScanCache.load(cache_path) if cache_path else None
+            self.locales, self.all_files, self.file_locales = scan_locales_folder(self.locales_path, cache)
+            if cache is not None:
+                cache.save()
+            self.index = CompletionIndex(self.locales)
+            for file_name in self.all_files:
+                self.index.index_file(file_name, self.locales)
+            span['files'] = len(self.all_files)
+
+    def ensure_file_loaded(self, file_name: str) -> bool:
+        # True when the file had to be read just now. Every access counts as a use for eviction.
+        if self.lazy_loader is None:
+            return False
+        if self.lazy_loader.is_loaded(file_name):
+            self.lazy_loader.touch(file_name)
+            return False
+        protected = {dirty_file for _, dirty_file in self.dirty_files}
+        with METRICS.span('catalog.load_file', file=file_name):
+            self.lazy_loader.load_file(file_name, self.locales, protected)
+        # Evicted files keep their counts; a reload re-indexes in case the file changed on disk
+        self.index.index_file(file_name, self.locales)
+        self.reindex_search(file_name)
+        return True
+
+    def is_file_missing(self, locale: str, file_name: str) -> bool:
+        if self.lazy_loader is not None:
+            return self.lazy_loader.is_missing(locale, file_name)
+        return locale not in self.file_locales.get(file_name, ())
+
+    def mark_dirty(self, locale: str, file_name: str):
+        self.dirty_files.add((locale, file_name))
+
+    def remember_baseline(self, locale: str, file_name: str):
+        # Called before a file's first unsaved edit, while it still matches the disk
+        target = (locale, file_name)
+        if target in self.dirty_files or target in self.baselines:
+            return
+        data = self.locales[locale].get(file_name)
+        missing = data is None or self.is_file_missing(locale, file_name)
+        self.baselines[target] = {} if missing else dict(data.items())
+
+    def prepare_search_index(self) -> List[str]:
+        # Returns the files to build the search index from; edits made from now on are replayed into it
+        self.search_pending = set()
+        if self.lazy_loader is None:
+            return sorted(self.all_files)
+        return [file_name for file_name in sorted(self.all_files) if self.lazy_loader.is_loaded(file_name)]
+
+    def build_search_index(self, file_names: List[str]) -> SearchIndex:
+        # Only reads the catalog, so it can run on a worker thread
+        return SearchIndex.build(self.locales, file_names, self.locales.file_keys)
+
+    def attach_search_index(self, search: SearchIndex):
+        self.search = search
+        pending, self.search_pending = self.search_pending or set(), None
+        for file_name, key in pending:
+            self.reindex_search(file_name, None if key is None else [key])
+
+    def reindex_search(self, file_name: str, keys: Optional[Iterable[str]] = None):
+        # Brings the search entries of these keys, or of the whole file, in line with the catalog
+        if self.search_pending is not None:
+            if keys is None:
+                self.search_pending.add((file_name, None))
+            else:
+                self.search_pending.update((file_name, key) for key in keys)
+        if self.search is None:
+            return
+        if keys is None:
+            self.search.index_file(file_name, self.locales, self.locales.file_keys(file_name))
+            return
+        files = [self.locales[locale].get(file_name, {}) for locale in self.search.locales]
+        for key in keys:
+            values = [data.get(key) for data in files]
+            if all(key not in data for data in files):
+                self.search.remove(file_name, key)
+            else:
+                self.search.update(file_name, key, values)
+
+    def file_conflicts(self, file_name: str) -> List[Conflict]:
+        return [conflict for conflict in self.conflicts.values() if conflict.file_name == file_name]
+
+    def file_keys(self, file_name: str) -> Set[str]:
+        self.ensure_file_loaded(file_name)
+        return set(self.locales.file_keys(file_name))
+
+    def loaded_file_keys(self) -> Dict[str, Set[str]]:
+        # file_name -> keys in any locale, for every file read so far, from the completion index
+        return {file_name: set(holders) for file_name, holders in self.index.key_holders.items()}
+
+    def file_stats(self, file_name: str) -> Dict[str, FileStats]:
+        self.ensure_file_loaded(file_name)
+        return {locale: self.index.stats(file_name, locale) for locale in self.locales}
+
+    def set_value(self, locale: str, file_name: str, key: str, value: Any) -> bool:
+        self.ensure_file_loaded(file_name)
+        self.conflicts.pop((locale, file_name, key), None)  # edited after seeing the conflict
+        data = self.locales[locale].setdefault(file_name, {})
+        before = data.get(key, ABSENT)
+        if before is not ABSENT and before == value:
+            return False
+        self.remember_baseline(locale, file_name)
+        data[key] = value
+        self.index.update(file_name, locale, key, before, value)
+        self.reindex_search(file_name, [key])
+        self.mark_dirty(locale, file_name)
+        self.journal.note(Change(locale, file_name, key, before, value), "Edit value")
+        return True
+
+    def remove_key(self, locale: str, file_name: str, key: str):
+        self.conflicts.pop((locale, file_name, key), None)
+        data = self.locales[locale][file_name]
+        if key in data:
+            self.remember_baseline(locale, file_name)
+            before = data.pop(key)
+            self.index.update(file_name, locale, key, before, ABSENT)
+            self.reindex_search(file_name, [key])
+            self.mark_dirty(locale, file_name)
+            self.journal.note(Change(locale, file_name, key, before, ABSENT), "Remove key")
+
+    def fill_values(self, translations: Dict[Tuple[str, str], Dict[str, Any]]) -> List[Tuple[str, str]]:
+        # Writes (file_name, locale) -> {key: value} into values that are still empty, so edits made
+        # while a fill ran are kept. Locales and files this catalog does not have are left alone.
+        # Returns the (locale, file_name) pairs that changed.
+        changed = set()
+        with self.journal.group("Fill translations"):
+            for (file_name, locale), values in translations.items():
+                if locale not in self.locales or file_name not in self.all_files:
+                    continue
+                self.ensure_file_loaded(file_name)
+                data = self.locales[locale].get(file_name, {})
+                for key, value in values.items():
+                    if not data.get(key) and self.set_value(locale, file_name, key, value):
+                        changed.add((locale, file_name))
+        return sorted(changed)
+
+    def update_key(self, file_name: str, key: str, new_key: str, values: Dict[str, Any]):
+        # Writes the values under new_key; when the key was renamed the old key is removed
+        self.ensure_file_loaded(file_name)
+        with self.journal.group("Rename key" if new_key != key else "Edit values"):
+            for locale, value in values.items():
+                if new_key != key:
+                    self.remove_key(locale, file_name, key)
+                    # Marked dirty even if the new key already held this value, since the old key is gone
+                    self.mark_dirty(locale, file_name)
+                self.set_value(locale, file_name, new_key, value)
+
+    def add_file(self, file_name: str) -> bool:
+        if file_name in self.all_files:
+            return False
+        # Add empty file to each locale
+        for locale in self.locales:
+            self.remember_baseline(locale, file_name)
+            self.locales[locale][file_name] = {}
+            self.mark_dirty(locale, file_name)
+        self.all_files.add(file_name)
+        self.index.index_file(file_name, self.locales)
+        if self.lazy_loader is not None:
+            self.lazy_loader.add_file(file_name)
+        self.journal.note(Change(None, file_name, None, ABSENT, {}), "Add file")
+        return True
+
+    def remove_file(self, file_name: str) -> bool:
+        # Drops a file added in the editor while it is still empty and not on disk; False otherwise
+        if any(not self.is_file_missing(locale, file_name) or self.locales[locale].get(file_name)
+               for locale in self.locales):
+            return False
+        for locale in self.locales:
+            if file_name in self.locales[locale]:
+                del self.locales[locale][file_name]
+            self.dirty_files.discard((locale, file_name))
+            self.baselines.pop((locale, file_name), None)
+        self.all_files.discard(file_name)
+        self.file_locales.pop(file_name, None)
+        self.index.drop_file(file_name)
+        if self.lazy_loader is not None:
+            self.lazy_loader.remove_file(file_name)
+        self.reindex_search(file_name)
+        self.journal.note(Change(None, file_name, None, {}, ABSENT), "Remove file")
+        return True
+
+    def add_key(self, file_name: str, key: str):
+        # Add key to all locales with empty value
+        self.ensure_file_loaded(file_name)
+        with self.journal.group("Add key"):
+            for locale in self.locales:
+                self.remember_baseline(locale, file_name)
+                data = self.locales[locale][file_name]
+                before = data.get(key, ABSENT)
+                self.index.update(file_name, locale, key, before, "")
+                data[key] = ""
+                self.mark_dirty(locale, file_name)
+                if not same_value(before, ""):
+                    self.journal.note(Change(locale, file_name, key, before, ""), "Add key")
+        self.reindex_search(file_name, [key])
+
+    def apply_change(self, change: Change) -> bool:
+        # Applies a journalled change if the catalog still holds its old value. True when the catalog
+        # holds the new value afterwards, including when it already did.
+        if change.key is None:
+            if change.new is not ABSENT:
+                self.add_file(change.file_name)
+                return True
+            return change.file_name not in self.all_files or self.remove_file(change.file_name)
+        if change.file_name not in self.all_files or change.locale not in self.locales:
+            return False
+        self.ensure_file_loaded(change.file_name)
+        data = self.locales[change.locale].get(change.file_name)
+        current = data.get(change.key, ABSENT) if data is not None else ABSENT
+        if same_value(current, change.new):
+            return True
+        if not same_value(current, change.old):
+            return False
+        if change.new is ABSENT:
+            self.remove_key(change.locale, change.file_name, change.key)
+        else:
+            self.set_value(change.locale, change.file_name, change.key, change.new)
+        return True
+
+    def apply_edits(self, edits: Iterable[Edit]) -> ReplayResult:
+        # Applies journalled edits without recording them again. Only the changed keys are touched, and
+        # a change is skipped when its key holds something else by now, e.g. after a reload from disk.
+        applied = []
+        skipped = []
+        self.journal.paused = True
+        try:
+            for edit in edits:
+                changes = []
+                for change in edit.changes:
+                    (changes if self.apply_change(change) else skipped).append(change)
+                if changes:
+                    applied.append(Edit(edit.label, changes))
+        finally:
+            self.journal.paused = False
+        return ReplayResult(applied, skipped)
+
+    def undo(self) -> ReplayResult:
+        edit = self.journal.take_undo()
+        return self.apply_edits([edit.inverse()]) if edit is not None else ReplayResult([], [])
+
+    def redo(self) -> ReplayResult:
+        edit = self.journal.take_redo()
+        return self.apply_edits([edit]) if edit is not None else ReplayResult([], [])
+
+    def replay(self, edits: Iterable[Edit]) -> ReplayResult:
+        # Re-applies edits recovered from a write-ahead log as unsaved changes, undoable as usual
+        result = self.apply_edits(edits)
+        self.journal.undo_stack.extend(result.edits)
+        return result
+
+    def open_journal(self, path: str, edits: Iterable[Edit] = ()):
+        # Starts a write-ahead log holding `edits` (those replayed from the last one), and every edit from now on
+        self.journal.attach_log(WriteAheadLog(path, self.locales_path, edits))
+
+    def save(self) -> SaveResult:
+        # Only files touched since the last save/scan are rewritten, each via temp file + rename
+        dirty = set(self.dirty_files)
+        with METRICS.span('catalog.save', files=len(dirty)) as span:
+            files_written, bytes_written, failures = write_dirty_files(self.locales_path, self.locales, dirty)
+            span.update(bytes=bytes_written, failures=len(failures))
+        failed = {target for target, _ in failures}
+        self.dirty_files -= dirty - failed
+        for locale, file_name in dirty - failed:
+            self.set_on_disk(locale, file_name, True)  # in lazy mode the loader keeps this
+            self.baselines.pop((locale, file_name), None)
+        # Saving kept the editor's side of every conflict in those files
+        for target in [target for target in self.conflicts if (target[0], target[1]) in dirty - failed]:
+            del self.conflicts[target]
+        if not self.dirty_files:
+            # Every logged edit is on disk now; after a failure the log is kept for recovery
+            self.journal.checkpoint()
+        return SaveResult(files_written, bytes_written, failures)
+
+    def set_on_disk(self, locale: str, file_name: str, on_disk: bool):
+        file_locales = self.lazy_loader.file_locales if self.lazy_loader is not None else self.file_locales
+        if on_disk:
+            file_locales.setdefault(file_name, set()).add(locale)
+        else:
+            file_locales.get(file_name, set()).discard(locale)
+
+    def replace_file(self, locale: str, file_name: str, data: Mapping[str, Any]) -> Set[str]:
+        # Swaps in a new version of one locale file, keeping the completion index in step.
+        # Returns the keys whose value changed.
+        current = self.locales[locale].get(file_name)
+        before = dict(current.items()) if current is not None else {}
+        changed = set()
+        for key in before.keys() | data.keys():
+            old = before.get(key, ABSENT)
+            new = data.get(key, ABSENT)
+            if old is ABSENT or new is ABSENT or old != new:
+                self.index.update(file_name, locale, key, old, new)
+                changed.add(key)
+        self.locales[locale][file_name] = data
+        self.reindex_search(file_name, changed)
+        return changed
+
+    def reload_files(self, targets: Iterable[Tuple[str, str]]) -> ReloadResult:
+        # Re-reads (locale, file_name) pairs changed outside the editor. Files without unsaved edits
+        # take the disk version; dirty files are merged key by key and conflicting keys keep the
+        # unsaved value and are recorded in self.conflicts.
+        changed_keys: Dict[str, Set[str]] = {}
+        added_files = []
+        conflicts = []
+        failures = []
+        for locale, file_name in sorted(set(targets)):
+            if locale not in self.locales:
+                continue  # a new locale folder needs the folder to be opened again
+            path = os.path.join(self.locales_path, locale, file_name)
+            try:
+                theirs = parse_locale_file(path)
+                on_disk = True
+            except FileNotFoundError:
+                theirs = {}
+                on_disk = False
+            except (OSError, ValueError) as e:
+                # Typically a file caught half-written; its next change is picked up again
+                failures.append(((locale, file_name), e))
+                continue
+
+            if file_name not in self.all_files:
+                if not on_disk:
+                    continue
+                self.all_files.add(file_name)
+                added_files.append(file_name)
+                if self.lazy_loader is None:
+                    for files in self.locales.values():
+                        files[file_name] = {}
+                    self.index.index_file(file_name, self.locales)
+            self.set_on_disk(locale, file_name, on_disk)
+
+            if self.lazy_loader is not None and not self.lazy_loader.is_loaded(file_name):
+                # Read fresh on first use; counts and search entries kept from before an eviction are stale now
+                self.index.drop_file(file_name)
+                self.reindex_search(file_name)
+                continue
+
+            target = (locale, file_name)
+            if target in self.dirty_files:
+                merged = merge_locale_file(self.baselines.get(target, {}), self.locales[locale][file_name], theirs)
+                for key in merged.resolved:
+                    self.conflicts.pop((locale, file_name, key), None)
+                for key, mine, other in merged.conflicts:
+                    conflict = Conflict(locale, file_name, key, mine, other)
+                    self.conflicts[(locale, file_name, key)] = conflict
+                    conflicts.append(conflict)
+                values = merged.values
+                self.baselines[target] = theirs
+            else:
+                values = theirs
+            changed = self.replace_file(locale, file_name, values)
+            if changed:
+                changed_keys.setdefault(file_name, set()).update(changed)
+            if target in self.dirty_files and list(values.items()) == list(theirs.items()):
+                # Nothing left that the disk does not already have
+                self.dirty_files.discard(target)
+                self.baselines.pop(target, None)
+        return ReloadResult(changed_keys, added_files, conflicts, failures)
@@ -0,0 +1,165 @@
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from clients.oai import RequestFailed
+
+DEFAULT_BATCH_TOKENS = 4000  # estimated output tokens per request
+MAX_BATCH_KEYS = 100  # strict structured-output schemas are limited to 100 object properties
+DEFAULT_RETRIES = 2
+FATAL_STATUS = {400, 401, 403}  # the same request can never succeed, so the fill stops
+
+# translate(phrases, source_locale, target_locale, context[, on_translation=callback]) -> {key: translation}.
+# The callback keyword is only passed when streaming is requested.
+Translator = Callable[..., Dict[str, str]]
+
+
+class FillBatch(NamedTuple):
+    file_name: str
+    source_locale: str
+    target_locale: str
+    phrases: Dict[str, str]  # translation key -> source phrase
+
+
+class FillResult(NamedTuple):
+    translations: Dict[Tuple[str, str], Dict[str, str]]  # (file_name, locale) -> {key: translation}
+    failures: List[Tuple[str, str, str, Exception]]  # (file_name, locale, key, error)
+    requests: int
+    error: Optional[Exception] = None  # a request error that stopped the fill before the last batch
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token for the Latin-script sources this editor deals with
+    return len(text) // 4 + 1
+
+
+def find_missing_translations(
+        locales: Dict[str, Dict[str, Dict[str, Any]]],
+        file_name: str,
+        source_locale: str,
+        skip_keys: Optional[Set[str]] = None
+) -> Dict[str, Dict[str, str]]:
+    # target locale -> {key: source phrase} for every empty or absent value in the file.
+    # Keys without a source value fall back to the key itself, as the edit dialog does.
+    # skip_keys are left alone, e.g. keys the source code no longer uses.
+    source = locales[source_locale].get(file_name, {})
+    keys = set()
+    for files in locales.values():
+        keys.update(files.get(file_name, {}))
+    if skip_keys:
+        keys -= skip_keys
+
+    missing: Dict[str, Dict[str, str]] = {}
+    for locale, files in locales.items():
+        if locale == source_locale:
+            continue
+        data = files.get(file_name, {})
+        for key in sorted(keys):
+            if data.get(key):
+                continue
+            phrase = source.get(key) or key
+            if isinstance(phrase, str):
+                missing.setdefault(locale, {})[key] = phrase
+    return missing
+
+
+def plan_fill_batches(
+        file_name: str,
+        source_locale: str,
+        missing: Dict[str, Dict[str, str]],
+        max_tokens: int = DEFAULT_BATCH_TOKENS,
+        max_keys: int = MAX_BATCH_KEYS
+) -> List[FillBatch]:
+    # One target locale per request; keys are packed until the estimated output reaches the budget
+    batches = []
+    for locale in sorted(missing):
+        phrases: Dict[str, str] = {}
+        tokens = 0
+        for key, phrase in missing[locale].items():
+            # The key is echoed back as a property name and translations run longer than the source
+            cost = estimate_tokens(key) + 2 * estimate_tokens(phrase) + 4
+            if phrases and (tokens + cost > max_tokens or len(phrases) >= max_keys):
+                batches.append(FillBatch(file_name, source_locale, locale, phrases))
+                phrases, tokens = {}, 0
+            phrases[key] = phrase
+            tokens += cost
+        if phrases:
+            batches.append(FillBatch(file_name, source_locale, locale, phrases))
+    return batches
+
+
+def run_fill_batches(
+        batches: List[FillBatch],
+        translate: Translator,
+        context: Optional[str] = None,
+        retries: int = DEFAULT_RETRIES,
+        progress: Optional[Callable[[int, int], None]] = None,
+        should_stop: Optional[Callable[[], bool]] = None,
+        on_translation: Optional[Callable[[str, str, str, str], None]] = None
+) -> FillResult:
+    # Stops between requests once should_stop() is true and returns what was translated so far.
+    # on_translation(file_name, locale, key, translation) is called as each value streams in.
+    # A request that fails (the client has already retried it) fails its keys without asking again
+    # key by key; a 400, 401 or 403 stops the fill.
+    translations: Dict[Tuple[str, str], Dict[str, str]] = {}
+    failures = []
+    requests = 0
+
+    def request(phrases, batch):
+        nonlocal requests
+        requests += 1
+        if on_translation is None:
+            return translate(phrases, batch.source_locale, batch.target_locale, context)
+
+        def streamed(key, value):
+            if key in phrases and isinstance(value, str) and value:
+                on_translation(batch.file_name, batch.target_locale, key, value)
+
+        return translate(phrases, batch.source_locale, batch.target_locale, context, on_translation=streamed)
+
+    def stopped():
+        return should_stop is not None and should_stop()
+
+    def fatal(error):
+        return isinstance(error, RequestFailed) and error.status in FATAL_STATUS
+
+    for done, batch in enumerate(batches):
+        if stopped():
+            break
+        filled = translations.setdefault((batch.file_name, batch.target_locale), {})
+        try:
+            response = request(batch.phrases, batch)
+        except Exception as e:
+            failures.extend((batch.file_name, batch.target_locale, key, e) for key in batch.phrases)
+            if fatal(e):
+                return FillResult(translations, failures, requests, e)
+            if progress is not None:
+                progress(done + 1, len(batches))
+            continue
+        # Anything the batch left out or empty is retried on its own, so one bad key cannot sink the rest
+        for key, phrase in batch.phrases.items():
+            value = response.get(key)
+            if isinstance(value, str) and value:
+                filled[key] = value
+                continue
+            error: Exception = ValueError("No translation returned")
+            for _ in range(retries):
+                if stopped():
+                    break
+                try:
+                    value = request({key: phrase}, batch).get(key)
+                except RequestFailed as e:
+                    failures.append((batch.file_name, batch.target_locale, key, e))
+                    if fatal(e):
+                        return FillResult(translations, failures, requests, e)
+                    break  # already retried by the client
+                except Exception as e:
+                    error = e
+                    continue
+                if isinstance(value, str) and value:
+                    filled[key] = value
+                    break
+            else:
+                failures.append((batch.file_name, batch.target_locale, key, error))
+        if progress is not None:
+            progress(done + 1, len(batches))
+
+    return FillResult(translations, failures, requests)
@@ -0,0 +1,74 @@
+from typing import Any, Dict, Iterable, NamedTuple, Tuple
+
+ABSENT = object()  # stands for a key that does not exist in a locale's file
+
+
+class FileStats(NamedTuple):
+    keys: int  # keys present in any locale of the file
+    empty: int  # of those, empty or absent in this locale
+
+
+class CompletionIndex:
+    # Counts kept per (file, locale) so completion can be read without walking the strings.
+    # A file's key count is the number of keys present in any locale; every edit adjusts the
+    # counters in O(1) through update().
+    def __init__(self, locales: Iterable[str]):
+        self.locales = set(locales)
+        self.key_holders: Dict[str, Dict[str, int]] = {}  # file -> key -> number of locales that have it
+        self.filled: Dict[Tuple[str, str], int] = {}  # (file, locale) -> non-empty values
+        self.locale_filled: Dict[str, int] = {locale: 0 for locale in self.locales}
+        self.total_keys = 0
+
+    def is_indexed(self, file_name: str) -> bool:
+        return file_name in self.key_holders
+
+    def index_file(self, file_name: str, locales: Dict[str, Dict[str, Dict[str, Any]]]):
+        self.drop_file(file_name)
+        self.key_holders[file_name] = {}
+        for locale, files in locales.items():
+            for key, value in files.get(file_name, {}).items():
+                self.update(file_name, locale, key, ABSENT, value)
+
+    def drop_file(self, file_name: str):
+        holders = self.key_holders.pop(file_name, None)
+        if holders is None:
+            return
+        self.total_keys -= len(holders)
+        for locale in self.locales:
+            self.locale_filled[locale] -= self.filled.pop((file_name, locale), 0)
+
+    def update(self, file_name: str, locale: str, key: str, before: Any, after: Any):
+        # before/after are the values in that locale, or ABSENT when the key is not there
+        holders = self.key_holders.setdefault(file_name, {})
+        if before is ABSENT and after is not ABSENT:
+            count = holders.get(key, 0)
+            holders[key] = count + 1
+            if not count:
+                self.total_keys += 1
+        elif before is not ABSENT and after is ABSENT:
+            count = holders[key] - 1
+            if count:
+                holders[key] = count
+            else:
+                del holders[key]
+                self.total_keys -= 1
+        delta = (after is not ABSENT and bool(after)) - (before is not ABSENT and bool(before))
+        if delta:
+            self.filled[(file_name, locale)] = self.filled.get((file_name, locale), 0) + delta
+            self.locale_filled[locale] = self.locale_filled.get(locale, 0) + delta
+
+    def file_keys(self, file_name: str) -> int:
+        return len(self.key_holders.get(file_name, ()))
+
+    def stats(self, file_name: str, locale: str) -> FileStats:
+        keys = self.file_keys(file_name)
+        return FileStats(keys, keys - self.filled.get((file_name, locale), 0))
+
+    def file_totals(self, file_name: str) -> FileStats:
+        # Values across all locales: keys * locales, and how many of them are empty
+        keys = self.file_keys(file_name)
+        filled = sum(self.filled.get((file_name, locale), 0) for locale in self.locales)
+        return FileStats(keys * len(self.locales), keys * len(self.locales) - filled)
+
+    def locale_stats(self, locale: str) -> FileStats:
+        return FileStats(self.total_keys, self.total_keys - self.locale_filled.get(locale, 0))
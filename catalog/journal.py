@@ -0,0 +1,247 @@
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+from catalog.index import ABSENT
+from catalog.writer import write_bytes_atomic
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_VERSION = 1
+DEFAULT_UNDO_LIMIT = 1000  # edits kept for undo; the oldest are dropped first
+
+
+class Change(NamedTuple):
+    # One value before and after an edit; old/new are ABSENT where the key did not exist.
+    # A file added to every locale has locale and key None, old ABSENT and new {}.
+    locale: Optional[str]
+    file_name: str
+    key: Optional[str]
+    old: Any
+    new: Any
+
+    def inverse(self) -> 'Change':
+        return self._replace(old=self.new, new=self.old)
+
+
+class Edit(NamedTuple):
+    label: str  # what the user did, e.g. "Rename key"
+    changes: List[Change]  # in the order they were made
+
+    def inverse(self) -> 'Edit':
+        return Edit(self.label, [change.inverse() for change in reversed(self.changes)])
+
+
+class ReplayResult(NamedTuple):
+    edits: List[Edit]  # as applied, without the skipped changes
+    skipped: List[Change]  # changes whose key no longer held the old value
+
+
+def same_value(a: Any, b: Any) -> bool:
+    if a is ABSENT or b is ABSENT:
+        return a is b
+    return a == b
+
+
+def change_record(change: Change) -> Dict[str, Any]:
+    record = {'l': change.locale, 'f': change.file_name, 'k': change.key}
+    if change.old is not ABSENT:
+        record['o'] = change.old
+    if change.new is not ABSENT:
+        record['n'] = change.new
+    return record
+
+
+def change_from_record(record: Dict[str, Any]) -> Change:
+    return Change(record['l'], record['f'], record['k'], record.get('o', ABSENT), record.get('n', ABSENT))
+
+
+def edit_line(edit: Edit) -> bytes:
+    record = {'label': edit.label, 'changes': [change_record(change) for change in edit.changes]}
+    return (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+
+
+def journal_path(directory: str, locales_path: str) -> str:
+    # One log per locales folder
+    digest = hashlib.sha1(os.path.abspath(locales_path).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(directory, f"{digest}.jsonl")
+
+
+def read_write_ahead_log(path: str, locales_path: str) -> List[Edit]:
+    # Edits logged for this folder since it was last saved. A line cut short by a crash ends the log.
+    try:
+        with open(path, 'rb') as f:
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        return []
+    except OSError as e:
+        logger.warning("Ignoring unreadable edit journal %s: %s", path, e)
+        return []
+    try:
+        header = json.loads(lines[0]) if lines else None
+    except ValueError:
+        header = None
+    if (not isinstance(header, dict) or header.get('journal') != JOURNAL_VERSION
+            or header.get('locales_path') != os.path.abspath(locales_path)):
+        return []
+    edits = []
+    for line in lines[1:]:
+        try:
+            record = json.loads(line)
+            edits.append(Edit(record['label'], [change_from_record(change) for change in record['changes']]))
+        except (KeyError, TypeError, ValueError):
+            break
+    return edits
+
+
+class WriteAheadLog:
+    # Append-only file of the edits made since the last save, one JSON line each, so they can be
+    # replayed after a crash. Every append is flushed and synced before the edit is considered done;
+    # saving truncates the log back to its header.
+    def __init__(self, path: str, locales_path: str, edits: Iterable[Edit] = ()):
+        self.path = path
+        header = json.dumps({'journal': JOURNAL_VERSION, 'locales_path': os.path.abspath(locales_path),
+                             'created': time.time()}).encode('utf-8') + b'\n'
+        self.header_size = len(header)
+        write_bytes_atomic(path, header + b''.join(edit_line(edit) for edit in edits))
+        self.file = open(path, 'ab')
+
+    def append(self, edit: Edit):
+        self.file.write(edit_line(edit))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def truncate(self):
+        self.file.truncate(self.header_size)
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+    def remove(self):
+        self.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class EditJournal:
+    # Undo and redo history of one catalog, kept as deltas so undoing an edit costs what the edit did,
+    # not a copy of the catalog. With a write-ahead log attached every edit also goes to disk.
+    def __init__(self, limit: int = DEFAULT_UNDO_LIMIT):
+        self.undo_stack: Deque[Edit] = deque(maxlen=limit)
+        self.redo_stack: List[Edit] = []
+        self.log: Optional[WriteAheadLog] = None
+        self.group_changes: Optional[List[Change]] = None  # changes of the edit being grouped
+        self.paused = False  # while the catalog applies an undo, redo or replay
+        self.on_log_failed: Optional[Callable[[Exception], None]] = None  # e.g. to tell the user
+
+    @property
+    def can_undo(self) -> bool:
+        return bool(self.undo_stack)
+
+    @property
+    def can_redo(self) -> bool:
+        return bool(self.redo_stack)
+
+    @contextlib.contextmanager
+    def group(self, label: str) -> Iterator[None]:
+        # Changes made inside are undone and redone as one edit; nested groups join the outer one
+        if self.group_changes is not None:
+            yield
+            return
+        self.group_changes = []
+        try:
+            yield
+        finally:
+            changes, self.group_changes = self.group_changes, None
+            if changes:
+                self.commit(Edit(label, changes))
+
+    @contextlib.contextmanager
+    def collect(self, changes: List[Change]) -> Iterator[None]:
+        # Routes the changes made inside into `changes` rather than the history, for an edit that is
+        # built up over several calls and committed once complete
+        outer, self.group_changes = self.group_changes, changes
+        try:
+            yield
+        finally:
+            self.group_changes = outer
+
+    def note(self, change: Change, label: str):
+        # Called by the catalog for every change it makes; label names it when outside a group
+        if self.paused:
+            return
+        if self.group_changes is not None:
+            self.group_changes.append(change)
+        else:
+            self.commit(Edit(label, [change]))
+
+    def commit(self, edit: Edit):
+        self.write(edit)
+        self.undo_stack.append(edit)
+        self.redo_stack.clear()
+
+    def write(self, edit: Edit):
+        if self.log is None:
+            return
+        try:
+            self.log.append(edit)
+        except (OSError, ValueError) as e:
+            # A full disk must not stop editing; only crash recovery is lost
+            logger.error("Failed to write the edit journal %s, unsaved edits will not be recoverable: %s",
+                         self.log.path, e)
+            with contextlib.suppress(OSError):
+                self.log.close()
+            self.log = None
+            if self.on_log_failed is not None:
+                self.on_log_failed(e)
+
+    def take_undo(self) -> Optional[Edit]:
+        # The latest edit, moved to the redo stack; its inverse is logged before the caller applies it
+        if not self.undo_stack:
+            return None
+        edit = self.undo_stack.pop()
+        self.redo_stack.append(edit)
+        self.write(edit.inverse())
+        return edit
+
+    def take_redo(self) -> Optional[Edit]:
+        if not self.redo_stack:
+            return None
+        edit = self.redo_stack.pop()
+        self.undo_stack.append(edit)
+        self.write(edit)
+        return edit
+
+    def attach_log(self, log: WriteAheadLog):
+        self.close()
+        self.log = log
+
+    def checkpoint(self):
+        # Everything logged so far is saved; undo history is kept
+        if self.log is None:
+            return
+        try:
+            self.log.truncate()
+        except OSError as e:
+            logger.warning("Failed to truncate the edit journal %s: %s", self.log.path, e)
+
+    def close(self):
+        if self.log is not None:
+            with contextlib.suppress(OSError):
+                self.log.close()
+            self.log = None
+
+    def discard(self):
+        # The unsaved edits were given up, so there is nothing to recover
+        if self.log is not None:
+            with contextlib.suppress(OSError):
+                self.log.remove()
+            self.log = None
@@ -0,0 +1,100 @@
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional, Set
+
+from catalog.scanner import list_locale_files, parse_locale_file
+from catalog.store import CompactStore
+
+DEFAULT_MEMORY_BUDGET = 32 * 1024 * 1024  # bytes of source JSON kept loaded
+
+
+class LazyLocaleLoader:
+    # Enumerates locale directories and file names up front; a file's data is only read,
+    # across every locale at once, when the editor first needs it.
+    def __init__(self, locales_path: str, memory_budget: int = DEFAULT_MEMORY_BUDGET,
+                 max_workers: Optional[int] = None):
+        self.locales_path = locales_path
+        self.memory_budget = memory_budget
+        self.max_workers = max_workers
+        self.locale_names = []
+        self.file_locales: Dict[str, Set[str]] = {}  # file_name -> locales that have it on disk
+        self.loaded: 'OrderedDict[str, int]' = OrderedDict()  # file_name -> bytes read, LRU order
+        self.evictions = 0
+
+        for locale, file_name, _ in list_locale_files(locales_path):
+            if file_name is None:
+                self.locale_names.append(locale)
+            else:
+                self.file_locales.setdefault(file_name, set()).add(locale)
+
+    @property
+    def all_files(self) -> Set[str]:
+        return set(self.file_locales)
+
+    @property
+    def loaded_bytes(self) -> int:
+        return sum(self.loaded.values())
+
+    def skeleton(self) -> CompactStore:
+        return CompactStore(self.locale_names)
+
+    def is_loaded(self, file_name: str) -> bool:
+        return file_name in self.loaded
+
+    def is_missing(self, locale: str, file_name: str) -> bool:
+        return locale not in self.file_locales.get(file_name, ())
+
+    def add_file(self, file_name: str):
+        # Files created in the editor only exist in memory until saved
+        self.file_locales.setdefault(file_name, set())
+        self.loaded[file_name] = 0
+
+    def remove_file(self, file_name: str):
+        # Undoes add_file for a file that was never saved
+        self.file_locales.pop(file_name, None)
+        self.loaded.pop(file_name, None)
+
+    def touch(self, file_name: str):
+        # Marks a loaded file as the most recently used, so it is evicted last
+        if file_name in self.loaded:
+            self.loaded.move_to_end(file_name)
+
+    def load_file(self, file_name: str, locales: CompactStore, protected: Iterable[str] = ()):
+        if file_name in self.loaded:
+            self.touch(file_name)
+            return
+
+        def read(locale):
+            # Read by path rather than from the listing so files saved since opening are picked up
+            path = os.path.join(self.locales_path, locale, file_name)
+            try:
+                return os.path.getsize(path), parse_locale_file(path)
+            except FileNotFoundError:
+                return 0, {}
+
+        locale_names = list(locales)
+        workers = self.max_workers or min(16, max(1, len(locale_names)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(read, locale_names))
+
+        total = 0
+        for locale, (size, data) in zip(locale_names, results):
+            locales[locale][file_name] = data
+            total += size
+        self.loaded[file_name] = total
+
+        self.evict(locales, set(protected) | {file_name})
+
+    def evict(self, locales: CompactStore, protected: Set[str]):
+        # Drop least recently used files that have no unsaved edits until back under budget
+        loaded_bytes = self.loaded_bytes
+        for file_name in list(self.loaded):
+            if loaded_bytes <= self.memory_budget:
+                break
+            if file_name in protected:
+                continue
+            loaded_bytes -= self.loaded.pop(file_name)
+            for files in locales.values():
+                files.pop(file_name, None)
+            self.evictions += 1
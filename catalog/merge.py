@@ -0,0 +1,36 @@
+from typing import Any, Dict, List, Mapping, NamedTuple, Tuple
+
+from catalog.index import ABSENT
+
+
+class MergeResult(NamedTuple):
+    values: Dict[str, Any]
+    conflicts: List[Tuple[str, Any, Any]]  # (key, mine, theirs); ABSENT where the key was removed
+    resolved: List[str]  # keys where both sides now agree
+
+
+def merge_locale_file(base: Mapping[str, Any], mine: Mapping[str, Any], theirs: Mapping[str, Any]) -> MergeResult:
+    # Three-way merge of one locale file, key by key. `base` is the file as it was on disk when it was
+    # first edited in memory, `mine` the unsaved version and `theirs` the file on disk now. A key changed
+    # on one side only takes that side; a key changed differently on both sides keeps the unsaved value
+    # and is reported as a conflict. Keys follow the disk order, then keys only added in memory.
+    values = {}
+    conflicts = []
+    resolved = []
+    for key in list(theirs) + [key for key in mine if key not in theirs]:
+        before = base.get(key, ABSENT)
+        ours = mine.get(key, ABSENT)
+        other = theirs.get(key, ABSENT)
+        if ours == other:
+            result = other
+            resolved.append(key)
+        elif ours == before:
+            result = other
+        elif other == before:
+            result = ours
+        else:
+            result = ours
+            conflicts.append((key, ours, other))
+        if result is not ABSENT:
+            values[key] = result
+    return MergeResult(values, conflicts, resolved)
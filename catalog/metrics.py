@@ -0,0 +1,181 @@
+import contextlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+from catalog.writer import write_bytes_atomic
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RECENT_SPANS = 200
+DEFAULT_TEXTFILE_INTERVAL = 10.0  # seconds between Prometheus textfile rewrites
+
+# USD per million (prompt, completion) tokens, used for the spend estimate; override with set_prices()
+DEFAULT_TOKEN_PRICES = {
+    'gpt-4o': (2.50, 10.00),
+    'gpt-4o-mini': (0.15, 0.60),
+}
+
+
+class Span(NamedTuple):
+    name: str
+    started: float  # wall clock, seconds since the epoch
+    duration: float  # seconds
+    attributes: Dict[str, Any]
+    error: Optional[str]
+
+
+class SpanTotals:
+    __slots__ = ('count', 'errors', 'seconds', 'max_seconds', 'last_seconds')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_seconds = 0.0
+
+
+class Metrics:
+    # Timing spans and counters shared by the editor, the command line and the API client. Spans are
+    # kept in a short recent list plus running totals per name, and passed to any sinks (a JSON-lines
+    # log, a Prometheus textfile). Safe to use from worker threads.
+    def __init__(self, max_recent: int = DEFAULT_RECENT_SPANS):
+        self.lock = threading.Lock()
+        self.recent: Deque[Span] = deque(maxlen=max_recent)
+        self.totals: Dict[str, SpanTotals] = {}
+        self.counters: Dict[str, float] = {}
+        self.prices: Dict[str, tuple] = dict(DEFAULT_TOKEN_PRICES)
+        self.sinks: List[Callable[[Span], None]] = []
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Dict[str, Any]]:
+        # Yields the attribute dict, so the timed code can add what it learns (rows, tokens, bytes)
+        started = time.time()
+        start = time.perf_counter()
+        error = None
+        try:
+            yield attributes
+        except BaseException as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self.record(Span(name, started, time.perf_counter() - start, attributes, error))
+
+    def record(self, span: Span):
+        with self.lock:
+            self.recent.append(span)
+            totals = self.totals.get(span.name)
+            if totals is None:
+                totals = self.totals[span.name] = SpanTotals()
+            totals.count += 1
+            totals.errors += span.error is not None
+            totals.seconds += span.duration
+            totals.max_seconds = max(totals.max_seconds, span.duration)
+            totals.last_seconds = span.duration
+            sinks = list(self.sinks)
+        for sink in sinks:
+            try:
+                sink(span)
+            except Exception as e:
+                # A full disk or a removed directory must not break the editor
+                logger.warning("Failed to write metrics: %s", e)
+
+    def count(self, name: str, value: float = 1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_prices(self, prices: Dict[str, Any]):
+        self.prices.update({model: tuple(price) for model, price in prices.items()})
+
+    def record_tokens(self, model: str, prompt_tokens: int, completion_tokens: int,
+                      discount: float = 0.0) -> Optional[float]:
+        # Adds to the token counters and returns the estimated cost, None for a model without a price.
+        # discount is the share taken off the list price, e.g. 0.5 for the Batch API.
+        self.count('api.prompt_tokens', prompt_tokens)
+        self.count('api.completion_tokens', completion_tokens)
+        price = self.prices.get(model)
+        if price is None:
+            # Dated snapshots such as gpt-4o-2024-08-06 cost the same as their family
+            price = next((value for name, value in self.prices.items() if model.startswith(name + '-')), None)
+        if price is None:
+            return None
+        cost = (prompt_tokens * price[0] + completion_tokens * price[1]) / 1_000_000 * (1 - discount)
+        self.count('api.cost_usd', cost)
+        return cost
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'spans': {name: {'count': totals.count, 'errors': totals.errors, 'seconds': totals.seconds,
+                                 'max_seconds': totals.max_seconds, 'last_seconds': totals.last_seconds}
+                          for name, totals in self.totals.items()},
+                'counters': dict(self.counters),
+                'recent': list(self.recent),
+            }
+
+    def prometheus_text(self) -> str:
+        snapshot = self.snapshot()
+        lines = [
+            '# HELP localization_editor_span_seconds Time spent in each instrumented operation.',
+            '# TYPE localization_editor_span_seconds summary',
+        ]
+        for name, totals in sorted(snapshot['spans'].items()):
+            label = f'{{operation="{name}"}}'
+            lines.append(f"localization_editor_span_seconds_count{label} {totals['count']}")
+            lines.append(f"localization_editor_span_seconds_sum{label} {totals['seconds']:.6f}")
+        lines.append('# HELP localization_editor_span_errors_total Instrumented operations that raised.')
+        lines.append('# TYPE localization_editor_span_errors_total counter')
+        for name, totals in sorted(snapshot['spans'].items()):
+            lines.append(f'localization_editor_span_errors_total{{operation="{name}"}} {totals["errors"]}')
+        for name, value in sorted(snapshot['counters'].items()):
+            metric = 'localization_editor_' + re.sub(r'[^a-zA-Z0-9_]', '_', name) + '_total'
+            lines.append(f'# TYPE {metric} counter')
+            lines.append(f'{metric} {value:g}')
+        return '\n'.join(lines) + '\n'
+
+
+def span_record(span: Span) -> Dict[str, Any]:
+    return {'name': span.name, 'started': round(span.started, 3), 'duration_ms': round(span.duration * 1000, 3),
+            'error': span.error, **span.attributes}
+
+
+class JsonLinesSink:
+    # Appends one JSON object per finished span
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def __call__(self, span: Span):
+        line = json.dumps(span_record(span), ensure_ascii=False, default=str) + '\n'
+        with self.lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line)
+
+
+def write_json_lines(path: str, spans: Iterable[Span]) -> int:
+    payload = ''.join(json.dumps(span_record(span), ensure_ascii=False, default=str) + '\n' for span in spans)
+    return write_bytes_atomic(path, payload.encode('utf-8'))
+
+
+class PrometheusTextfileSink:
+    # Rewrites a textfile for node_exporter's textfile collector at most every `interval` seconds
+    def __init__(self, metrics: Metrics, path: str, interval: float = DEFAULT_TEXTFILE_INTERVAL):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.written = 0.0
+
+    def __call__(self, span: Span):
+        if time.monotonic() - self.written >= self.interval:
+            self.flush()
+
+    def flush(self):
+        self.written = time.monotonic()
+        write_bytes_atomic(self.path, self.metrics.prometheus_text().encode('utf-8'))
+
+
+METRICS = Metrics()  # the process-wide instance
@@ -0,0 +1,143 @@
+import json
+import logging
+import os
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from catalog.store import CompactStore
+from catalog.writer import write_bytes_atomic
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 2  # bumped when what is cached changes, e.g. unresolved `ns:` prefixes in key references
+
+
+class ScanResult(NamedTuple):
+    locales: CompactStore
+    all_files: Set[str]
+    file_locales: Dict[str, Set[str]]  # file_name -> locales that have it on disk
+
+
+class ScanCache:
+    # Parsed files keyed by absolute path, valid while (mtime, size) are unchanged. Used for locale
+    # files, whose dicts are copied into the catalog's store, and for source files' key references.
+    def __init__(self, cache_path: Optional[str] = None):
+        self.cache_path = cache_path
+        self.entries: Dict[str, Tuple[int, int, Any]] = {}
+        self.changed = False
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls, cache_path: str) -> 'ScanCache':
+        cache = cls(cache_path)
+        try:
+            with open(cache_path, 'rb') as f:
+                stored = pickle.load(f)
+            if stored.get('version') == CACHE_VERSION:
+                cache.entries = stored['entries']
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            # A corrupt or foreign cache is just a cold cache
+            logger.warning("Ignoring unreadable scan cache %s: %s", cache_path, e)
+        return cache
+
+    def get(self, path: str, mtime_ns: int, size: int) -> Optional[Any]:
+        entry = self.entries.get(path)
+        if entry is not None and entry[0] == mtime_ns and entry[1] == size:
+            self.hits += 1
+            return entry[2]
+        self.misses += 1
+        return None
+
+    def put(self, path: str, mtime_ns: int, size: int, data: Any):
+        self.entries[path] = (mtime_ns, size, data)
+        self.changed = True
+
+    def prune(self, root: str, seen: Set[str]):
+        # Forget files under this root that no longer exist; other roots are left alone
+        prefix = os.path.join(root, '')
+        stale = [path for path in self.entries if path.startswith(prefix) and path not in seen]
+        for path in stale:
+            del self.entries[path]
+        if stale:
+            self.changed = True
+
+    def save(self):
+        if not self.cache_path or not self.changed:
+            return
+        payload = pickle.dumps({'version': CACHE_VERSION, 'entries': self.entries}, protocol=pickle.HIGHEST_PROTOCOL)
+        write_bytes_atomic(self.cache_path, payload)
+        self.changed = False
+
+
+def list_locale_files(locales_path: str) -> List[Tuple[str, str, os.DirEntry]]:
+    # (locale, file_name, entry) for every JSON file, plus locales that have no files yet
+    found = []
+    with os.scandir(locales_path) as locale_dirs:
+        for locale_dir in locale_dirs:
+            if not locale_dir.is_dir():
+                continue
+            found.append((locale_dir.name, None, None))
+            with os.scandir(locale_dir.path) as files:
+                for entry in files:
+                    if entry.name.endswith('.json') and entry.is_file():
+                        found.append((locale_dir.name, entry.name, entry))
+    return found
+
+
+def parse_locale_file(path: str) -> Dict[str, Any]:
+    with open(path, 'rb') as f:
+        return json.loads(f.read().decode('utf-8'))
+
+
+def scan_locales_folder(
+        locales_path: str,
+        cache: Optional[ScanCache] = None,
+        max_workers: Optional[int] = None
+) -> ScanResult:
+    locales_path = os.path.abspath(locales_path)
+    listing = list_locale_files(locales_path)
+
+    locales = CompactStore()
+    all_files: Set[str] = set()
+    file_locales: Dict[str, Set[str]] = {}
+    parsed: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    pending = []
+    seen = set()
+
+    for locale, file_name, entry in listing:
+        locales.add_locale(locale)
+        if file_name is None:
+            continue
+        all_files.add(file_name)
+        file_locales.setdefault(file_name, set()).add(locale)
+        stat = entry.stat()
+        seen.add(entry.path)
+        data = cache.get(entry.path, stat.st_mtime_ns, stat.st_size) if cache is not None else None
+        if data is not None:
+            parsed[(locale, file_name)] = data
+        else:
+            pending.append((locale, file_name, entry.path, stat))
+
+    # Cache misses are read and parsed on a worker pool
+    if pending:
+        workers = max_workers or min(16, len(pending), (os.cpu_count() or 1) * 4)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(lambda job: parse_locale_file(job[2]), pending)
+            for (locale, file_name, path, stat), data in zip(pending, results):
+                parsed[(locale, file_name)] = data
+                if cache is not None:
+                    cache.put(path, stat.st_mtime_ns, stat.st_size, data)
+
+    if cache is not None:
+        cache.prune(locales_path, seen)
+
+    # Single pass into the compact store; files absent from a locale are back-filled empty
+    for file_name in sorted(all_files):
+        for locale, files in locales.items():
+            files[file_name] = parsed.get((locale, file_name), {})
+
+    return ScanResult(locales, all_files, file_locales)
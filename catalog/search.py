@@ -0,0 +1,139 @@
+import heapq
+from typing import Callable, Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Set, Tuple
+
+GRAM_SIZE = 3  # queries shorter than this are not searched
+DEFAULT_SEARCH_LIMIT = 50
+MAX_POSTINGS = 3  # postings intersected per query
+MAX_RANKED = 2000  # matches ranked per query; very common queries rank the first ones found
+SEPARATOR = '\0'  # between the fields of an entry's text; never part of a query
+
+
+class SearchHit(NamedTuple):
+    file_name: str
+    key: str
+    locale: Optional[str]  # locale whose value matched best, None when it was the key
+    score: float
+
+
+def normalize(text: str) -> str:
+    return text.casefold().replace(SEPARATOR, ' ')
+
+
+def grams(text: str) -> Set[str]:
+    return {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+
+
+def score_field(field: str, query: str, position: int) -> float:
+    # Whole value over prefix over word start over anywhere; shorter fields first among equals
+    if len(field) == len(query):
+        score = 100
+    elif position == 0:
+        score = 60
+    elif not field[position - 1].isalnum():
+        score = 40
+    else:
+        score = 20
+    return score - min(len(field), 1000) / 1000
+
+
+class SearchIndex:
+    # Inverted trigram index over every (file, key) entry: the key and its value in each locale.
+    # A query is looked up through the postings of its rarest trigrams and the candidates are checked
+    # against each entry's normalized text, so hits are exact substring matches.
+    def __init__(self, locales: Iterable[str]):
+        self.locales: List[str] = sorted(locales)
+        self.entries: Dict[str, Dict[str, int]] = {}  # file_name -> key -> entry id
+        self.names: List[Optional[Tuple[str, str]]] = []  # entry id -> (file_name, key), None once removed
+        self.texts: List[Optional[str]] = []  # entry id -> key and values, normalized and joined
+        self.postings: Dict[str, Set[int]] = {}
+
+    @classmethod
+    def build(cls, locales: Mapping[str, Mapping[str, Mapping[str, object]]], file_names: Iterable[str],
+              file_keys: Callable[[str], Iterable[str]]) -> 'SearchIndex':
+        # Reads the catalog without changing it, so it can run on a worker thread
+        index = cls(locales)
+        for file_name in file_names:
+            index.index_file(file_name, locales, file_keys(file_name))
+        return index
+
+    def index_file(self, file_name: str, locales: Mapping[str, Mapping[str, Mapping[str, object]]],
+                   keys: Iterable[str]):
+        files = [locales[locale].get(file_name, {}) for locale in self.locales]
+        keys = set(keys)
+        for key in list(self.entries.get(file_name, ())):
+            if key not in keys:
+                self.remove(file_name, key)
+        for key in keys:
+            self.update(file_name, key, [data.get(key) for data in files])
+
+    def entry_text(self, key: str, values: Sequence[object]) -> str:
+        fields = [key] + [value if isinstance(value, str) else '' for value in values]
+        return SEPARATOR.join(normalize(field) for field in fields)
+
+    def update(self, file_name: str, key: str, values: Sequence[object]):
+        # values are in self.locales order, None where a locale lacks the key
+        text = self.entry_text(key, values)
+        file_entries = self.entries.setdefault(file_name, {})
+        entry = file_entries.get(key)
+        if entry is None:
+            entry = len(self.texts)
+            file_entries[key] = entry
+            self.names.append((file_name, key))
+            self.texts.append(text)
+            old = set()
+        else:
+            old = grams(self.texts[entry])
+            self.texts[entry] = text
+        new = grams(text)
+        for gram in old - new:
+            postings = self.postings[gram]
+            postings.discard(entry)
+            if not postings:
+                del self.postings[gram]
+        for gram in new - old:
+            self.postings.setdefault(gram, set()).add(entry)
+
+    def remove(self, file_name: str, key: str):
+        entry = self.entries.get(file_name, {}).pop(key, None)
+        if entry is None:
+            return
+        for gram in grams(self.texts[entry]):
+            postings = self.postings[gram]
+            postings.discard(entry)
+            if not postings:
+                del self.postings[gram]
+        self.names[entry] = None
+        self.texts[entry] = None
+
+    def search(self, query: str, limit: int = DEFAULT_SEARCH_LIMIT) -> List[SearchHit]:
+        query = normalize(query.strip())
+        if len(query) < GRAM_SIZE:
+            return []
+        # Intersecting the rarest few postings narrows enough; the substring check does the rest
+        candidates = None
+        for postings in sorted((self.postings.get(gram, set()) for gram in grams(query)), key=len)[:MAX_POSTINGS]:
+            candidates = postings if candidates is None else candidates & postings
+            if not candidates:
+                return []
+
+        # An entry is ranked by its first matching field, the key before any value
+        scored = []
+        for entry in candidates:
+            text = self.texts[entry]
+            position = text.find(query)
+            if position < 0:
+                continue  # every trigram matched, but not in sequence
+            start = text.rfind(SEPARATOR, 0, position) + 1
+            end = text.find(SEPARATOR, position)
+            field = text[start:end] if end >= 0 else text[start:]
+            column = text.count(SEPARATOR, 0, start)
+            score = score_field(field, query, position - start) + (5 if column == 0 else 0)
+            scored.append((score, entry, column))
+            if len(scored) >= MAX_RANKED:
+                break
+
+        hits = []
+        for score, entry, column in heapq.nlargest(limit, scored):
+            file_name, key = self.names[entry]
+            hits.append(SearchHit(file_name, key, self.locales[column - 1] if column else None, score))
+        return hits
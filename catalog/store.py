@@ -0,0 +1,234 @@
+import sys
+from collections.abc import Mapping, MutableMapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from catalog.index import ABSENT
+
+
+class Column:
+    # One locale's values for a file, addressed by the file's key index. `order` stays None while the
+    # locale's keys follow the key table order and becomes an explicit index list once they do not,
+    # so files are written back in the order they were read.
+    __slots__ = ('values', 'order', 'count', 'last')
+
+    def __init__(self):
+        self.values: List[Any] = []
+        self.order: Optional[List[int]] = None
+        self.count = 0
+        self.last = -1  # highest key index present while order is None
+
+
+class FileTable:
+    # The keys of one file, interned and stored once, and a value column per locale that has the file
+    __slots__ = ('keys', 'key_index', 'columns')
+
+    def __init__(self):
+        self.keys: List[str] = []
+        self.key_index: Dict[str, int] = {}
+        self.columns: Dict[str, Column] = {}
+
+    def index_of(self, key: str) -> int:
+        index = self.key_index.get(key)
+        if index is None:
+            key = sys.intern(key)
+            index = len(self.keys)
+            self.keys.append(key)
+            self.key_index[key] = index
+        return index
+
+
+def intern_value(value: Any) -> Any:
+    # The same translation shows up in many files of a locale
+    return sys.intern(value) if type(value) is str else value
+
+
+class FileView(MutableMapping):
+    # dict-like view of one locale's file: key -> value
+    __slots__ = ('table', 'column')
+
+    def __init__(self, table: FileTable, column: Column):
+        self.table = table
+        self.column = column
+
+    def _index(self, key: str) -> int:
+        index = self.table.key_index.get(key)
+        if index is None or index >= len(self.column.values) or self.column.values[index] is ABSENT:
+            return -1
+        return index
+
+    def __getitem__(self, key: str) -> Any:
+        index = self._index(key)
+        if index < 0:
+            raise KeyError(key)
+        return self.column.values[index]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        index = self._index(key)
+        return default if index < 0 else self.column.values[index]
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self._index(key) >= 0
+
+    def __setitem__(self, key: str, value: Any):
+        column = self.column
+        index = self.table.index_of(key)
+        values = column.values
+        if index >= len(values):
+            values.extend([ABSENT] * (index + 1 - len(values)))
+        if values[index] is ABSENT:
+            column.count += 1
+            if column.order is not None:
+                column.order.append(index)
+            elif index > column.last:
+                column.last = index
+            else:
+                # A key that sits earlier in the table was added to this locale after later ones
+                column.order = [i for i in range(len(values)) if values[i] is not ABSENT] + [index]
+        values[index] = intern_value(value)
+
+    def __delitem__(self, key: str):
+        index = self._index(key)
+        if index < 0:
+            raise KeyError(key)
+        column = self.column
+        column.values[index] = ABSENT
+        column.count -= 1
+        if column.order is not None:
+            column.order.remove(index)
+
+    def __iter__(self) -> Iterator[str]:
+        keys = self.table.keys
+        column = self.column
+        if column.order is not None:
+            for index in column.order:
+                yield keys[index]
+            return
+        for index, value in enumerate(column.values):
+            if value is not ABSENT:
+                yield keys[index]
+
+    def items(self):
+        keys = self.table.keys
+        values = self.column.values
+        return [(keys[index], values[index]) for index in self._indices()]
+
+    def _indices(self) -> List[int]:
+        column = self.column
+        if column.order is not None:
+            return list(column.order)
+        return [index for index, value in enumerate(column.values) if value is not ABSENT]
+
+    def __len__(self) -> int:
+        return self.column.count
+
+    def __repr__(self) -> str:
+        return f"FileView({dict(self.items())!r})"
+
+
+class LocaleView(MutableMapping):
+    # dict-like view of one locale: file_name -> FileView
+    __slots__ = ('store', 'locale')
+
+    def __init__(self, store: 'CompactStore', locale: str):
+        self.store = store
+        self.locale = locale
+
+    def __getitem__(self, file_name: str) -> FileView:
+        table = self.store.tables.get(file_name)
+        column = table.columns.get(self.locale) if table is not None else None
+        if column is None:
+            raise KeyError(file_name)
+        return FileView(table, column)
+
+    def get(self, file_name: str, default: Any = None) -> Any:
+        try:
+            return self[file_name]
+        except KeyError:
+            return default
+
+    def __contains__(self, file_name: object) -> bool:
+        table = self.store.tables.get(file_name)
+        return table is not None and self.locale in table.columns
+
+    def __setitem__(self, file_name: str, data: Mapping):
+        # Replaces this locale's copy of the file with the contents of `data`
+        table = self.store.tables.get(file_name)
+        if table is None:
+            table = self.store.tables[file_name] = FileTable()
+        table.columns[self.locale] = Column()
+        view = FileView(table, table.columns[self.locale])
+        for key, value in data.items():
+            view[key] = value
+
+    def setdefault(self, file_name: str, default: Optional[Mapping] = None) -> FileView:
+        if file_name not in self:
+            self[file_name] = default or {}
+        return self[file_name]
+
+    def __delitem__(self, file_name: str):
+        table = self.store.tables.get(file_name)
+        if table is None or self.locale not in table.columns:
+            raise KeyError(file_name)
+        del table.columns[self.locale]
+        if not table.columns:
+            # Last locale gone (e.g. evicted in lazy mode): drop the key table too
+            del self.store.tables[file_name]
+
+    def __iter__(self) -> Iterator[str]:
+        for file_name, table in list(self.store.tables.items()):
+            if self.locale in table.columns:
+                yield file_name
+
+    def __len__(self) -> int:
+        return sum(1 for table in self.store.tables.values() if self.locale in table.columns)
+
+
+class CompactStore(MutableMapping):
+    # The catalog as locale -> file_name -> {key: value}, with the same mapping interface as the nested
+    # dicts it replaces. Keys are stored once per file rather than once per locale, and each locale's
+    # values are a list addressed by key index.
+    def __init__(self, locales: Iterable[str] = ()):
+        self.tables: Dict[str, FileTable] = {}
+        self.views: Dict[str, LocaleView] = {}
+        for locale in locales:
+            self.add_locale(locale)
+
+    def add_locale(self, locale: str) -> LocaleView:
+        view = self.views.get(locale)
+        if view is None:
+            view = self.views[locale] = LocaleView(self, locale)
+        return view
+
+    def __getitem__(self, locale: str) -> LocaleView:
+        return self.views[locale]
+
+    def __setitem__(self, locale: str, files: Mapping):
+        view = self.add_locale(locale)
+        for file_name in list(view):
+            del view[file_name]
+        for file_name, data in files.items():
+            view[file_name] = data
+
+    def __delitem__(self, locale: str):
+        view = self.views.pop(locale)
+        for table in self.tables.values():
+            table.columns.pop(view.locale, None)
+
+    def __contains__(self, locale: object) -> bool:
+        return locale in self.views
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.views)
+
+    def __len__(self) -> int:
+        return len(self.views)
+
+    def file_keys(self, file_name: str) -> List[str]:
+        # Keys present in any locale of the file, in key table order
+        table = self.tables.get(file_name)
+        if table is None:
+            return []
+        present = set()
+        for column in list(table.columns.values()):  # may be read from a worker thread
+            present.update(index for index, value in enumerate(column.values) if value is not ABSENT)
+        return [table.keys[index] for index in sorted(present)]
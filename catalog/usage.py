@@ -0,0 +1,156 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from catalog.scanner import ScanCache
+
+DEFAULT_SOURCE_EXTENSIONS = ('.js', '.jsx', '.ts', '.tsx')
+IGNORED_DIRECTORIES = {'node_modules', '.git', '.next', 'dist', 'build', 'out', 'coverage'}
+DEFAULT_NAMESPACE = 'common'  # next-i18next's namespace when a component names none
+
+# t('key'), t("key"), t(`key`) and i18n.t(...); `ns:key` names the namespace explicitly
+TRANSLATE_CALL = re.compile(r"""\bt\(\s*(['"`])((?:\\.|(?!\1).)*?)\1""", re.DOTALL)
+# t(variable), t(prefix + key) and the like: a key that is only known at run time
+COMPUTED_CALL = re.compile(r"""\bt\(\s*(?=[^\s'"`)])""")
+USE_TRANSLATION = re.compile(r"""\buseTranslation\(\s*(\[[^\]]*\]|['"][^'"]*['"])""")
+QUOTED = re.compile(r"""['"]([^'"]*)['"]""")
+
+
+class Reference(NamedTuple):
+    namespace: Optional[str]  # locale file name without .json; None when the file could not tell
+    key: str  # as written; an `ns:` prefix is resolved against the catalog's files in build_usage_report
+    line: int
+
+
+class SourceUsage(NamedTuple):
+    references: Dict[str, List[Reference]]  # source path -> references in it
+    dynamic: int  # t() calls with a computed key, which cannot be checked
+    files_parsed: int  # files read this time, the rest came from the cache
+
+
+class UsageReport(NamedTuple):
+    unused: Dict[str, Set[str]]  # locale file name -> keys no source file references
+    undefined: List[Tuple[str, Reference]]  # (source path, reference) for keys missing from the catalog
+    references: int
+    dynamic: int
+
+
+def list_source_files(source_path: str, extensions: Iterable[str] = DEFAULT_SOURCE_EXTENSIONS) -> List[str]:
+    extensions = tuple(extensions)
+    found = []
+    for directory, subdirectories, files in os.walk(source_path):
+        subdirectories[:] = [name for name in subdirectories if name not in IGNORED_DIRECTORIES]
+        found.extend(os.path.join(directory, name) for name in files if name.endswith(extensions))
+    return found
+
+
+def extract_references(text: str) -> Tuple[List[Reference], int]:
+    # A component's keys live in the first namespace passed to useTranslation()
+    namespace = None
+    declared = USE_TRANSLATION.search(text)
+    if declared:
+        names = QUOTED.findall(declared.group(1))
+        namespace = names[0] if names else DEFAULT_NAMESPACE
+
+    references = []
+    dynamic = len(COMPUTED_CALL.findall(text))
+    for match in TRANSLATE_CALL.finditer(text):
+        quote, key = match.group(1), match.group(2)
+        if quote == '`' and '${' in key:
+            dynamic += 1
+            continue
+        key = key.replace('\\' + quote, quote)
+        references.append(Reference(namespace, key, text.count('\n', 0, match.start()) + 1))
+    return references, dynamic
+
+
+def resolve_reference(reference: Reference, file_names: Set[str]) -> Reference:
+    # `ns:key` only names a namespace when ns.json is a locale file; otherwise the colon belongs to
+    # the key, as in t("Error: {{msg}}")
+    prefix, separator, key = reference.key.partition(':')
+    if separator and prefix + '.json' in file_names:
+        return reference._replace(namespace=prefix, key=key)
+    return reference
+
+
+def scan_source_usage(
+        source_path: str,
+        cache: Optional[ScanCache] = None,
+        extensions: Iterable[str] = DEFAULT_SOURCE_EXTENSIONS,
+        max_workers: Optional[int] = None
+) -> SourceUsage:
+    # Files are read on a worker pool; unchanged files come from the cache by (mtime, size)
+    source_path = os.path.abspath(source_path)
+    paths = list_source_files(source_path, extensions)
+
+    def parse(path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return path, None, False
+        if cache is not None:
+            cached = cache.get(path, stat.st_mtime_ns, stat.st_size)
+            if cached is not None:
+                return path, cached, False
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            parsed = extract_references(f.read())
+        return path, (stat.st_mtime_ns, stat.st_size, parsed), True
+
+    references: Dict[str, List[Reference]] = {}
+    dynamic = 0
+    files_parsed = 0
+    workers = max_workers or min(16, (os.cpu_count() or 1) + 4)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for path, result, parsed in executor.map(parse, paths):
+            if result is None:
+                continue
+            if parsed:
+                mtime_ns, size, result = result
+                files_parsed += 1
+                if cache is not None:
+                    cache.put(path, mtime_ns, size, result)
+            file_references, file_dynamic = result
+            if file_references:
+                references[path] = file_references
+            dynamic += file_dynamic
+
+    if cache is not None:
+        cache.prune(source_path, set(paths))
+    return SourceUsage(references, dynamic, files_parsed)
+
+
+def build_usage_report(catalog_keys: Dict[str, Set[str]], usage: SourceUsage,
+                       all_files: Optional[Set[str]] = None) -> UsageReport:
+    # catalog_keys: locale file name -> keys in any locale. Only these files are judged, so a
+    # partially loaded catalog reports nothing about the files it has not read; references to
+    # files outside all_files are undefined either way.
+    used: Dict[str, Set[str]] = {}
+    unqualified: Set[str] = set()
+    undefined = []
+    count = 0
+    file_names = set(catalog_keys) | (all_files or set())
+    for path, references in usage.references.items():
+        for reference in references:
+            count += 1
+            reference = resolve_reference(reference, file_names)
+            if reference.namespace is None:
+                unqualified.add(reference.key)
+                if not any(reference.key in keys for keys in catalog_keys.values()):
+                    undefined.append((path, reference))
+                continue
+            file_name = reference.namespace + '.json'
+            used.setdefault(file_name, set()).add(reference.key)
+            keys = catalog_keys.get(file_name)
+            if keys is not None and reference.key not in keys:
+                undefined.append((path, reference))
+            elif all_files is not None and file_name not in all_files:
+                undefined.append((path, reference))
+
+    unused = {}
+    for file_name, keys in catalog_keys.items():
+        dead = keys - used.get(file_name, set()) - unqualified
+        if dead:
+            unused[file_name] = dead
+    undefined.sort(key=lambda item: (item[1].namespace or '', item[1].key, item[0], item[1].line))
+    return UsageReport(unused, undefined, count, usage.dynamic)
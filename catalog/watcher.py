@@ -0,0 +1,49 @@
+import os
+from typing import Dict, Iterable, List, Tuple
+
+from catalog.scanner import list_locale_files
+
+DEFAULT_WATCH_INTERVAL = 2000  # milliseconds between checks of the locales folder
+
+FileState = Tuple[int, int]  # (mtime_ns, size)
+
+
+class FolderWatcher:
+    # Detects locale files that were changed, created or deleted outside the editor by comparing
+    # each file's modification time and size with the last check. Only the standard library is
+    # used, so it is a polling check: snapshot() lists the folder and can run on a worker thread,
+    # diff() is applied on the thread that owns the catalog.
+    def __init__(self, locales_path: str):
+        self.locales_path = locales_path
+        self.state: Dict[Tuple[str, str], FileState] = {}
+
+    def snapshot(self) -> Dict[Tuple[str, str], FileState]:
+        state = {}
+        for locale, file_name, entry in list_locale_files(self.locales_path):
+            if file_name is None:
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue  # deleted while listing
+            state[(locale, file_name)] = (stat.st_mtime_ns, stat.st_size)
+        return state
+
+    def reset(self):
+        self.state = self.snapshot()
+
+    def diff(self, state: Dict[Tuple[str, str], FileState]) -> List[Tuple[str, str]]:
+        # (locale, file_name) pairs that differ from the previous check; `state` becomes the new baseline
+        changed = [target for target in state.keys() | self.state.keys() if state.get(target) != self.state.get(target)]
+        self.state = state
+        return sorted(changed)
+
+    def record(self, targets: Iterable[Tuple[str, str]]):
+        # Files the editor wrote itself are not external changes
+        for locale, file_name in targets:
+            try:
+                stat = os.stat(os.path.join(self.locales_path, locale, file_name))
+            except FileNotFoundError:
+                self.state.pop((locale, file_name), None)
+                continue
+            self.state[(locale, file_name)] = (stat.st_mtime_ns, stat.st_size)
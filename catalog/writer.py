@@ -0,0 +1,85 @@
+import json
+import os
+import stat
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterable, List, Mapping, Optional, Tuple
+
+
+def current_umask() -> int:
+    # os.umask can only be read by setting it, so this runs once, before any writer threads start
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+UMASK = current_umask()
+
+
+def serialize_locale_file(data: Mapping[str, Any]) -> bytes:
+    # Same layout the editor has always written, so untouched files produce no diff
+    if not isinstance(data, dict):
+        data = dict(data.items())
+    return json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+
+
+def write_json_atomic(file_path: str, data: Mapping[str, Any]) -> int:
+    return write_bytes_atomic(file_path, serialize_locale_file(data))
+
+
+def write_bytes_atomic(file_path: str, payload: bytes) -> int:
+    directory = os.path.dirname(file_path) or '.'
+    os.makedirs(directory, exist_ok=True)
+
+    # mkstemp creates the file readable by its owner only; the rename keeps the target's mode, or the
+    # usual mode for a new file, so other readers of the folder still can
+    try:
+        mode = stat.S_IMODE(os.stat(file_path).st_mode)
+    except FileNotFoundError:
+        mode = 0o666 & ~UMASK
+
+    # Write next to the target so the rename stays on the same filesystem
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(file_path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            os.chmod(tmp_path, mode)
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return len(payload)
+
+
+def write_dirty_files(
+        locales_path: str,
+        locales: Mapping[str, Mapping[str, Mapping[str, Any]]],
+        dirty: Iterable[Tuple[str, str]],
+        max_workers: Optional[int] = None
+) -> Tuple[int, int, List[Tuple[Tuple[str, str], Exception]]]:
+    targets = sorted(set(dirty))
+    if not targets:
+        return 0, 0, []
+
+    def write_one(target: Tuple[str, str]) -> int:
+        locale, file_name = target
+        file_path = os.path.join(locales_path, locale, file_name)
+        return write_json_atomic(file_path, locales[locale][file_name])
+
+    bytes_written = 0
+    files_written = 0
+    failures = []
+    workers = max_workers or min(8, len(targets))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [(target, executor.submit(write_one, target)) for target in targets]
+        for target, future in futures:
+            try:
+                bytes_written += future.result()
+                files_written += 1
+            except Exception as e:
+                failures.append((target, e))
+
+    return files_written, bytes_written, failures
@@ -0,0 +1,301 @@
+# Command-line access to a locales folder without the editor window, e.g. for CI:
+#
+#     python cli.py stats <locales folder>
+#     python cli.py check <locales folder> [--locale fr] [--min-completion 100]
+#     python cli.py fill <locales folder> [--source en] [--locale fr] [--code <source folder>] [--dry-run] [--batch]
+#     python cli.py batch <locales folder> [--wait]
+#     python cli.py usage <locales folder> <source folder> [--strict]
+#
+# Any command takes --metrics-log <file> (one JSON line per timed operation and API request) and
+# --metrics-textfile <file> (totals for node_exporter's textfile collector, written on exit).
+#
+# Every command writes one JSON object per line to stdout. `check` exits with status 1 when a
+# locale is below the required completion, `fill` when some translations could not be made,
+# `batch` when some batch translations failed and `usage --strict` when there are unused or
+# undefined keys.
+import argparse
+import functools
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from catalog.config import config_dir
+from catalog.core import Catalog
+from catalog.fill import DEFAULT_BATCH_TOKENS, find_missing_translations, plan_fill_batches, run_fill_batches
+from catalog.metrics import METRICS, JsonLinesSink, PrometheusTextfileSink
+from catalog.scanner import ScanCache
+from catalog.usage import UsageReport, build_usage_report, scan_source_usage
+
+
+def emit(record: Dict[str, Any], flush: bool = False):
+    sys.stdout.write(json.dumps(record, ensure_ascii=False) + '\n')
+    if flush:
+        sys.stdout.flush()
+
+
+def completion(keys: int, empty: int) -> float:
+    return round((keys - empty) / keys * 100, 2) if keys else 100.0
+
+
+def load_catalog(args) -> Catalog:
+    catalog = Catalog(os.path.abspath(args.locales_path))
+    cache_path = None if args.no_cache else os.path.join(config_dir(), 'scan_cache.pickle')
+    catalog.scan(cache_path=cache_path)
+    return catalog
+
+
+def load_usage(catalog: Catalog, source_path: str, no_cache: bool) -> UsageReport:
+    cache = None if no_cache else ScanCache.load(os.path.join(config_dir(), 'usage_cache.pickle'))
+    usage = scan_source_usage(source_path, cache)
+    if cache is not None:
+        cache.save()
+    return build_usage_report(catalog.loaded_file_keys(), usage, catalog.all_files)
+
+
+def selected_locales(catalog: Catalog, locales: Optional[List[str]]) -> List[str]:
+    if not locales:
+        return sorted(catalog.locales)
+    unknown = [locale for locale in locales if locale not in catalog.locales]
+    if unknown:
+        raise SystemExit(f"Unknown locale(s): {', '.join(unknown)}")
+    return sorted(locales)
+
+
+def command_stats(args) -> int:
+    catalog = load_catalog(args)
+    locales = selected_locales(catalog, args.locale)
+    totals = {locale: [0, 0] for locale in locales}
+    for file_name in sorted(catalog.all_files):
+        file_stats = catalog.file_stats(file_name)
+        for locale in locales:
+            stats = file_stats[locale]
+            totals[locale][0] += stats.keys
+            totals[locale][1] += stats.empty
+            emit({'type': 'file', 'file': file_name, 'locale': locale, 'keys': stats.keys,
+                  'filled': stats.keys - stats.empty, 'empty': stats.empty,
+                  'completion': completion(stats.keys, stats.empty),
+                  'missing_file': catalog.is_file_missing(locale, file_name)})
+    for locale, (keys, empty) in totals.items():
+        emit({'type': 'locale', 'locale': locale, 'keys': keys, 'filled': keys - empty, 'empty': empty,
+              'completion': completion(keys, empty)})
+    keys = sum(total[0] for total in totals.values())
+    empty = sum(total[1] for total in totals.values())
+    emit({'type': 'total', 'files': len(catalog.all_files), 'locales': len(locales), 'values': keys,
+          'empty': empty, 'completion': completion(keys, empty)})
+    return 0
+
+
+def command_check(args) -> int:
+    catalog = load_catalog(args)
+    locales = selected_locales(catalog, args.locale)
+    totals = {locale: [0, 0] for locale in locales}
+    for file_name in sorted(catalog.all_files):
+        keys = sorted(catalog.file_keys(file_name))
+        for locale in locales:
+            if catalog.is_file_missing(locale, file_name):
+                emit({'type': 'missing_file', 'file': file_name, 'locale': locale})
+            data = catalog.locales[locale].get(file_name, {})
+            totals[locale][0] += len(keys)
+            for key in keys:
+                if not data.get(key):
+                    totals[locale][1] += 1
+                    emit({'type': 'missing', 'file': file_name, 'locale': locale, 'key': key})
+
+    failed = []
+    for locale, (keys, empty) in totals.items():
+        locale_completion = completion(keys, empty)
+        if locale_completion < args.min_completion:
+            failed.append(locale)
+        emit({'type': 'locale', 'locale': locale, 'keys': keys, 'empty': empty,
+              'completion': locale_completion, 'passed': locale_completion >= args.min_completion})
+    emit({'type': 'result', 'passed': not failed, 'failed_locales': failed, 'min_completion': args.min_completion})
+    return 1 if failed else 0
+
+
+def command_fill(args) -> int:
+    catalog = load_catalog(args)
+    if args.source not in catalog.locales:
+        raise SystemExit(f"Unknown source locale: {args.source}")
+    locales = set(selected_locales(catalog, args.locale)) - {args.source}
+    # With the source code at hand, keys it no longer references are not translated
+    unused = load_usage(catalog, args.code, args.no_cache).unused if args.code else {}
+
+    plan = []
+    for file_name in sorted(catalog.all_files):
+        missing = find_missing_translations(catalog.locales, file_name, args.source, unused.get(file_name))
+        missing = {locale: phrases for locale, phrases in missing.items() if locale in locales}
+        batches = plan_fill_batches(file_name, args.source, missing, max_tokens=args.batch_tokens)
+        plan.extend(batches)
+        for batch in batches:
+            emit({'type': 'batch', 'file': file_name, 'locale': batch.target_locale, 'keys': len(batch.phrases)})
+    if args.dry_run or not plan:
+        emit({'type': 'result', 'batches': len(plan), 'filled': 0, 'failed': 0, 'dry_run': args.dry_run})
+        return 0
+
+    if not os.environ.get('OPENAI_API_KEY'):
+        raise SystemExit("Please set the OPENAI_API_KEY environment variable.")
+
+    # The client is only imported here so stats and check never pay for it
+    from clients.memory import TranslationMemory, translate_batch
+    from clients.oai import configure_client, generate_localization_batch
+
+    settings = {'timeout': args.timeout, 'max_retries': args.max_retries,
+                'requests_per_minute': args.requests_per_minute, 'tokens_per_minute': args.tokens_per_minute}
+    configure_client(**{name: value for name, value in settings.items() if value is not None})
+    if args.batch:
+        from clients.batch import BatchJobStore, submit_batch_jobs
+        store = BatchJobStore.load(os.path.join(config_dir(), 'batch_jobs.json'))
+        for job in submit_batch_jobs(plan, catalog.locales_path, args.context):
+            store.put(job)
+            emit({'type': 'batch_job', 'batch_id': job.batch_id, 'status': job.status, 'requests': len(job.requests)})
+        return 0
+    if args.no_memory:
+        translate = generate_localization_batch
+    else:
+        memory = TranslationMemory(os.path.join(config_dir(), 'translation_memory.sqlite3'))
+        memory.seed_from_catalog(catalog.locales, args.source)
+        translate = functools.partial(translate_batch, memory)
+
+    def streamed(file_name, locale, key, value):
+        emit({'type': 'translation', 'file': file_name, 'locale': locale, 'key': key, 'value': value}, flush=True)
+
+    result = run_fill_batches(plan, translate, context=args.context, on_translation=streamed)
+    catalog.fill_values(result.translations)
+    for file_name, locale, key, error in result.failures:
+        emit({'type': 'failed', 'file': file_name, 'locale': locale, 'key': key, 'error': str(error)})
+
+    saved = catalog.save()
+    for (locale, file_name), error in saved.failures:
+        emit({'type': 'save_failed', 'file': file_name, 'locale': locale, 'error': str(error)})
+    counters = METRICS.snapshot()['counters']
+    emit({'type': 'result', 'batches': len(plan), 'requests': result.requests,
+          'filled': sum(len(values) for values in result.translations.values()),
+          'failed': len(result.failures), 'error': str(result.error) if result.error else None,
+          'files_written': saved.files_written,
+          'bytes_written': saved.bytes_written, 'prompt_tokens': counters.get('api.prompt_tokens', 0),
+          'completion_tokens': counters.get('api.completion_tokens', 0),
+          'cost_usd': round(counters.get('api.cost_usd', 0), 6), 'memory_hits': counters.get('memory.hits', 0),
+          'memory_misses': counters.get('memory.misses', 0),
+          'memory_evictions': counters.get('memory.evictions', 0)})
+    return 1 if result.failures or saved.failures else 0
+
+
+def command_batch(args) -> int:
+    # Checks the folder's Batch API jobs; finished ones are applied to empty values and saved
+    if not os.environ.get('OPENAI_API_KEY'):
+        raise SystemExit("Please set the OPENAI_API_KEY environment variable.")
+    from clients.batch import APPLIED, FINISHED_STATUSES, BatchJobStore, download_batch_results, refresh_batch_job
+
+    store = BatchJobStore.load(os.path.join(config_dir(), 'batch_jobs.json'))
+    catalog = load_catalog(args)
+    failed = 0
+    while True:
+        pending = []
+        for job in store.for_folder(catalog.locales_path):
+            if job.status == APPLIED:
+                continue
+            job = refresh_batch_job(job)
+            emit({'type': 'batch_job', 'batch_id': job.batch_id, 'status': job.status, 'requests': len(job.requests),
+                  'completed': job.completed, 'failed': job.failed}, flush=True)
+            if job.status not in FINISHED_STATUSES:
+                store.put(job)
+                pending.append(job)
+                continue
+            results = download_batch_results(job)
+            catalog.fill_values(results.translations)
+            for file_name, locale, key, error in results.failures:
+                emit({'type': 'failed', 'file': file_name, 'locale': locale, 'key': key, 'error': error})
+            failed += len(results.failures)
+            saved = catalog.save()
+            for (locale, file_name), error in saved.failures:
+                emit({'type': 'save_failed', 'file': file_name, 'locale': locale, 'error': str(error)})
+            failed += len(saved.failures)
+            if not saved.failures:
+                store.put(job._replace(status=APPLIED))
+            emit({'type': 'applied', 'batch_id': job.batch_id,
+                  'filled': sum(len(values) for values in results.translations.values()),
+                  'failed': len(results.failures), 'files_written': saved.files_written}, flush=True)
+        if not (args.wait and pending):
+            emit({'type': 'result', 'pending': len(pending), 'failed': failed})
+            return 1 if failed else 0
+        time.sleep(args.poll_interval)
+
+
+def command_usage(args) -> int:
+    catalog = load_catalog(args)
+    report = load_usage(catalog, args.source_path, args.no_cache)
+    for file_name in sorted(report.unused):
+        for key in sorted(report.unused[file_name]):
+            emit({'type': 'unused', 'file': file_name, 'key': key})
+    for path, reference in report.undefined:
+        emit({'type': 'undefined', 'file': f"{reference.namespace}.json" if reference.namespace else None,
+              'key': reference.key, 'path': os.path.relpath(path, args.source_path), 'line': reference.line})
+    unused = sum(len(keys) for keys in report.unused.values())
+    emit({'type': 'result', 'references': report.references, 'dynamic': report.dynamic,
+          'unused': unused, 'undefined': len(report.undefined)})
+    return 1 if args.strict and (unused or report.undefined) else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Inspect and fill a locales folder without the editor window.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_command(name, help_text, handler):
+        command = subparsers.add_parser(name, help=help_text)
+        command.add_argument('locales_path', help="Folder with one directory of JSON files per locale")
+        command.add_argument('--locale', action='append', help="Only this locale (repeatable)")
+        command.add_argument('--no-cache', action='store_true', help="Do not use the on-disk parse cache")
+        command.add_argument('--metrics-log', help="Append the timing of each operation to this JSON-lines file")
+        command.add_argument('--metrics-textfile', help="Write timings and token totals to this Prometheus textfile")
+        command.set_defaults(handler=handler)
+        return command
+
+    add_command('stats', "Completion per file and locale", command_stats)
+
+    check = add_command('check', "List missing values and fail below a completion threshold", command_check)
+    check.add_argument('--min-completion', type=float, default=100.0,
+                       help="Lowest passing completion percentage per locale (default 100)")
+
+    fill = add_command('fill', "Translate missing values with OpenAI and save them", command_fill)
+    fill.add_argument('--source', default='en', help="Locale to translate from (default en)")
+    fill.add_argument('--context', help="Context passed with every request")
+    fill.add_argument('--batch-tokens', type=int, default=DEFAULT_BATCH_TOKENS,
+                      help=f"Estimated output tokens per request (default {DEFAULT_BATCH_TOKENS})")
+    fill.add_argument('--no-memory', action='store_true', help="Do not use the translation memory")
+    fill.add_argument('--code', help="Source code folder; keys it does not reference are skipped")
+    fill.add_argument('--dry-run', action='store_true', help="Only list the batches that would be sent")
+    fill.add_argument('--batch', action='store_true',
+                      help="Submit through the Batch API at half price instead; see the batch command")
+    fill.add_argument('--timeout', type=float, help="Seconds to wait for the API before retrying (default 60)")
+    fill.add_argument('--max-retries', type=int, help="Retries per request after errors and 429s (default 4)")
+    fill.add_argument('--requests-per-minute', type=float, help="Stay under this many requests per minute")
+    fill.add_argument('--tokens-per-minute', type=float, help="Stay under this many tokens per minute")
+
+    batch = add_command('batch', "Check Batch API fills; apply and save the finished ones", command_batch)
+    batch.add_argument('--wait', action='store_true', help="Keep checking until every job has finished")
+    batch.add_argument('--poll-interval', type=float, default=60.0, help="Seconds between checks with --wait")
+
+    usage = add_command('usage', "List keys the source code does not use and references to missing keys",
+                        command_usage)
+    usage.add_argument('source_path', help="Source code folder to scan for t('...') calls")
+    usage.add_argument('--strict', action='store_true', help="Exit with status 1 if anything is reported")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.metrics_log:
+        METRICS.sinks.append(JsonLinesSink(args.metrics_log))
+    if not args.metrics_textfile:
+        return args.handler(args)
+    textfile = PrometheusTextfileSink(METRICS, args.metrics_textfile)
+    try:
+        return args.handler(args)
+    finally:
+        textfile.flush()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from catalog.fill import FillBatch
+from catalog.metrics import METRICS
+from catalog.writer import write_bytes_atomic
+from clients.oai import (BATCH_TEMPERATURE, ApiClient, build_batch_messages, get_client, object_schema,
+                         structured_output_request)
+
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = '/v1/chat/completions'
+COMPLETION_WINDOW = '24h'  # the only window the Batch API offers
+MAX_BATCH_REQUESTS = 50_000  # per input file
+BATCH_DISCOUNT = 0.5  # batch requests cost half the list price
+DEFAULT_POLL_INTERVAL = 60_000  # milliseconds between status checks in the editor
+FINISHED_STATUSES = {'completed', 'failed', 'expired', 'cancelled'}
+APPLIED = 'applied'  # our own status once the results are in the catalog
+
+
+class BatchRequest(NamedTuple):
+    file_name: str
+    target_locale: str
+    keys: List[str]
+
+
+class BatchJob(NamedTuple):
+    batch_id: str
+    locales_path: str
+    source_locale: str
+    model_id: str
+    created: float
+    status: str  # the Batch API status, or APPLIED
+    requests: Dict[str, BatchRequest]  # custom_id -> what the request translates
+    output_file_id: Optional[str] = None
+    error_file_id: Optional[str] = None
+    completed: int = 0
+    failed: int = 0
+
+
+class BatchResults(NamedTuple):
+    translations: Dict[Tuple[str, str], Dict[str, str]]  # (file_name, locale) -> {key: translation}
+    failures: List[Tuple[str, str, str, str]]  # (file_name, locale, key, error)
+
+
+def build_batch_input(batches: Iterable[FillBatch], context: Optional[str] = None,
+                      model_id: str = "gpt-4o") -> Tuple[bytes, Dict[str, BatchRequest]]:
+    # One JSONL line per fill batch, with the same prompt and schema as generate_localization_batch
+    lines = []
+    requests = {}
+    for index, batch in enumerate(batches):
+        custom_id = f"fill-{index}"
+        messages = build_batch_messages(batch.phrases, batch.source_locale, batch.target_locale, context)
+        body = structured_output_request(messages, model_id, object_schema(batch.phrases), BATCH_TEMPERATURE)
+        lines.append(json.dumps({'custom_id': custom_id, 'method': 'POST', 'url': BATCH_ENDPOINT, 'body': body},
+                                ensure_ascii=False))
+        requests[custom_id] = BatchRequest(batch.file_name, batch.target_locale, list(batch.phrases))
+    return ('\n'.join(lines) + '\n').encode('utf-8'), requests
+
+
+def submit_batch_jobs(batches: List[FillBatch], locales_path: str, context: Optional[str] = None,
+                      model_id: str = "gpt-4o", client: Optional[ApiClient] = None) -> List[BatchJob]:
+    # Uploads the requests and starts one batch per MAX_BATCH_REQUESTS of them
+    client = client or get_client()
+    jobs = []
+    for start in range(0, len(batches), MAX_BATCH_REQUESTS):
+        payload, requests = build_batch_input(batches[start:start + MAX_BATCH_REQUESTS], context, model_id)
+        with METRICS.span('api.batch_submit', model=model_id, requests=len(requests), bytes=len(payload)) as span:
+            uploaded = client.call(lambda: client.client.files.create(file=('fill.jsonl', payload), purpose='batch'))
+            batch = client.call(lambda: client.client.batches.create(
+                input_file_id=uploaded.id, endpoint=BATCH_ENDPOINT, completion_window=COMPLETION_WINDOW,
+                metadata={'source': 'localization-editor', 'locales': os.path.basename(locales_path)}))
+            span['batch_id'] = batch.id
+        jobs.append(BatchJob(batch.id, locales_path, batches[start].source_locale, model_id, time.time(),
+                             batch.status, requests))
+    return jobs
+
+
+def refresh_batch_job(job: BatchJob, client: Optional[ApiClient] = None) -> BatchJob:
+    client = client or get_client()
+    batch = client.call(lambda: client.client.batches.retrieve(job.batch_id))
+    counts = batch.request_counts
+    return job._replace(status=batch.status, output_file_id=batch.output_file_id,
+                        error_file_id=batch.error_file_id, completed=counts.completed if counts else 0,
+                        failed=counts.failed if counts else 0)
+
+
+def cancel_batch_job(job: BatchJob, client: Optional[ApiClient] = None) -> BatchJob:
+    client = client or get_client()
+    batch = client.call(lambda: client.client.batches.cancel(job.batch_id))
+    return job._replace(status=batch.status)
+
+
+def download_batch_results(job: BatchJob, client: Optional[ApiClient] = None) -> BatchResults:
+    # Reads the output and error files of a finished job. Keys a request did not return, or returned
+    # empty, are failures; so is every key of a request that failed or never ran (expired, cancelled).
+    client = client or get_client()
+    translations: Dict[Tuple[str, str], Dict[str, str]] = {}
+    failures = []
+    answered = set()
+    for file_id in (job.output_file_id, job.error_file_id):
+        if not file_id:
+            continue
+        content = client.call(lambda: client.client.files.content(file_id)).text
+        for line in content.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            request = job.requests.get(record.get('custom_id'))
+            if request is None:
+                continue
+            answered.add(record['custom_id'])
+            values, error = parse_batch_response(record, job.model_id)
+            filled = translations.setdefault((request.file_name, request.target_locale), {})
+            for key in request.keys:
+                value = values.get(key)
+                if isinstance(value, str) and value:
+                    filled[key] = value
+                else:
+                    failures.append((request.file_name, request.target_locale, key,
+                                     error or "No translation returned"))
+    for custom_id, request in job.requests.items():
+        if custom_id not in answered:
+            failures.extend((request.file_name, request.target_locale, key, f"Batch {job.status}")
+                            for key in request.keys)
+    return BatchResults(translations, failures)
+
+
+def parse_batch_response(record: Dict[str, Any], model_id: str) -> Tuple[Dict[str, Any], Optional[str]]:
+    # (translations, error) for one output line
+    if record.get('error'):
+        return {}, record['error'].get('message') or str(record['error'])
+    response = record.get('response') or {}
+    body = response.get('body') or {}
+    if response.get('status_code') != 200:
+        error = body.get('error') or {}
+        return {}, error.get('message') or f"HTTP {response.get('status_code')}"
+    usage = body.get('usage')
+    if usage:
+        METRICS.record_tokens(model_id, usage.get('prompt_tokens', 0), usage.get('completion_tokens', 0),
+                              discount=BATCH_DISCOUNT)
+    try:
+        values = json.loads(body['choices'][0]['message']['content'])
+    except (KeyError, IndexError, TypeError, ValueError):
+        return {}, "Failed to parse output"
+    return (values, None) if isinstance(values, dict) else ({}, "Failed to parse output")
+
+
+class BatchJobStore:
+    # Submitted jobs, kept in a JSON file so polling resumes after a restart
+    def __init__(self, path: str):
+        self.path = path
+        self.jobs: Dict[str, BatchJob] = {}
+
+    @classmethod
+    def load(cls, path: str) -> 'BatchJobStore':
+        store = cls(path)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+        except FileNotFoundError:
+            return store
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable batch job list %s: %s", path, e)
+            return store
+        for record in records:
+            record['requests'] = {custom_id: BatchRequest(*request)
+                                  for custom_id, request in record['requests'].items()}
+            job = BatchJob(**record)
+            store.jobs[job.batch_id] = job
+        return store
+
+    def save(self):
+        records = [dict(job._asdict(), requests={custom_id: list(request)
+                                                 for custom_id, request in job.requests.items()})
+                   for job in self.jobs.values()]
+        write_bytes_atomic(self.path, json.dumps(records, ensure_ascii=False).encode('utf-8'))
+
+    def put(self, job: BatchJob):
+        self.jobs[job.batch_id] = job
+        self.save()
+
+    def remove(self, batch_id: str):
+        if self.jobs.pop(batch_id, None) is not None:
+            self.save()
+
+    def for_folder(self, locales_path: str) -> List[BatchJob]:
+        locales_path = os.path.abspath(locales_path)
+        return sorted((job for job in self.jobs.values() if os.path.abspath(job.locales_path) == locales_path),
+                      key=lambda job: job.created)
+
+    def pending(self) -> List[BatchJob]:
+        # Jobs whose results have not been applied yet
+        return [job for job in self.jobs.values() if job.status != APPLIED]
@@ -0,0 +1,202 @@
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from catalog.metrics import METRICS
+from clients.oai import default_target_locales, generate_localization_batch, generate_localization_object
+
+DEFAULT_MAX_ENTRIES = 200_000  # generated (phrase, target locale) translations kept; catalog rows are not counted
+CATALOG_MODEL = ''  # model recorded for translations seeded from the locale files
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS translations (
+    phrase TEXT NOT NULL,
+    source_locale TEXT NOT NULL,
+    context TEXT NOT NULL,
+    model TEXT NOT NULL,
+    target_locale TEXT NOT NULL,
+    translation TEXT NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (phrase, source_locale, context, model, target_locale)
+);
+CREATE INDEX IF NOT EXISTS translations_last_used ON translations (last_used);
+CREATE INDEX IF NOT EXISTS translations_generated ON translations (last_used) WHERE model != '';
+"""
+
+
+class PhraseTranslation(NamedTuple):
+    translations: Dict[str, str]
+    requested: List[str]  # locales that had to be sent to the model
+
+
+def normalize(text: Optional[str]) -> str:
+    # Case is kept, surrounding and repeated whitespace is not significant
+    return ' '.join(text.split()) if text else ''
+
+
+class TranslationMemory:
+    # SQLite store of earlier translations keyed by normalized phrase, source locale, context and model.
+    # Translations seeded from the catalog are stored without a model and answer context-free lookups
+    # for every model.
+    def __init__(self, db_path: str = ':memory:', max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+    def lookup(self, phrase: str, source_locale: str, target_locales: Iterable[str],
+               context: Optional[str] = None, model: str = CATALOG_MODEL) -> Dict[str, str]:
+        targets = set(target_locales)
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT target_locale, translation, model FROM translations "
+                "WHERE phrase = ? AND source_locale = ? AND context = ? AND model IN (?, ?)",
+                (normalize(phrase), source_locale, normalize(context), model, CATALOG_MODEL)
+            ).fetchall()
+            found: Dict[str, str] = {}
+            for target_locale, translation, row_model in rows:
+                # The catalog's own translation wins over a generated one
+                if target_locale in targets and (target_locale not in found or row_model == CATALOG_MODEL):
+                    found[target_locale] = translation
+            if found:
+                self.connection.execute(
+                    "UPDATE translations SET last_used = ? "
+                    "WHERE phrase = ? AND source_locale = ? AND context = ? AND model IN (?, ?)",
+                    (time.time(), normalize(phrase), source_locale, normalize(context), model, CATALOG_MODEL)
+                )
+                self.connection.commit()
+            self.hits += len(found)
+            self.misses += len(targets) - len(found)
+        METRICS.count('memory.hits', len(found))
+        METRICS.count('memory.misses', len(targets) - len(found))
+        return found
+
+    def store(self, phrase: str, source_locale: str, translations: Dict[str, str],
+              context: Optional[str] = None, model: str = CATALOG_MODEL):
+        now = time.time()
+        rows = [(normalize(phrase), source_locale, normalize(context), model, target_locale, translation, now)
+                for target_locale, translation in translations.items() if translation]
+        self.store_rows(rows)
+
+    def store_rows(self, rows: List[Tuple[str, str, str, str, str, str, float]]):
+        if not rows:
+            return
+        with self.lock:
+            self.connection.executemany("INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self.evict()
+            self.connection.commit()
+
+    def evict(self):
+        # Least recently used generated translations go first once there are more than max_entries of
+        # them. Rows seeded from the catalog are never evicted: they can be read from disk again, and
+        # a large catalog would otherwise push out every translation that was paid for.
+        count = self.connection.execute("SELECT COUNT(*) FROM translations WHERE model != ''").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self.connection.execute(
+                "DELETE FROM translations WHERE rowid IN "
+                "(SELECT rowid FROM translations WHERE model != '' ORDER BY last_used LIMIT ?)", (excess,)
+            )
+            self.evictions += excess
+            METRICS.count('memory.evictions', excess)
+
+    def seed_from_catalog(self, locales: Dict[str, Dict[str, Dict[str, Any]]], source_locale: str,
+                          file_names: Optional[Iterable[str]] = None) -> int:
+        # Every non-empty source value becomes a phrase translated by the values of the other locales
+        source_files = locales.get(source_locale)
+        if source_files is None:
+            return 0
+        now = time.time()
+        rows = []
+        for file_name in (source_files if file_names is None else file_names):
+            source = source_files.get(file_name, {})
+            for locale, files in locales.items():
+                if locale == source_locale:
+                    continue
+                data = files.get(file_name, {})
+                for key, phrase in source.items():
+                    translation = data.get(key)
+                    if isinstance(phrase, str) and phrase and isinstance(translation, str) and translation:
+                        rows.append((normalize(phrase), source_locale, '', CATALOG_MODEL, locale, translation, now))
+        self.store_rows(rows)
+        return len(rows)
+
+
+def translate_phrase(
+        memory: TranslationMemory,
+        phrase: str,
+        phrase_locale: str,
+        context: Optional[str] = None,
+        model_id: str = "gpt-4o",
+        target_locales: Optional[List[str]] = None,
+        on_translation: Optional[Callable[[str, str], None]] = None
+) -> PhraseTranslation:
+    # Cached locales are answered locally; only the rest are requested from the model.
+    # on_translation(locale, translation) sees cached locales first, then each generated one as it streams.
+    targets = default_target_locales(phrase_locale) if target_locales is None else list(target_locales)
+    if not targets:
+        return PhraseTranslation({}, [])
+    translations = memory.lookup(phrase, phrase_locale, targets, context, model_id)
+    if on_translation is not None:
+        for locale, translation in translations.items():
+            on_translation(locale, translation)
+    missing = [locale for locale in targets if locale not in translations]
+    if missing:
+        generated = generate_localization_object(
+            phrase=phrase,
+            phrase_locale=phrase_locale,
+            context=context,
+            model_id=model_id,
+            target_locales=missing,
+            on_translation=on_translation
+        )
+        memory.store(phrase, phrase_locale, generated, context, model_id)
+        translations.update(generated)
+    return PhraseTranslation(translations, missing)
+
+
+def translate_batch(
+        memory: TranslationMemory,
+        phrases: Dict[str, str],
+        phrase_locale: str,
+        target_locale: str,
+        context: Optional[str] = None,
+        model_id: str = "gpt-4o",
+        on_translation: Optional[Callable[[str, str], None]] = None
+) -> Dict[str, str]:
+    # Same contract as generate_localization_batch, sending only the keys the memory cannot answer
+    translations = {}
+    missing = {}
+    for key, phrase in phrases.items():
+        cached = memory.lookup(phrase, phrase_locale, [target_locale], context, model_id)
+        if target_locale in cached:
+            translations[key] = cached[target_locale]
+            if on_translation is not None:
+                on_translation(key, cached[target_locale])
+        else:
+            missing[key] = phrase
+    if missing:
+        generated = generate_localization_batch(missing, phrase_locale, target_locale, context, model_id,
+                                                on_translation=on_translation)
+        now = time.time()
+        rows = []
+        for key, translation in generated.items():
+            if key in missing and isinstance(translation, str) and translation:
+                rows.append((normalize(missing[key]), phrase_locale, normalize(context), model_id,
+                             target_locale, translation, now))
+                translations[key] = translation
+        memory.store_rows(rows)
+    return translations
@@ -1,6 +1,157 @@
-import openai
 import json
-from typing import Any, Dict, List, Optional
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from catalog.metrics import METRICS
+from clients.ratelimit import RateLimiter, backoff_delay, retry_after_seconds
+from clients.streaming import IncrementalObjectParser
+
+ISO_CODES = [
+    'am', 'ar', 'bn', 'ca', 'cs', 'de', 'en', 'es', 'fa', 'fi', 'fr', 'he', 'id',
+    'it', 'ja', 'ko', 'nl', 'pl', 'pt', 'ro', 'ru', 'si', 'sw', 'sv', 'te', 'th',
+    'tr', 'uk', 'vi', 'zh'
+]
+
+
+DEFAULT_TIMEOUT = 60.0  # seconds; for streamed responses this is the longest wait between two chunks
+DEFAULT_CONNECT_TIMEOUT = 10.0
+DEFAULT_MAX_RETRIES = 4
+DEFAULT_MAX_CONNECTIONS = 10
+RETRIED_STATUS = {408, 409, 429, 500, 502, 503, 504}
+BATCH_TEMPERATURE = 0.3  # many UI strings per request, translated consistently
+
+
+class RequestFailed(Exception):
+    # The API could not be reached or refused the request, as opposed to a reply that did not parse
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class ApiClient:
+    # One long-lived OpenAI client: a pooled HTTP client that keeps connections alive between
+    # requests, timeouts, retries with exponential backoff and jitter that honour Retry-After, and a
+    # limiter that keeps every request through it under the organisation's requests and tokens per
+    # minute. The SDK's own retries are off so that a 429 also holds back the other threads.
+    def __init__(
+            self,
+            api_key: Optional[str] = None,
+            base_url: Optional[str] = None,
+            timeout: float = DEFAULT_TIMEOUT,
+            connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+            max_retries: int = DEFAULT_MAX_RETRIES,
+            requests_per_minute: Optional[float] = None,
+            tokens_per_minute: Optional[float] = None,
+            max_connections: int = DEFAULT_MAX_CONNECTIONS
+    ):
+        # The SDK takes a good part of a second to import, so it is only loaded once a request is made
+        import httpx
+        import openai
+        request_timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.http_client = httpx.Client(
+            timeout=request_timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        )
+        self.client = openai.OpenAI(api_key=api_key, base_url=base_url, timeout=request_timeout, max_retries=0,
+                                    http_client=self.http_client)
+        self.max_retries = max_retries
+        self.limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+
+    def create_chat_completion(self, estimated_tokens: int, span: Optional[Dict[str, Any]] = None, **request):
+        # For a streamed request only opening the stream is retried; see read_stream
+        return self.call(lambda: self.client.chat.completions.create(**request), estimated_tokens, span)
+
+    def call(self, operation: Callable[[], Any], estimated_tokens: int = 0, span: Optional[Dict[str, Any]] = None):
+        # Runs one SDK call under the limiter, retrying what is worth retrying
+        import openai
+        for attempt in range(self.max_retries + 1):
+            waited = self.limiter.acquire(estimated_tokens)
+            if waited > 0.001:
+                METRICS.count('api.throttled_seconds', waited)
+                if span is not None:
+                    span['throttled_ms'] = round(span.get('throttled_ms', 0) + waited * 1000, 1)
+            if span is not None:
+                span['attempts'] = attempt + 1
+            try:
+                return operation()
+            except openai.APIConnectionError as e:  # includes timeouts
+                error, status, retry_after = e, None, None
+                message = "Could not reach the OpenAI API" if not isinstance(e, openai.APITimeoutError) \
+                    else "The OpenAI API did not answer in time"
+            except openai.APIStatusError as e:
+                error, status, retry_after = e, e.status_code, retry_after_seconds(e.response.headers)
+                message = f"The OpenAI API refused the request ({e.message})"
+                if status not in RETRIED_STATUS:
+                    raise RequestFailed(message, status) from e
+
+            if attempt == self.max_retries:
+                raise RequestFailed(f"{message} (gave up after {attempt + 1} attempts)", status) from error
+            METRICS.count('api.retries')
+            delay = backoff_delay(attempt, retry_after)
+            if status == 429:
+                # Every thread waits, not only this one; the next acquire() sleeps until then
+                self.limiter.pause(delay)
+            else:
+                time.sleep(delay)
+
+    def close(self):
+        self.http_client.close()
+
+
+client_lock = threading.Lock()
+client_settings: Dict[str, Any] = {}
+shared_client: Optional[ApiClient] = None
+
+
+def configure_client(**settings):
+    # Settings (ApiClient's arguments) for the shared client, e.g. limits from config.json. The client
+    # itself is made on first use, so the API key only has to be set by then. The old client's
+    # connection pool is closed, outside the lock so new requests are not held up by it.
+    global shared_client
+    with client_lock:
+        client_settings.clear()
+        client_settings.update(settings)
+        old_client, shared_client = shared_client, None
+    if old_client is not None:
+        old_client.close()
+
+
+def get_client() -> ApiClient:
+    global shared_client
+    with client_lock:
+        if shared_client is None:
+            shared_client = ApiClient(**client_settings)
+        return shared_client
+
+
+def estimate_request_tokens(messages: List[Dict[str, str]], max_tokens: Optional[int]) -> int:
+    # What the request counts against tokens per minute, at four characters per token; without a
+    # max_tokens a translation is assumed to be about as long as its prompt
+    prompt_tokens = sum(len(message["content"]) for message in messages) // 4 + 1
+    return prompt_tokens + (max_tokens if max_tokens else prompt_tokens)
+
+
+def structured_output_request(
+        messages: List[Dict[str, str]],
+        model_id: str,
+        json_schema: Optional[Dict[str, Any]],
+        temperature: float
+) -> Dict[str, Any]:
+    # The chat completions body shared by direct requests and Batch API input lines
+    return {
+        "model": model_id,
+        "messages": messages,
+        "temperature": temperature,
+        "response_format": {
+          "type": "json_schema",
+          "json_schema": {
+            "name": "StructuredResponse",
+            "strict": True,
+            "schema": json_schema,
+          },
+        },
+    }
 
 
 def get_structured_response(
@@ -9,58 +160,75 @@ def get_structured_response(
         user: Optional[Dict[str, Any]],
         json_schema: Optional[Dict[str, Any]],
         temperature: float = 0.7,
-        max_tokens: int = 500
+        max_tokens: int = 500,
+        on_field: Optional[Callable[[str, Any], None]] = None
 ) -> Dict[str, Any]:
+    # With on_field set the completion is streamed, and each top-level string field is passed to
+    # on_field as soon as it is complete; the return value is the same full object either way.
+    # Latency, token usage and estimated cost of every call are recorded in METRICS.
+    # Raises RequestFailed when the API cannot be reached or keeps refusing the request.
     content = None  # Initialize content to ensure it's always defined
-    try:
+    streaming = on_field is not None
+    client = get_client()
+    estimated_tokens = estimate_request_tokens(messages, max_tokens)
+    with METRICS.span('api.chat_completion', model=model_id, stream=streaming) as span:
+        METRICS.count('api.requests')
+        start = time.perf_counter()
+        try:
+            response = client.create_chat_completion(
+                estimated_tokens,
+                span,
+                **structured_output_request(messages, model_id, json_schema, temperature),
+                max_tokens=max_tokens,
+                stream=streaming,
+                # The last streamed chunk then carries the token usage
+                **({'stream_options': {'include_usage': True}} if streaming else {}),
+            )
 
-        response = openai.chat.completions.create(
-            model=model_id,
-            messages=messages,
-            temperature=temperature,
-            max_tokens=max_tokens,
-            response_format={
-              "type": "json_schema",
-              "json_schema": {
-                "name": "StructuredResponse",
-                "strict": True,
-                "schema": json_schema,
-              },
-            },
-        )
+            if streaming:
+                content, usage = read_stream(response, on_field, span, start)
+            else:
+                content = response.choices[0].message.content.strip()
+                usage = response.usage
+        except RequestFailed:
+            METRICS.count('api.errors')
+            raise
+        record_usage(span, model_id, usage)
+        if usage is not None:
+            client.limiter.settle(estimated_tokens, usage.prompt_tokens + usage.completion_tokens)
 
+        try:
+            if (isinstance(content, str)):
+                output = json.loads(content)
+            else:
+                output = content
+            return output
+        except Exception as e:
+            METRICS.count('api.errors')
+            span['response_chars'] = len(content) if isinstance(content, str) else None
+            raise Exception("Failed to parse output") from e
 
-        content = response.choices[0].message.content.strip()
-        print(content)
-        print(response.json())
 
-        if (isinstance(content, str)):
-            output = json.loads(content)
-        else:
-            output = content
-        return output
-    except Exception as e:
-        print("Failed to parse OpenAI response as JSON:", content)
-        print(f"Exception: {str(e)}")
-        raise Exception("Failed to parse output") from e
+def record_usage(span: Dict[str, Any], model_id: str, usage):
+    if usage is None:
+        return
+    span['prompt_tokens'] = usage.prompt_tokens
+    span['completion_tokens'] = usage.completion_tokens
+    cost = METRICS.record_tokens(model_id, usage.prompt_tokens, usage.completion_tokens)
+    if cost is not None:
+        span['cost_usd'] = round(cost, 6)
 
 
-def generate_localization_object(
+def default_target_locales(phrase_locale: str) -> List[str]:
+    return [code for code in ISO_CODES if code != phrase_locale]
+
+
+def build_localization_messages(
         phrase: str,
         phrase_locale: str,
-        context: Optional[str] = None,
-        model_id: str = "gpt-4o",
-        user: Optional[Dict[str, Any]] = None
-) -> Dict[str, str]:
-    iso_codes = [
-        'am', 'ar', 'bn', 'ca', 'cs', 'de', 'en', 'es', 'fa', 'fi', 'fr', 'he', 'id',
-        'it', 'ja', 'ko', 'nl', 'pl', 'pt', 'ro', 'ru', 'si', 'sw', 'sv', 'te', 'th',
-        'tr', 'uk', 'vi', 'zh'
-    ]
-    target_languages = iso_codes.copy()
-    if phrase_locale in target_languages:
-        target_languages.remove(phrase_locale)
-
+        target_languages: List[str],
+        context: Optional[str] = None
+) -> List[Dict[str, str]]:
     context_str = f"Context: {context}" if context else "No additional context provided."
 
     codes = '\n'.join([f'  "{code}": "translation in {code}",' for code in target_languages])
@@ -79,7 +247,7 @@ Output format:
 }}
 """
 
-    messages = [
+    return [
         {
             "role": "system",
             "content": "You are an assistant that provides translations of a given phrase into multiple languages."
@@ -90,22 +258,148 @@ Output format:
         }
     ]
 
-    properties = {code: {"type": "string"} for code in target_languages}
 
-    json_schema = {
+def estimate_localization_tokens(
+        phrase: str,
+        phrase_locale: str,
+        target_locales: List[str],
+        context: Optional[str] = None
+) -> int:
+    # Rough prompt plus output size at four characters per token; zero when nothing would be requested
+    if not target_locales:
+        return 0
+    messages = build_localization_messages(phrase, phrase_locale, list(target_locales), context)
+    prompt_chars = sum(len(message["content"]) for message in messages)
+    output_chars = len(target_locales) * (2 * len(phrase) + 10)
+    return (prompt_chars + output_chars) // 4 + 1
+
+
+def read_stream(stream, on_field: Callable[[str, Any], None], span: Optional[Dict[str, Any]] = None,
+                start: Optional[float] = None):
+    # Returns the full text and the usage from the final chunk (None if the server sent none).
+    # The time from `start` (the request) to the first content is recorded in the span.
+    import httpx
+    import openai
+    parser = IncrementalObjectParser()
+    parts = []
+    usage = None
+    start = time.perf_counter() if start is None else start
+    try:
+        for chunk in stream:
+            if getattr(chunk, 'usage', None) is not None:
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            text = chunk.choices[0].delta.content
+            if text:
+                if not parts and span is not None:
+                    span['first_token_ms'] = round((time.perf_counter() - start) * 1000, 1)
+                parts.append(text)
+                for key, value in parser.feed(text):
+                    on_field(key, value)
+    except (httpx.HTTPError, openai.APIError) as e:
+        # Not retried: the fields already passed to on_field would be sent again, possibly different
+        raise RequestFailed(f"The connection to the OpenAI API was lost while streaming: {e}") from e
+    content = ''.join(parts).strip()
+    return content, usage
+
+
+def generate_localization_object(
+        phrase: str,
+        phrase_locale: str,
+        context: Optional[str] = None,
+        model_id: str = "gpt-4o",
+        user: Optional[Dict[str, Any]] = None,
+        target_locales: Optional[List[str]] = None,
+        on_translation: Optional[Callable[[str, str], None]] = None
+) -> Dict[str, str]:
+    # on_translation(locale, translation) streams each locale as it is generated
+    target_languages = default_target_locales(phrase_locale) if target_locales is None else list(target_locales)
+    if not target_languages:
+        return {}
+
+    messages = build_localization_messages(phrase, phrase_locale, target_languages, context)
+
+    json_schema = object_schema(target_languages)
+
+    response = get_structured_response(
+        messages=messages,
+        model_id=model_id,
+        user=user,
+        json_schema=json_schema,
+        temperature=0.7,
+        max_tokens=None,
+        on_field=on_translation
+    )
+
+    return response
+
+
+def build_batch_messages(
+        phrases: Dict[str, str],
+        phrase_locale: str,
+        target_locale: str,
+        context: Optional[str] = None
+) -> List[Dict[str, str]]:
+    context_str = f"Context: {context}" if context else "No additional context provided."
+
+    entries = json.dumps(phrases, ensure_ascii=False, indent=2)
+
+    prompt = f"""You are a translation assistant. You are given a JSON object mapping translation keys to phrases in '{phrase_locale}'. Translate every phrase into the language identified by the ISO 639-1 code '{target_locale}'.
+
+Phrases:
+{entries}
+
+{context_str}
+
+Provide the translations in JSON format, mapping each translation key to the translated phrase. Keep the keys exactly as given and preserve any placeholders such as {{{{name}}}}.
+"""
+
+    return [
+        {
+            "role": "system",
+            "content": "You are an assistant that provides translations of user interface strings."
+        },
+        {
+            "role": "user",
+            "content": prompt
+        }
+    ]
+
+
+def object_schema(keys: Iterable[str]) -> Dict[str, Any]:
+    # Strict structured output: one required string property per key
+    properties = {key: {"type": "string"} for key in keys}
+    return {
         "type": "object",
         "properties": properties,
         "required": list(properties.keys()),
         "additionalProperties": False
     }
 
+
+def generate_localization_batch(
+        phrases: Dict[str, str],
+        phrase_locale: str,
+        target_locale: str,
+        context: Optional[str] = None,
+        model_id: str = "gpt-4o",
+        user: Optional[Dict[str, Any]] = None,
+        on_translation: Optional[Callable[[str, str], None]] = None
+) -> Dict[str, str]:
+    # Translates many keys into one locale in a single request; the schema is keyed by translation key.
+    # on_translation(key, translation) streams each key as it is generated.
+    messages = build_batch_messages(phrases, phrase_locale, target_locale, context)
+    json_schema = object_schema(phrases)
+
     response = get_structured_response(
         messages=messages,
         model_id=model_id,
         user=user,
         json_schema=json_schema,
-        temperature=0.7,
-        max_tokens=None
+        temperature=BATCH_TEMPERATURE,
+        max_tokens=None,
+        on_field=on_translation
     )
 
     return response
@@ -0,0 +1,107 @@
+import email.utils
+import random
+import threading
+import time
+from typing import Mapping, Optional
+
+DEFAULT_BACKOFF_BASE = 0.5  # seconds before the first retry, doubled per attempt
+DEFAULT_BACKOFF_MAX = 30.0
+
+
+class TokenBucket:
+    # Holds up to `capacity` units, refilled continuously at `rate` units per second. take() may drive
+    # the level below zero (a request larger than the bucket still goes through, once it is full), and
+    # later callers wait until the debt is paid back.
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        # Seconds until `amount` can be taken; refill() must have been called first
+        needed = min(amount, self.capacity) - self.level
+        return max(0.0, needed / self.rate)
+
+    def take(self, amount: float):
+        self.level -= amount
+
+
+class RateLimiter:
+    # Keeps every request made through one client under a requests-per-minute and a tokens-per-minute
+    # limit, across threads. Either limit may be None for no limit. A 429 pauses all callers until
+    # the server's Retry-After has passed.
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        self.condition = threading.Condition()
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60) if tokens_per_minute else None
+        self.paused_until = 0.0
+
+    def acquire(self, tokens: int = 0) -> float:
+        # Blocks until one request of about `tokens` tokens fits; returns the seconds waited
+        started = time.monotonic()
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                delay = self.paused_until - now
+                for bucket, amount in ((self.requests, 1), (self.tokens, tokens)):
+                    if bucket is not None:
+                        bucket.refill(now)
+                        delay = max(delay, bucket.wait_time(amount))
+                if delay <= 0:
+                    break
+                self.condition.wait(delay)
+            if self.requests is not None:
+                self.requests.take(1)
+            if self.tokens is not None:
+                self.tokens.take(tokens)
+        return time.monotonic() - started
+
+    def settle(self, estimated: int, actual: int):
+        # Corrects the token bucket once the response reports what the request really used
+        if self.tokens is not None:
+            with self.condition:
+                self.tokens.take(actual - estimated)
+                self.condition.notify_all()
+
+    def pause(self, seconds: float):
+        with self.condition:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+def retry_after_seconds(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    # OpenAI sends retry-after-ms and/or Retry-After, as seconds or an HTTP date
+    if not headers:
+        return None
+    value = headers.get('retry-after-ms')
+    if value:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+    value = headers.get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None, base: float = DEFAULT_BACKOFF_BASE,
+                  maximum: float = DEFAULT_BACKOFF_MAX, rng: random.Random = random) -> float:
+    # Exponential backoff with full jitter for retry `attempt` (0 for the first retry). A Retry-After
+    # from the server is a lower bound: waiting less would only earn another 429.
+    delay = rng.uniform(0, min(maximum, base * 2 ** attempt))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
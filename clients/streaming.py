@@ -0,0 +1,57 @@
+import json
+from typing import List, Tuple
+
+
+class IncrementalObjectParser:
+    # Parses a flat JSON object of string values as it streams in, yielding each (key, value)
+    # pair as soon as its closing quote arrives. Anything else (nested values, numbers) stops the
+    # incremental output; the complete text is still parsed normally at the end.
+    def __init__(self):
+        self.state = 'start'
+        self.buffer = []
+        self.escaped = False
+        self.key = None
+        self.supported = True
+
+    def feed(self, text: str) -> List[Tuple[str, str]]:
+        completed = []
+        if not self.supported:
+            return completed
+        for char in text:
+            state = self.state
+            if state in ('key', 'value'):
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    string = json.loads('"' + ''.join(self.buffer) + '"')
+                    self.buffer = []
+                    if state == 'key':
+                        self.key = string
+                        self.state = 'colon'
+                    else:
+                        completed.append((self.key, string))
+                        self.state = 'comma'
+                    continue
+                self.buffer.append(char)
+            elif char.isspace():
+                continue
+            elif state == 'start' and char == '{':
+                self.state = 'key_start'
+            elif state == 'key_start' and char == '"':
+                self.state = 'key'
+            elif state == 'key_start' and char == '}':
+                self.state = 'end'
+            elif state == 'colon' and char == ':':
+                self.state = 'value_start'
+            elif state == 'value_start' and char == '"':
+                self.state = 'value'
+            elif state == 'comma' and char == ',':
+                self.state = 'key_start'
+            elif state == 'comma' and char == '}':
+                self.state = 'end'
+            else:
+                self.supported = False
+                break
+        return completed
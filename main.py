@@ -1,29 +1,115 @@
 from __future__ import annotations
 
+import logging
+import time
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import os
 import json
-import copy
+import bisect
+import functools
+
+from catalog.config import config_dir
+from catalog.fill import DEFAULT_BATCH_TOKENS, find_missing_translations, plan_fill_batches, run_fill_batches
+from catalog.core import Catalog
+from catalog.index import ABSENT
+from catalog.journal import DEFAULT_UNDO_LIMIT, Edit, journal_path, read_write_ahead_log
+from catalog.lazy import DEFAULT_MEMORY_BUDGET
+from catalog.metrics import METRICS, JsonLinesSink, PrometheusTextfileSink, Span, write_json_lines
+from catalog.scanner import ScanCache
+from catalog.search import GRAM_SIZE
+from catalog.usage import build_usage_report, scan_source_usage
+from catalog.watcher import DEFAULT_WATCH_INTERVAL, FolderWatcher
+from clients.batch import (APPLIED, DEFAULT_POLL_INTERVAL, FINISHED_STATUSES, BatchJobStore, cancel_batch_job,
+                           download_batch_results, refresh_batch_job, submit_batch_jobs)
+from clients.memory import DEFAULT_MAX_ENTRIES, TranslationMemory, translate_batch, translate_phrase
+from clients.oai import (DEFAULT_CONNECT_TIMEOUT, DEFAULT_MAX_RETRIES, DEFAULT_TIMEOUT, configure_client,
+                         default_target_locales, estimate_localization_tokens)
+from ui.table import VirtualTable
+from ui.worker import BackgroundRunner
+
+logger = logging.getLogger(__name__)
 
-from clients.oai import generate_localization_object
-import openai  # Make sure openai is installed
 
 class LocalizationEditor(tk.Tk):
     def __init__(self):
+        self.started = time.perf_counter()  # for the startup timings; the import time is benchmarked separately
         super().__init__()
         self.title("Localization Editor")
         self.geometry("800x600")
 
         self.config_file = 'config.json'
         self.locales_path = os.path.expanduser("~/WebstormProjects/chatbot-ui/public/locales")
-        self.locales = {}
-        self.all_files = set()
-        self.all_keys = {}
-        self.unsaved_changes = False
+        self.catalog = Catalog(self.locales_path)
+        self.table_file = None  # File currently shown in the table
+        self.table_keys = []  # Sorted keys of the table rows, parallel to table_view.rows
+        self.tree_nodes = {}  # file_name -> node in the files tree
+        self.watcher = None  # Notices locale files changed by other programs; set when a folder is scanned
+        self.usage_report = None  # Unused and undefined keys from the last source code scan
+        # Batch API fills submitted from this or an earlier session; results apply when they are ready
+        self.batch_jobs = BatchJobStore.load(os.path.join(config_dir(), 'batch_jobs.json'))
+        self.batch_polling = False
+        self.batch_jobs_window = None  # refreshed after each poll while open
+        self.batch_jobs_view = None
+
+        # Earlier and catalog translations, answered locally before any API request
+        self.translation_memory = TranslationMemory(
+            os.path.join(config_dir(), 'translation_memory.sqlite3'),
+            max_entries=self.load_config().get('translation_memory_entries', DEFAULT_MAX_ENTRIES))
+
+        # Translation requests run here so the window never waits on the model
+        self.runner = BackgroundRunner(self)
+        self.metrics_textfile = self.configure_metrics()
+        self.configure_api_client()
+
+        self.folder_load = None  # identifies the background folder load in progress, None once attached
+        self.problems = {}  # source -> message of background failures shown in the status bar
 
         self.create_widgets()
         self.load_last_folder()  # Load the last opened folder in prev session on startup
+        self.after_idle(self.record_startup)
+        self.after(self.load_config().get('watch_interval', DEFAULT_WATCH_INTERVAL), self.watch_external_changes)
+        self.after(1000, self.poll_batch_jobs)  # pick up jobs left running by the last session
+
+    def record_startup(self):
+        # Time from creating the editor until the window is drawn and accepts input
+        elapsed = time.perf_counter() - self.started
+        METRICS.record(Span('editor.startup', time.time() - elapsed, elapsed, {}, None))
+
+    def configure_metrics(self):
+        # Optional exports set in config.json: metrics_log appends every timing span as a JSON line,
+        # metrics_textfile keeps a Prometheus textfile up to date; token_prices overrides the spend estimate
+        config = self.load_config()
+        METRICS.set_prices(config.get('token_prices', {}))
+        if config.get('metrics_log'):
+            METRICS.sinks.append(JsonLinesSink(os.path.expanduser(config['metrics_log'])))
+        if config.get('metrics_textfile'):
+            textfile = PrometheusTextfileSink(METRICS, os.path.expanduser(config['metrics_textfile']))
+            METRICS.sinks.append(textfile)
+            return textfile
+        return None
+
+    def configure_api_client(self):
+        # One pooled client for the whole session; requests_per_minute and tokens_per_minute should be
+        # the organisation's limits, so a fill and the edit dialog together stay under them
+        config = self.load_config()
+        configure_client(timeout=config.get('openai_timeout', DEFAULT_TIMEOUT),
+                         connect_timeout=config.get('openai_connect_timeout', DEFAULT_CONNECT_TIMEOUT),
+                         max_retries=config.get('openai_max_retries', DEFAULT_MAX_RETRIES),
+                         requests_per_minute=config.get('requests_per_minute'),
+                         tokens_per_minute=config.get('tokens_per_minute'))
+
+    def load_config(self):
+        if os.path.exists(self.config_file):
+            with open(self.config_file, 'r') as f:
+                return json.load(f)
+        return {}
+
+    def save_config(self, **changes):
+        config = self.load_config()
+        config.update(changes)
+        with open(self.config_file, 'w') as f:
+            json.dump(config, f)
 
     def on_double_click(self, event):
         item = self.table.identify('item', event.x, event.y)
@@ -34,16 +120,52 @@ class LocalizationEditor(tk.Tk):
         menubar = tk.Menu(self)
         file_menu = tk.Menu(menubar, tearoff=0)
         file_menu.add_command(label="Open Locales Folder", command=self.open_locales_folder, accelerator="Ctrl+O")
+        self.lazy_loading_var = tk.BooleanVar(value=self.load_config().get('lazy_loading', False))
+        file_menu.add_checkbutton(label="Lazy Loading", variable=self.lazy_loading_var,
+                                  command=self.toggle_lazy_loading)
+        self.watch_changes_var = tk.BooleanVar(value=self.load_config().get('watch_changes', False))
+        file_menu.add_checkbutton(label="Watch for External Changes", variable=self.watch_changes_var,
+                                  command=lambda: self.save_config(watch_changes=self.watch_changes_var.get()))
         file_menu.add_separator()
         file_menu.add_command(label="Save Changes", command=self.save_changes, accelerator="Ctrl+S")
         file_menu.add_command(label="Exit", command=self.quit, accelerator="Ctrl+Q")
         menubar.add_cascade(label="File", menu=file_menu)
+        edit_menu = tk.Menu(menubar, tearoff=0)
+        edit_menu.add_command(label="Undo", command=self.undo, accelerator="Ctrl+Z")
+        edit_menu.add_command(label="Redo", command=self.redo, accelerator="Ctrl+Y")
+        menubar.add_cascade(label="Edit", menu=edit_menu)
+        translate_menu = tk.Menu(menubar, tearoff=0)
+        translate_menu.add_command(label="Fill Missing in Selected File",
+                                   command=lambda: self.fill_missing_translations(all_files=False))
+        translate_menu.add_command(label="Fill Missing in All Files",
+                                   command=lambda: self.fill_missing_translations(all_files=True))
+        translate_menu.add_separator()
+        translate_menu.add_command(label="Fill Missing with Batch API...", command=self.submit_batch_fill)
+        translate_menu.add_command(label="Batch Jobs", command=self.show_batch_jobs)
+        menubar.add_cascade(label="Translate", menu=translate_menu)
+        view_menu = tk.Menu(menubar, tearoff=0)
+        view_menu.add_command(label="Completion Dashboard", command=self.show_dashboard)
+        view_menu.add_command(label="Metrics", command=self.show_metrics)
+        view_menu.add_separator()
+        view_menu.add_command(label="Scan Source Code Usage", command=self.scan_source_usage)
+        view_menu.add_command(label="Choose Source Code Folder...",
+                              command=lambda: self.choose_source_folder() and self.scan_source_usage())
+        menubar.add_cascade(label="View", menu=view_menu)
         self.config(menu=menubar)
 
         # Bind keyboard shortcuts
         self.bind_all("<Control-o>", lambda event: self.open_locales_folder())
         self.bind_all("<Control-s>", lambda event: self.save_changes())
         self.bind_all("<Control-q>", lambda event: self.quit())
+        self.bind_all("<Control-f>", lambda event: self.search_entry.focus_set())
+        # Bound to the main window only, so Ctrl+Z in the edit dialog's entries does not undo catalog edits
+        self.bind("<Control-z>", lambda event: self.undo())
+        self.bind("<Control-y>", lambda event: self.redo())
+        self.bind("<Control-Z>", lambda event: self.redo())  # Ctrl+Shift+Z
+
+        # Status bar for background failures the editor keeps working through; packed first so it spans the window
+        self.status_bar = ttk.Label(self, anchor=tk.W, foreground='red')
+        self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
 
         # Frames
         self.left_frame = ttk.Frame(self)
@@ -57,8 +179,22 @@ class LocalizationEditor(tk.Tk):
         self.tree.heading("#0", text="Files")
         self.tree.pack(fill=tk.Y, expand=True)
 
+        # Shown above the tree while a folder is scanned in the background
+        self.loading_frame = ttk.Frame(self.left_frame)
+        self.loading_label = ttk.Label(self.loading_frame)
+        self.loading_label.pack(side=tk.TOP, anchor=tk.W, padx=5)
+        self.loading_bar = ttk.Progressbar(self.loading_frame, mode='indeterminate')
+        self.loading_bar.pack(side=tk.TOP, fill=tk.X, padx=5, pady=2)
+
         self.tree.bind("<<TreeviewSelect>>", self.on_tree_select)
         self.tree.bind("<Button-3>", self.show_tree_context_menu)  # Right-click context menu
+        self.tree.tag_configure('missing', foreground='red')  # File absent from some locale folders
+        self.tree.tag_configure('incomplete', foreground='#CC7700')
+        self.tree.tag_configure('complete', foreground='dark green')
+        self.tree.tag_configure('unloaded', foreground='gray')  # Not read yet in lazy loading mode
+        self.tree.tag_configure('conflict', foreground='purple')  # Changed on disk and in the editor
+        self.tree.tag_configure('unused', foreground='gray')  # Key no source file references
+        self.tree.tag_configure('undefined', foreground='red')  # Referenced in the source, missing here
 
         # Buttons
         btn_frame = ttk.Frame(self.left_frame)
@@ -68,9 +204,29 @@ class LocalizationEditor(tk.Tk):
         self.add_key_btn = ttk.Button(btn_frame, text="Add Key", command=self.add_key)
         self.add_key_btn.pack(side=tk.LEFT, fill=tk.X, expand=True)
 
-        # Table for keys and values
-        self.table = ttk.Treeview(self.right_frame, columns=[], show='headings')
-        self.table.pack(fill=tk.BOTH, expand=True)
+        # Search across every file and locale; hits are listed under the entry while there is a query
+        search_frame = ttk.Frame(self.right_frame)
+        search_frame.pack(side=tk.TOP, fill=tk.X)
+        ttk.Label(search_frame, text="Search:").pack(side=tk.LEFT, padx=5)
+        self.search_var = tk.StringVar()
+        self.search_entry = ttk.Entry(search_frame, textvariable=self.search_var)
+        self.search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.search_status = ttk.Label(search_frame, width=22)
+        self.search_status.pack(side=tk.LEFT, padx=5)
+        self.search_results = tk.Listbox(self.right_frame, height=8)
+        self.search_hits = []  # hits shown in search_results, in order
+        self.search_var.trace_add('write', lambda *args: self.run_search())
+        self.search_entry.bind("<Return>", lambda event: self.open_search_hit(0))
+        self.search_entry.bind("<Down>", lambda event: self.focus_search_results())
+        self.search_entry.bind("<Escape>", lambda event: self.search_var.set(''))
+        self.search_results.bind("<Double-1>", lambda event: self.open_search_hit(self.search_results.curselection()))
+        self.search_results.bind("<Return>", lambda event: self.open_search_hit(self.search_results.curselection()))
+        self.search_results.bind("<Escape>", lambda event: self.search_entry.focus_set())
+
+        # Table for keys and values; only the rows in view exist as Treeview items
+        self.table_view = VirtualTable(self.right_frame)
+        self.table_view.pack(fill=tk.BOTH, expand=True)
+        self.table = self.table_view.tree
         self.table.bind("<Double-1>", self.on_double_click)
         self.table.bind("<Configure>", self.on_table_configure)
         self.table.bind("<Button-3>", self.show_table_context_menu)  # Right-click context menu
@@ -86,130 +242,368 @@ class LocalizationEditor(tk.Tk):
         self.edit_value_btn = ttk.Button(table_btn_frame, text="Edit Value", command=self.edit_value)
         self.edit_value_btn.pack(side=tk.LEFT, fill=tk.X, expand=True)
 
+    def report_problem(self, source, message):
+        # Logged, and shown in the status bar until the source reports success or another problem
+        logger.warning(message)
+        self.problems.pop(source, None)
+        self.problems[source] = message
+        self.status_bar.config(text=message)
+
+    def clear_problem(self, source):
+        if self.problems.pop(source, None) is not None:
+            self.status_bar.config(text=next(reversed(self.problems.values()), ''))
+
     def load_last_folder(self):
-        if os.path.exists(self.config_file):
-            with open(self.config_file, 'r') as f:
-                config = json.load(f)
-                last_folder = config.get('last_folder', '')
-                if last_folder and os.path.exists(last_folder):
-                    self.locales_path = last_folder
-                    self.scan_locales()
-                    self.populate_tree()
+        last_folder = self.load_config().get('last_folder', '')
+        if last_folder and os.path.exists(last_folder):
+            self.locales_path = last_folder
+            self.load_folder_in_background(startup=True)
 
     def save_last_folder(self):
-        config = {'last_folder': self.locales_path}
-        with open(self.config_file, 'w') as f:
-            json.dump(config, f)
+        self.save_config(last_folder=self.locales_path)
+
+    def toggle_lazy_loading(self):
+        self.save_config(lazy_loading=self.lazy_loading_var.get())
+        if not self.catalog.locales:
+            return
+        if self.catalog.unsaved_changes and not messagebox.askyesno(
+                "Unsaved changes", "Reloading the folder will discard unsaved changes. Continue?"):
+            self.lazy_loading_var.set(not self.lazy_loading_var.get())
+            self.save_config(lazy_loading=self.lazy_loading_var.get())
+            return
+        self.catalog.journal.discard()  # not offered for recovery after the reload
+        self.load_folder_in_background()
 
     def open_locales_folder(self):
         path = filedialog.askdirectory(title="Select Locales Folder")
         if path:
             self.locales_path = path
             self.save_last_folder()  # Save the selected folder
-            self.scan_locales()
-            self.populate_tree()
+            self.load_folder_in_background()
 
     def scan_locales(self):
-        self.locales = {}
-        self.all_files = set()
-        self.all_keys = {}
-
-        # List of locale directories
-        for locale_dir in os.listdir(self.locales_path):
-            locale_path = os.path.join(self.locales_path, locale_dir)
-            if os.path.isdir(locale_path):
-                self.locales[locale_dir] = {}
-                # List of JSON files in locale directory
-                for file_name in os.listdir(locale_path):
-                    if file_name.endswith('.json'):
-                        self.all_files.add(file_name)
-                        file_path = os.path.join(locale_path, file_name)
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            data = json.load(f)
-                            self.locales[locale_dir][file_name] = data
-                            for key in data:
-                                self.all_keys.setdefault(key, set()).add(locale_dir)
-
-        # Identify missing files and keys
-        for locale in self.locales:
-            for file_name in self.all_files:
-                if file_name not in self.locales[locale]:
-                    self.locales[locale][file_name] = {}
-        # Identify all keys across all files
-        for file_name in self.all_files:
-            for locale in self.locales:
-                file_keys = self.locales[locale][file_name].keys()
-                for key in file_keys:
-                    self.all_keys.setdefault(key, set()).add(locale)
-        self.unsaved_changes = False
+        self.attach_catalog(*self.scan_catalog(self.locales_path, self.lazy_loading_var.get()))
+
+    def scan_catalog(self, locales_path, lazy):
+        # In lazy loading mode only the directory listing is read here; file contents load on first selection.
+        # Touches no widgets and only new objects, so it can run on the background runner.
+        with METRICS.span('editor.scan_locales', lazy=lazy):
+            # Snapshot taken first, so anything written while scanning is merged on the next check
+            watcher = FolderWatcher(locales_path)
+            watcher.reset()
+            catalog = Catalog(locales_path, undo_limit=self.load_config().get('undo_limit', DEFAULT_UNDO_LIMIT))
+            catalog.scan(lazy=lazy,
+                         memory_budget=self.load_config().get('lazy_memory_budget', DEFAULT_MEMORY_BUDGET),
+                         cache_path=os.path.join(config_dir(), 'scan_cache.pickle'))
+        return catalog, watcher
+
+    def attach_catalog(self, catalog, watcher):
+        self.catalog.journal.close()  # its unsaved edits stay in the log, for when the folder is opened again
+        self.catalog = catalog
+        self.watcher = watcher
+        self.usage_report = None
+        for source in ('journal', 'search', 'watcher'):  # problems of the folder that was open
+            self.clear_problem(source)
+        self.build_search_index()
+        if catalog.lazy_loader is None:  # in lazy mode files are seeded as they load
+            self.seed_catalog_memory(catalog)
+        self.after_idle(lambda: self.recover_unsaved_edits(catalog))
+
+    def seed_catalog_memory(self, catalog):
+        # A separate task after the folder is shown, so a large catalog does not hold the tree back
+        source_locale = self.load_config().get('source_locale', 'en')
+        self.runner.submit(lambda task: self.translation_memory.seed_from_catalog(catalog.locales, source_locale),
+                           on_error=lambda e: logger.warning("Failed to seed the translation memory: %s", e))
+
+    def recover_unsaved_edits(self, catalog):
+        # Edits logged but not saved when the editor last closed or crashed are offered back first;
+        # the write-ahead log then starts over with the ones that were restored
+        if catalog is not self.catalog:
+            return
+        path = journal_path(os.path.join(config_dir(), 'journal'), catalog.locales_path)
+        edits = read_write_ahead_log(path, catalog.locales_path)
+        restored = []
+        if edits and messagebox.askyesno(
+                "Recover unsaved edits",
+                f"{len(edits)} edit(s) to {os.path.basename(catalog.locales_path)} were not saved last time. "
+                f"Restore them as unsaved changes?"):
+            result = catalog.replay(edits)
+            restored = result.edits
+            self.populate_tree()
+            if self.table_file in catalog.all_files:
+                self.populate_table(self.table_file)
+            if result.skipped:
+                self.warn_skipped_changes("Recovery incomplete", result.skipped)
+        try:
+            catalog.open_journal(path, restored)
+        except OSError as e:
+            self.report_problem('journal', f"Could not open the edit journal, unsaved edits will not be "
+                                           f"recoverable: {e}")
+            return
+
+        def on_log_failed(e):
+            if catalog is self.catalog:
+                self.report_problem('journal', f"Could not write the edit journal, unsaved edits will not be "
+                                               f"recoverable: {e}")
+
+        catalog.journal.on_log_failed = on_log_failed
+
+    def load_folder_in_background(self, startup=False):
+        # The window stays usable while the folder is scanned on the background runner; the current
+        # catalog is replaced once the scan is done. A folder opened meanwhile supersedes this one.
+        locales_path = self.locales_path
+        lazy = self.lazy_loading_var.get()
+        load = self.folder_load = object()
+        self.loading_label.config(text=f"Loading {os.path.basename(locales_path) or locales_path}...")
+        self.loading_frame.pack(side=tk.TOP, fill=tk.X, before=self.tree)
+        self.loading_bar.start(10)
+
+        def finished():
+            if load is not self.folder_load:
+                return False
+            self.folder_load = None
+            self.loading_bar.stop()
+            self.loading_frame.pack_forget()
+            return True
+
+        def on_loaded(result):
+            if not finished():
+                return
+            self.attach_catalog(*result)
+            self.populate_tree()
+            if startup:
+                # Also from creating the editor, so it can be compared with editor.startup
+                elapsed = time.perf_counter() - self.started
+                METRICS.record(Span('editor.startup_folder_loaded', time.time() - elapsed, elapsed,
+                                    {'lazy': lazy, 'files': len(self.catalog.all_files)}, None))
+
+        def on_failed(e):
+            if finished():
+                messagebox.showerror("Error", f"Failed to load {locales_path}:\n{e}")
+
+        self.runner.submit(lambda task: self.scan_catalog(locales_path, lazy), on_success=on_loaded,
+                           on_error=on_failed)
+
+    def build_search_index(self):
+        # Built on the background runner; edits made meanwhile are applied once it is attached
+        catalog = self.catalog
+        file_names = catalog.prepare_search_index()
+        self.search_status.config(text="Indexing...")
+
+        def on_built(search):
+            if catalog is self.catalog:  # ignore an index for a folder that was closed meanwhile
+                catalog.attach_search_index(search)
+                self.run_search()
+
+        def on_failed(e):
+            self.report_problem('search', f"Failed to build the search index: {e}")
+            self.search_status.config(text="Search unavailable")
+
+        self.runner.submit(lambda task: catalog.build_search_index(file_names), on_success=on_built, on_error=on_failed)
+
+    def run_search(self):
+        # Runs on every keystroke against the prebuilt index
+        query = self.search_var.get().strip()
+        self.search_results.delete(0, tk.END)
+        self.search_hits = []
+        if self.catalog.search is None:
+            self.search_status.config(text="Indexing..." if self.catalog.search_pending is not None else "")
+            self.search_results.pack_forget()
+            return
+        if len(query) < GRAM_SIZE:
+            self.search_status.config(text=f"Type {GRAM_SIZE}+ characters" if query else "")
+            self.search_results.pack_forget()
+            return
+
+        start = time.perf_counter()
+        self.search_hits = self.catalog.search.search(query)
+        elapsed = (time.perf_counter() - start) * 1000
+        for hit in self.search_hits:
+            if hit.locale is None:
+                self.search_results.insert(tk.END, f"{hit.file_name}: {hit.key}")
+            else:
+                value = self.catalog.locales[hit.locale].get(hit.file_name, {}).get(hit.key, '')
+                self.search_results.insert(tk.END, f"{hit.file_name}: {hit.key}  [{hit.locale}] {value}")
+        self.search_status.config(text=f"{len(self.search_hits)} hit(s) in {elapsed:.1f} ms")
+        self.search_results.pack(side=tk.TOP, fill=tk.X, after=self.search_entry.master)
+
+    def focus_search_results(self):
+        if self.search_hits:
+            self.search_results.focus_set()
+            self.search_results.selection_clear(0, tk.END)
+            self.search_results.selection_set(0)
+            self.search_results.activate(0)
+        return 'break'
+
+    def open_search_hit(self, index):
+        # index is a position in search_hits, or a Listbox selection tuple
+        if isinstance(index, tuple):
+            if not index:
+                return
+            index = index[0]
+        if index >= len(self.search_hits):
+            return
+        hit = self.search_hits[index]
+        node = self.tree_nodes.get(hit.file_name)
+        if node is None:
+            return
+        self.tree.selection_set(node)
+        self.tree.see(node)
+        # The table is filled by the tree selection event; the row is selected once that has run
+        self.after_idle(lambda: self.select_table_key(hit.file_name, hit.key))
+
+    def select_table_key(self, file_name, key, focus=True):
+        if file_name != self.table_file:
+            self.populate_table(file_name)
+        position = bisect.bisect_left(self.table_keys, key)
+        if position < len(self.table_keys) and self.table_keys[position] == key:
+            self.table_view.select(position)
+            if focus:
+                self.table.focus_set()
+
+    def seed_translation_memory(self, file_names=None):
+        # Values already in the catalog become exact-match translations of the source locale's phrases
+        source_locale = self.load_config().get('source_locale', 'en')
+        self.translation_memory.seed_from_catalog(self.catalog.locales, source_locale, file_names)
+
+    def ensure_file_loaded(self, file_name):
+        if self.catalog.ensure_file_loaded(file_name):
+            self.seed_translation_memory([file_name])
 
     def populate_tree(self):
         self.tree.delete(*self.tree.get_children())
-        for file_name in sorted(self.all_files):
-            file_node = self.tree.insert('', 'end', text=file_name, values=(file_name,))
-            # Check for missing locales
-            missing_locales = [loc for loc in self.locales if file_name not in self.locales[loc]]
-            if missing_locales:
-                self.tree.item(file_node, tags=('missing',))
-                self.tree.tag_configure('missing', foreground='red')
+        self.tree_nodes = {}
+        for file_name in sorted(self.catalog.all_files):
+            self.tree_nodes[file_name] = self.tree.insert('', 'end', text=file_name, values=(file_name,))
+            self.update_tree_file(file_name)
+        if self.usage_report is not None:
+            self.add_usage_nodes()
+
+    def add_usage_nodes(self):
+        # Unused keys go under their file; references to missing keys under one node at the end
+        for file_name, keys in self.usage_report.unused.items():
+            node = self.tree_nodes.get(file_name)
+            if node is None:
+                continue
+            for key in sorted(keys):
+                self.tree.insert(node, 'end', text=f"{key} (unused)", values=(file_name, key), tags=('unused',))
+        if self.usage_report.undefined:
+            source_path = self.load_config().get('source_code_path', '')
+            parent = self.tree.insert('', 'end', text=f"Undefined keys ({len(self.usage_report.undefined)})",
+                                      values=(), tags=('undefined',))
+            for path, reference in self.usage_report.undefined:
+                namespace = f"{reference.namespace}:" if reference.namespace else ""
+                location = f"{os.path.relpath(path, source_path)}:{reference.line}"
+                self.tree.insert(parent, 'end', text=f"{namespace}{reference.key} ({location})",
+                                 values=(), tags=('undefined',))
+
+    def selected_file(self):
+        # File of the selected tree node, including the unused key nodes under it
+        selected_item = self.tree.selection()
+        if not selected_item:
+            return None
+        values = self.tree.item(selected_item[0], 'values')
+        return values[0] if values else None
+
+    def update_tree_file(self, file_name):
+        # Colour the file by its real completeness, read from the completion index
+        node = self.tree_nodes.get(file_name)
+        if node is None:
+            return
+        if self.catalog.conflicts and self.catalog.file_conflicts(file_name):
+            tag = 'conflict'
+        elif any(self.catalog.is_file_missing(loc, file_name) for loc in self.catalog.locales):
+            tag = 'missing'
+        elif not self.catalog.index.is_indexed(file_name):
+            tag = 'unloaded'
+        elif self.catalog.index.file_totals(file_name).empty:
+            tag = 'incomplete'
+        else:
+            tag = 'complete'
+        self.tree.item(node, tags=(tag,))
 
     def on_tree_select(self, event):
         selected_item = self.tree.selection()
-        if selected_item:
-            file_name = self.tree.item(selected_item[0])['text']
-            self.populate_table(file_name)
+        if not selected_item:
+            return
+        values = self.tree.item(selected_item[0], 'values')
+        if len(values) == 2:
+            self.select_table_key(*values, focus=False)  # an unused key
+        elif values:
+            self.populate_table(values[0])
 
     def populate_table(self, file_name):
-        total_keys = 0
-        empty_keys = 0
-
-        # Clear the table
-        for col in self.table["columns"]:
-            self.table.heading(col, text='')
-        self.table.delete(*self.table.get_children())
-        self.table["columns"] = []
-
-        # Get list of locales
-        locales = sorted(self.locales.keys())
-        self.table["columns"] = ['Key'] + locales
-        self.table.column('Key', width=200, anchor='w')
-        self.table.heading('Key', text='Key')
-
-        for locale in locales:
-            self.table.column(locale, width=100, anchor='w')
-            self.table.heading(locale, text=locale)
-
-        # Collect all keys in this file across locales
-        keys = set()
-        for locale in self.locales:
-            keys.update(self.locales[locale][file_name].keys())
-
-        for key in sorted(keys):
-            values = [key]
-            tags = ['row']
-            for locale in locales:
-                value = self.locales[locale][file_name].get(key, '')
-                values.append(value)
-                if not value:
-                    tags.append(f'empty_{locale}')
-                    empty_keys += 1
-                total_keys += 1
-            item = self.table.insert('', 'end', values=values, tags=tags)
+        with METRICS.span('editor.populate_table', file=file_name) as span:
+            self.ensure_file_loaded(file_name)
 
-        # Configure tags for empty cells
-        self.table.tag_configure('row', background='white')
-        for locale in locales:
-            self.table.tag_configure(f'empty_{locale}', background='#FFD700')  # Darker yellow
+            # Columns are only reconfigured when the set of locales changes
+            locales = sorted(self.catalog.locales.keys())
+            self.table_view.set_columns(['Key'] + locales, [200] + [100] * len(locales))
 
-        self.update_statistics(total_keys, empty_keys)
+            # Configure tags for empty cells; the hover tag is configured last so it takes precedence
+            self.table.tag_configure('row', background='white')
+            for locale in locales:
+                self.table.tag_configure(f'empty_{locale}', background='#FFD700')  # Darker yellow
+            self.table.tag_configure('conflict', background='#E6B3FF')  # Changed on disk and in the editor
+            self.table.tag_configure('highlight', background='#FFA500')  # Brighter yellow for hover
+
+            # Collect all keys in this file across locales
+            self.table_file = file_name
+            self.table_keys = sorted(self.catalog.file_keys(file_name))
+            rows = []
+            row_tags = []
+            empty_cells = []
+            for key in self.table_keys:
+                values, tags, empty = self.build_table_row(file_name, key)
+                rows.append(values)
+                row_tags.append(tags)
+                empty_cells.append(empty)
+            self.table_view.set_rows(rows, row_tags, empty_cells)
+            span['rows'] = len(rows)
+
+        self.update_tree_file(file_name)
+        self.update_statistics(*self.catalog.index.file_totals(file_name))
 
         # Bind the draw callback
         self.table.bind('<Motion>', self.highlight_cell)
 
-    def update_statistics(self, total_keys, empty_keys):
-        if hasattr(self, 'stats_label'):
-            self.stats_label.destroy()
+    def build_table_row(self, file_name, key):
+        # Returns the row values, its tags and a bitmap of empty columns (bit 0 is the key column)
+        values = [key]
+        tags = ['row']
+        empty = 0
+        for column, locale in enumerate(self.table_view.columns[1:], start=1):
+            value = self.catalog.locales[locale][file_name].get(key, '')
+            values.append(value)
+            if not value:
+                tags.append(f'empty_{locale}')
+                empty |= 1 << column
+            if (locale, file_name, key) in self.catalog.conflicts:
+                tags.append('conflict')
+        return values, tags, empty
+
+    def refresh_table_keys(self, file_name, keys):
+        # Update just the rows for these keys in place instead of repopulating the whole table
+        self.update_tree_file(file_name)
+        if file_name != self.table_file:
+            return
+        for key in keys:
+            position = bisect.bisect_left(self.table_keys, key)
+            exists = position < len(self.table_keys) and self.table_keys[position] == key
+            if not any(key in self.catalog.locales[locale][file_name] for locale in self.catalog.locales):
+                if exists:
+                    del self.table_keys[position]
+                    self.table_view.delete_row(position)
+                continue
+            values, tags, empty = self.build_table_row(file_name, key)
+            if exists:
+                self.table_view.update_row(position, values, tags, empty)
+            else:
+                self.table_keys.insert(position, key)
+                self.table_view.insert_row(position, values, tags, empty)
+        self.update_statistics(*self.catalog.index.file_totals(file_name))
 
+    def update_statistics(self, total_keys, empty_keys):
         filled_keys = total_keys - empty_keys
         completion_percentage = (filled_keys / total_keys) * 100 if total_keys > 0 else 0
 
@@ -218,20 +612,196 @@ class LocalizationEditor(tk.Tk):
         stats_text += f"Empty Keys: {empty_keys}\n"
         stats_text += f"Completion: {completion_percentage:.2f}%"
 
+        if hasattr(self, 'stats_label'):
+            self.stats_label.config(text=stats_text)
+            return
         self.stats_label = ttk.Label(self.right_frame, text=stats_text, justify=tk.LEFT)
         self.stats_label.pack(side=tk.BOTTOM, anchor=tk.W, padx=5, pady=5)
 
+    def choose_source_folder(self):
+        path = filedialog.askdirectory(title="Select Source Code Folder")
+        if path:
+            self.save_config(source_code_path=path)
+        return bool(path)
+
+    def scan_source_usage(self):
+        # Finds t('...') references in the source tree on the background runner, then marks the
+        # unused keys and the references to missing keys in the files tree
+        source_path = self.load_config().get('source_code_path', '')
+        if not source_path or not os.path.isdir(source_path):
+            if not self.choose_source_folder():
+                return
+            source_path = self.load_config()['source_code_path']
+        catalog = self.catalog
+
+        def work(task):
+            cache = ScanCache.load(os.path.join(config_dir(), 'usage_cache.pickle'))
+            usage = scan_source_usage(source_path, cache)
+            cache.save()
+            return usage
+
+        def on_scanned(usage):
+            if catalog is not self.catalog:
+                return
+            self.usage_report = build_usage_report(catalog.loaded_file_keys(), usage, catalog.all_files)
+            self.populate_tree()
+            unused = sum(len(keys) for keys in self.usage_report.unused.values())
+            summary = (f"{self.usage_report.references} reference(s) in {len(usage.references)} source file(s), "
+                       f"{usage.files_parsed} read from disk.\n"
+                       f"{unused} unused key(s) in {len(self.usage_report.unused)} file(s), "
+                       f"{len(self.usage_report.undefined)} reference(s) to missing keys.")
+            if self.usage_report.dynamic:
+                summary += f"\n{self.usage_report.dynamic} call(s) with a computed key could not be checked."
+            if catalog.lazy_loader is not None:
+                summary += "\nOnly files loaded so far were checked for unused keys."
+            messagebox.showinfo("Source code usage", summary)
+
+        self.runner.submit(work, on_success=on_scanned,
+                           on_error=lambda e: messagebox.showerror("Error", f"Failed to scan {source_path}:\n{e}"))
+
+    def show_dashboard(self):
+        # Catalog-wide completion per locale and per file, read from the completion index
+        dashboard = tk.Toplevel(self)
+        dashboard.title("Completion Dashboard")
+        dashboard.geometry("700x450")
+
+        summary_label = ttk.Label(dashboard, justify=tk.LEFT)
+        summary_label.pack(side=tk.TOP, anchor=tk.W, padx=5, pady=5)
+
+        notebook = ttk.Notebook(dashboard)
+        notebook.pack(fill=tk.BOTH, expand=True)
+        locale_view = ttk.Treeview(notebook, columns=['Locale', 'Filled', 'Empty', 'Completion'], show='headings')
+        for column in locale_view["columns"]:
+            locale_view.heading(column, text=column)
+            locale_view.column(column, width=100, anchor='w')
+        notebook.add(locale_view, text="By Locale")
+        file_view = ttk.Treeview(notebook, show='headings')
+        notebook.add(file_view, text="By File")
+
+        def percentage(stats):
+            return f"{(stats.keys - stats.empty) / stats.keys * 100:.1f}%" if stats.keys else "-"
+
+        def refresh():
+            index = self.catalog.index
+            locales = sorted(self.catalog.locales)
+
+            locale_view.delete(*locale_view.get_children())
+            for locale in locales:
+                stats = index.locale_stats(locale)
+                locale_view.insert('', 'end', values=[locale, stats.keys - stats.empty, stats.empty, percentage(stats)])
+
+            file_view.delete(*file_view.get_children())
+            file_view["columns"] = ['File', 'Keys', 'All'] + locales
+            file_view.column('File', width=180, anchor='w')
+            file_view.heading('File', text='File')
+            for column in ['Keys', 'All'] + locales:
+                file_view.column(column, width=60, anchor='w')
+                file_view.heading(column, text=column)
+            for file_name in sorted(self.catalog.all_files):
+                if not index.is_indexed(file_name):
+                    file_view.insert('', 'end', values=[file_name, 'not loaded'])
+                    continue
+                values = [file_name, index.file_keys(file_name), percentage(index.file_totals(file_name))]
+                values += [percentage(index.stats(file_name, locale)) for locale in locales]
+                file_view.insert('', 'end', values=values)
+
+            indexed = sum(1 for file_name in self.catalog.all_files if index.is_indexed(file_name))
+            summary_label.config(text=f"Files counted: {indexed} of {len(self.catalog.all_files)}\n"
+                                      f"Keys: {index.total_keys}, locales: {len(locales)}")
+
+        ttk.Button(dashboard, text="Refresh", command=refresh).pack(side=tk.BOTTOM, pady=5)
+        refresh()
+
+    def show_metrics(self):
+        # Running totals per operation, the latest timings and the API spend, refreshed every second
+        window = tk.Toplevel(self)
+        window.title("Metrics")
+        window.geometry("700x450")
+
+        summary_label = ttk.Label(window, justify=tk.LEFT)
+        summary_label.pack(side=tk.TOP, anchor=tk.W, padx=5, pady=5)
+
+        notebook = ttk.Notebook(window)
+        notebook.pack(fill=tk.BOTH, expand=True)
+        totals_view = ttk.Treeview(notebook, columns=['Operation', 'Count', 'Errors', 'Average ms', 'Max ms',
+                                                      'Last ms'], show='headings')
+        for column in totals_view["columns"]:
+            totals_view.heading(column, text=column)
+            totals_view.column(column, width=80, anchor='w')
+        totals_view.column('Operation', width=180)
+        notebook.add(totals_view, text="Totals")
+        recent_view = ttk.Treeview(notebook, columns=['Time', 'Operation', 'ms', 'Details'], show='headings')
+        for column, width in zip(recent_view["columns"], [70, 160, 70, 380]):
+            recent_view.heading(column, text=column)
+            recent_view.column(column, width=width, anchor='w')
+        notebook.add(recent_view, text="Recent")
+
+        def refresh():
+            if not window.winfo_exists():
+                return
+            snapshot = METRICS.snapshot()
+            totals_view.delete(*totals_view.get_children())
+            for name, totals in sorted(snapshot['spans'].items()):
+                totals_view.insert('', 'end', values=[
+                    name, totals['count'], totals['errors'], f"{totals['seconds'] / totals['count'] * 1000:.1f}",
+                    f"{totals['max_seconds'] * 1000:.1f}", f"{totals['last_seconds'] * 1000:.1f}"])
+
+            recent_view.delete(*recent_view.get_children())
+            for span in reversed(snapshot['recent']):
+                details = ', '.join(f"{key}={value}" for key, value in span.attributes.items())
+                if span.error:
+                    details = f"{details}, failed: {span.error}" if details else f"failed: {span.error}"
+                recent_view.insert('', 'end', values=[time.strftime('%H:%M:%S', time.localtime(span.started)),
+                                                      span.name, f"{span.duration * 1000:.1f}", details])
+
+            counters = snapshot['counters']
+            summary_label.config(text=f"API requests: {counters.get('api.requests', 0):g}, "
+                                      f"failed: {counters.get('api.errors', 0):g}\n"
+                                      f"Tokens: {counters.get('api.prompt_tokens', 0):,g} prompt, "
+                                      f"{counters.get('api.completion_tokens', 0):,g} completion\n"
+                                      f"Estimated spend: ${counters.get('api.cost_usd', 0):.4f}\n"
+                                      f"Translation memory: {counters.get('memory.hits', 0):,g} hits, "
+                                      f"{counters.get('memory.misses', 0):,g} misses, "
+                                      f"{counters.get('memory.evictions', 0):,g} evicted")
+            window.after(1000, refresh)
+
+        def export_json_lines():
+            path = filedialog.asksaveasfilename(parent=window, defaultextension='.jsonl',
+                                                filetypes=[("JSON lines", "*.jsonl"), ("All files", "*.*")])
+            if not path:
+                return
+            try:
+                write_json_lines(path, METRICS.snapshot()['recent'])
+            except OSError as e:
+                messagebox.showerror("Export failed", f"Could not write {path}:\n{e}", parent=window)
+
+        def export_prometheus():
+            path = filedialog.asksaveasfilename(parent=window, defaultextension='.prom',
+                                                filetypes=[("Prometheus textfile", "*.prom"), ("All files", "*.*")])
+            if not path:
+                return
+            try:
+                PrometheusTextfileSink(METRICS, path).flush()
+            except OSError as e:
+                messagebox.showerror("Export failed", f"Could not write {path}:\n{e}", parent=window)
+
+        button_frame = ttk.Frame(window)
+        button_frame.pack(side=tk.BOTTOM, pady=5)
+        ttk.Button(button_frame, text="Export JSON Lines...", command=export_json_lines).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Export Prometheus Textfile...",
+                   command=export_prometheus).pack(side=tk.LEFT, padx=5)
+        refresh()
+
     def edit_value(self, item: str | int = None):
         if item:
-            selected_item = item
+            selected_index = self.table_view.index_of_item(item)
         else:
-            selected_item = self.table.selection()
-            if selected_item:
-                selected_item = selected_item[0]
-        if selected_item:
-            item_values = self.table.item(selected_item)['values']
+            selected_index = self.table_view.selected_index()
+        if selected_index is not None:
+            item_values = self.table_view.rows[selected_index]
             key = item_values[0]
-            locales = self.table["columns"][1:]
+            file_name = self.table_file  # saved here even if another file is selected meanwhile
+            locales = self.table_view.columns[1:]
 
             # Create a dialog to edit values
             editor = tk.Toplevel(self)
@@ -259,6 +829,11 @@ class LocalizationEditor(tk.Tk):
                 entry.insert(0, value)
                 entry.grid(row=i + 1, column=1, sticky='w')
                 entries[locale] = entry
+                conflict = self.catalog.conflicts.get((locale, file_name, key))
+                if conflict is not None:
+                    on_disk = "removed" if conflict.theirs is ABSENT else repr(conflict.theirs)
+                    ttk.Label(editor, text=f"On disk: {on_disk}", foreground='purple').grid(
+                        row=i + 1, column=2, sticky='w')
 
             # AI localization generation options
             row_offset = len(locales) + 1
@@ -300,146 +875,580 @@ class LocalizationEditor(tk.Tk):
             overwrite_check = ttk.Checkbutton(editor, text="Overwrite existing values", variable=overwrite_var)
             overwrite_check.grid(row=row_offset + 5, column=0, sticky='w')
 
-            # Generate Translations button
+            # Generate Translations button; the request runs on the background runner
+            task = None
+
             def generate_translations():
+                nonlocal task
                 phrase = custom_phrase_entry.get() if use_custom_phrase_var.get() else key_entry.get()
                 context = context_entry.get()
                 gen_locale = gen_locale_entry.get()
 
+                # Only the catalog's locales are requested, and only those still empty unless overwriting
+                targets = [locale for locale in entries
+                           if locale != gen_locale and (overwrite_var.get() or not entries[locale].get())]
+                if not targets:
+                    messagebox.showinfo("Nothing to generate", "Every locale already has a value.", parent=editor)
+                    return
+
                 # Ensure OpenAI API key is set
-                openai.api_key = os.environ.get('OPENAI_API_KEY')
-                if not openai.api_key:
+                if not os.environ.get('OPENAI_API_KEY'):
                     messagebox.showerror("API Key Missing", "Please set the OPENAI_API_KEY environment variable.")
                     return
 
+                gen_button.config(state='disabled')
+                gen_progress.config(maximum=len(targets), value=0)
+                gen_progress.pack(side=tk.LEFT, padx=5)
+                cancel_button.pack(side=tk.LEFT)
+
                 # Call the AI localization function
-                try:
-                    generated_translations = generate_localization_object(
+                task = self.runner.submit(
+                    lambda task: translate_phrase(
+                        self.translation_memory,
                         phrase=phrase,
                         phrase_locale=gen_locale,
-                        context=context if context else None
-                    )
-                    # Update the entries with generated translations
-                    for locale in entries:
-                        if (overwrite_var.get() or not entries[locale].get()):
-                            entries[locale].delete(0, tk.END)
-                            entries[locale].insert(0, generated_translations.get(locale, ''))
-                    messagebox.showinfo("Success", "Translations generated successfully.")
-                except Exception as e:
-                    messagebox.showerror("Error", f"Failed to generate translations:\n{e}")
-
-            gen_button = ttk.Button(editor, text="Generate Translations", command=generate_translations)
-            gen_button.grid(row=row_offset + 6, column=0, columnspan=3, pady=5)
+                        context=context if context else None,
+                        target_locales=targets,
+                        on_translation=lambda locale, value: task.report((locale, value))
+                    ),
+                    on_progress=on_streamed,
+                    on_success=lambda result: on_generated(result, phrase, gen_locale, context, targets),
+                    on_error=on_generate_failed
+                )
+
+            def cancel_generation():
+                # The request cannot be interrupted; its result is dropped and the dialog is usable at once
+                task.cancel()
+                generation_finished()
+
+            def generation_finished():
+                if not editor.winfo_exists():
+                    return False
+                gen_progress.pack_forget()
+                cancel_button.pack_forget()
+                gen_button.config(state='normal')
+                return True
+
+            def on_streamed(translation):
+                # Each locale is filled in as soon as the model has finished it
+                locale, value = translation
+                if task.cancelled or not editor.winfo_exists() or locale not in entries:
+                    return
+                gen_progress['value'] = float(gen_progress['value']) + 1
+                if overwrite_var.get() or not entries[locale].get():
+                    entries[locale].delete(0, tk.END)
+                    entries[locale].insert(0, value)
+
+            def on_generated(result, phrase, gen_locale, context, targets):
+                if task.cancelled:
+                    return
+                # Compared with asking for every default language, as generation used to
+                full_tokens = estimate_localization_tokens(phrase, gen_locale, default_target_locales(gen_locale),
+                                                           context or None)
+                sent_tokens = estimate_localization_tokens(phrase, gen_locale, result.requested, context or None)
+                savings = (f"{len(result.requested)} of {len(targets)} locale(s) requested from the model, "
+                           f"about {max(0, full_tokens - sent_tokens):,} tokens saved.")
+                METRICS.count('api.tokens_saved_estimate', max(0, full_tokens - sent_tokens))
+                if not generation_finished():
+                    return
+                # Update the entries with generated translations
+                for locale in targets:
+                    if (overwrite_var.get() or not entries[locale].get()):
+                        entries[locale].delete(0, tk.END)
+                        entries[locale].insert(0, result.translations.get(locale, ''))
+                messagebox.showinfo("Success", f"Translations generated successfully.\n{savings}", parent=editor)
+
+            def on_generate_failed(e):
+                if not task.cancelled and generation_finished():
+                    messagebox.showerror("Error", f"Failed to generate translations:\n{e}", parent=editor)
+
+            def on_editor_destroyed(event):
+                if event.widget is editor and task is not None:
+                    task.cancel()
+
+            editor.bind("<Destroy>", on_editor_destroyed)
+
+            gen_frame = ttk.Frame(editor)
+            gen_frame.grid(row=row_offset + 6, column=0, columnspan=3, pady=5)
+            gen_button = ttk.Button(gen_frame, text="Generate Translations", command=generate_translations)
+            gen_button.pack(side=tk.LEFT)
+            gen_progress = ttk.Progressbar(gen_frame, mode='determinate', length=120)
+            cancel_button = ttk.Button(gen_frame, text="Cancel", command=cancel_generation)
 
             # Save function
             def save():
                 new_key = key_entry.get()
-                file_name = self.tree.item(self.tree.selection()[0])['text']
-
-                for locale in entries:
-                    new_value = entries[locale].get()
-                    if new_key != key:
-                        # If key has changed, remove old key and add new key
-                        self.locales[locale][file_name][new_key] = new_value
-                        del self.locales[locale][file_name][key]
-                    else:
-                        self.locales[locale][file_name][key] = new_value
-
-                self.unsaved_changes = True
+                self.ensure_file_loaded(file_name)
+                # If key has changed, the old key is removed and the values are stored under the new key
+                self.catalog.update_key(file_name, key, new_key,
+                                        {locale: entry.get() for locale, entry in entries.items()})
+
                 editor.destroy()
-                self.populate_table(file_name)
+                self.refresh_table_keys(file_name, {key, new_key})
 
             ttk.Button(editor, text="Save", command=save).grid(row=row_offset + 7, column=0, columnspan=3, pady=10)
         else:
             messagebox.showwarning("No selection", "Please select a key to edit.")
 
 
+    def undo(self):
+        self.show_replayed_edits(self.catalog.undo(), "Undo incomplete")
+
+    def redo(self):
+        self.show_replayed_edits(self.catalog.redo(), "Redo incomplete")
+
+    def show_replayed_edits(self, result, title):
+        # Refreshes only what the edits touched: the rows of changed keys, and the tree if files came or went
+        if not result.edits and not result.skipped:
+            self.bell()  # nothing to undo or redo
+            return
+        changes = [change for edit in result.edits for change in edit.changes]
+        if any(change.key is None for change in changes):
+            self.populate_tree()
+            if self.table_file is not None and self.table_file not in self.catalog.all_files:
+                self.table_file = None
+                self.table_keys = []
+                self.table_view.set_rows([], [], [])
+                self.update_statistics(0, 0)
+        changed_keys = {}
+        for change in changes:
+            if change.key is not None:
+                changed_keys.setdefault(change.file_name, set()).add(change.key)
+        for file_name, keys in changed_keys.items():
+            self.refresh_table_keys(file_name, keys)
+        if result.skipped:
+            self.warn_skipped_changes(title, result.skipped)
+
+    def warn_skipped_changes(self, title, skipped):
+        details = '\n'.join(f"{change.locale}/{change.file_name}: {change.key}" if change.key is not None
+                            else change.file_name for change in skipped[:10])
+        messagebox.showwarning(title, f"{len(skipped)} change(s) were skipped because the value has changed "
+                                      f"since, e.g. on disk:\n{details}")
+
     def add_file(self):
         new_file = tk.simpledialog.askstring("Add File", "Enter new JSON file name (with .json):")
         if new_file:
             if not new_file.endswith('.json'):
                 new_file += '.json'
-            if new_file in self.all_files:
+            if not self.catalog.add_file(new_file):
                 messagebox.showwarning("File exists", "This file already exists.")
                 return
-            # Add empty file to each locale
-            for locale in self.locales:
-                self.locales[locale][new_file] = {}
-            self.all_files.add(new_file)
-            self.unsaved_changes = True
             self.populate_tree()
 
     def add_key(self):
-        selected_item = self.tree.selection()
-        if selected_item:
-            file_name = self.tree.item(selected_item[0])['text']
+        file_name = self.selected_file()
+        if file_name:
             new_key = tk.simpledialog.askstring("Add Key", "Enter new key:")
             if new_key:
-                # Add key to all locales with empty value
-                for locale in self.locales:
-                    self.locales[locale][file_name][new_key] = ""
-                self.unsaved_changes = True
-                self.populate_table(file_name)
+                self.ensure_file_loaded(file_name)
+                self.catalog.add_key(file_name, new_key)
+                self.refresh_table_keys(file_name, [new_key])
+                self.table_view.select(bisect.bisect_left(self.table_keys, new_key))
         else:
             messagebox.showwarning("No selection", "Please select a file to add a key to.")
 
+    def ask_fill_request(self, title):
+        # (source locale, context) for a fill, or None if cancelled or not possible
+        source_locale = tk.simpledialog.askstring(title, "Source locale:", initialvalue='en')
+        if not source_locale:
+            return None
+        if source_locale not in self.catalog.locales:
+            messagebox.showerror("Unknown locale", f"There is no '{source_locale}' locale folder.")
+            return None
+        context = tk.simpledialog.askstring(title, "Context (optional):") or None
+
+        if not os.environ.get('OPENAI_API_KEY'):
+            messagebox.showerror("API Key Missing", "Please set the OPENAI_API_KEY environment variable.")
+            return None
+        return source_locale, context
+
+    def plan_fill(self, file_names, source_locale):
+        # [(file_name, batches)] for the files' empty values, loading the files as needed
+        batch_tokens = self.load_config().get('fill_batch_tokens', DEFAULT_BATCH_TOKENS)
+        # Keys the last source code scan found unused are not worth translating
+        skip_unused = self.usage_report is not None and self.load_config().get('skip_unused_keys', True)
+        plan = []
+        for file_name in file_names:
+            self.ensure_file_loaded(file_name)
+            skip_keys = self.usage_report.unused.get(file_name) if skip_unused else None
+            missing = find_missing_translations(self.catalog.locales, file_name, source_locale, skip_keys)
+            if missing:
+                plan.append((file_name, plan_fill_batches(file_name, source_locale, missing, max_tokens=batch_tokens)))
+        return plan
+
+    def fill_missing_translations(self, all_files):
+        if all_files:
+            file_names = sorted(self.catalog.all_files)
+        else:
+            file_name = self.selected_file()
+            if not file_name:
+                messagebox.showwarning("No selection", "Please select a file to fill.")
+                return
+            file_names = [file_name]
+        if not file_names:
+            return
+
+        request = self.ask_fill_request("Fill Missing Translations")
+        if request is None:
+            return
+        source_locale, context = request
+
+        # Batches are planned here, where files can be loaded; translation runs on the background runner.
+        # Many keys go into each request, one target locale at a time; failed keys are retried alone.
+        plan = self.plan_fill(file_names, source_locale)
+        total_batches = sum(len(batches) for _, batches in plan)
+        if not total_batches:
+            messagebox.showinfo("Fill complete", "There are no missing translations.")
+            return
+
+        translate = functools.partial(translate_batch, self.translation_memory)
+        stats = {'filled': 0, 'requests': 0, 'done': 0}
+        failures = []
+        # Values streamed in for the current file, undone together and logged once the file is done.
+        # Results only go into the catalog the fill was started on; opening another folder cancels it.
+        catalog = self.catalog
+        journal = catalog.journal
+        fill_changes = []
+
+        def commit_fill():
+            if fill_changes and catalog is self.catalog:
+                journal.commit(Edit("Fill translations", list(fill_changes)))
+            fill_changes.clear()
+
+        def work(task):
+            for file_name, batches in plan:
+                done = stats['done']
+                result = run_fill_batches(
+                    batches, translate, context=context,
+                    progress=lambda finished, _: task.report(('progress', file_name, done + finished)),
+                    should_stop=lambda: task.cancelled,
+                    on_translation=lambda *value: task.report(('value',) + value))
+                task.report(('file', file_name, result))
+                if task.cancelled or result.error is not None:
+                    break
+                stats['done'] = done + len(batches)
+
+        # Progress window
+        window = tk.Toplevel(self)
+        window.title("Fill Missing Translations")
+        status_label = ttk.Label(window, text=f"Translating 0 of {total_batches} batch(es)...")
+        status_label.pack(padx=10, pady=5, anchor=tk.W)
+        progress_bar = ttk.Progressbar(window, mode='determinate', maximum=total_batches, length=300)
+        progress_bar.pack(padx=10, pady=5)
+        cancel_button = ttk.Button(window, text="Cancel")
+        cancel_button.pack(pady=5)
+
+        def on_progress(message):
+            if catalog is not self.catalog:
+                task.cancel()
+                return
+            if message[0] == 'value':
+                # Streamed values land in the table as they arrive; empty cells only
+                _, file_name, locale, key, value = message
+                self.ensure_file_loaded(file_name)
+                if not catalog.locales[locale].get(file_name, {}).get(key):
+                    with journal.collect(fill_changes):
+                        catalog.set_value(locale, file_name, key, value)
+                    self.refresh_table_keys(file_name, [key])
+                return
+            if message[0] == 'progress':
+                _, file_name, finished = message
+                if window.winfo_exists():
+                    progress_bar['value'] = finished
+                    status_label.config(text=f"Translating {finished} of {total_batches} batch(es), {file_name}")
+                return
+            # Results are merged file by file on the Tk thread, so the editor stays usable meanwhile
+            _, file_name, result = message
+            stats['requests'] += result.requests
+            failures.extend(result.failures)
+            if result.error is not None:
+                stats['error'] = result.error
+            self.ensure_file_loaded(file_name)
+            with journal.collect(fill_changes):
+                catalog.fill_values(result.translations)
+            commit_fill()
+            stats['filled'] += sum(len(values) for values in result.translations.values())
+            self.refresh_table_keys(file_name, {key for values in result.translations.values() for key in values})
+
+        def on_finished(cancelled=False):
+            commit_fill()
+            if window.winfo_exists():
+                window.destroy()
+            summary = f"Filled {stats['filled']} translation(s) in {stats['requests']} batch(es)."
+            if cancelled:
+                summary = f"Cancelled. {summary}"
+            if 'error' in stats:
+                summary = f"Stopped: {stats['error']}\n{summary}"
+            if failures:
+                details = '\n'.join(f"{locale}/{file_name}: {key} ({e})"
+                                    for file_name, locale, key, e in failures[:10])
+                messagebox.showwarning("Fill incomplete", f"{summary}\n{len(failures)} failed:\n{details}")
+            else:
+                messagebox.showinfo("Fill complete", summary)
+
+        def on_failed(e):
+            commit_fill()
+            if window.winfo_exists():
+                window.destroy()
+            messagebox.showerror("Error", f"Failed to fill translations:\n{e}")
+
+        task = self.runner.submit(
+            work,
+            on_progress=on_progress,
+            on_success=lambda _: on_finished(),
+            on_error=on_failed,
+            on_cancel=lambda: on_finished(cancelled=True)
+        )
+        cancel_button.config(command=task.cancel)
+        window.protocol("WM_DELETE_WINDOW", task.cancel)
+
+    def submit_batch_fill(self):
+        # Every empty value of every file, through the Batch API: half the price and no rate limit
+        # pressure, with results within 24 hours. They are applied as unsaved edits when ready.
+        request = self.ask_fill_request("Fill Missing with Batch API")
+        if request is None:
+            return
+        source_locale, context = request
+        plan = self.plan_fill(sorted(self.catalog.all_files), source_locale)
+        batches = [batch for _, file_batches in plan for batch in file_batches]
+        if not batches:
+            messagebox.showinfo("Fill complete", "There are no missing translations.")
+            return
+        keys = sum(len(batch.phrases) for batch in batches)
+        if not messagebox.askyesno("Fill Missing with Batch API",
+                                   f"Submit {len(batches)} request(s) for {keys} value(s)?\n"
+                                   f"Results arrive within 24 hours and are applied as unsaved changes, "
+                                   f"while this folder is open."):
+            return
+        locales_path = self.locales_path
+
+        def on_submitted(jobs):
+            for job in jobs:
+                self.batch_jobs.put(job)
+            self.refresh_batch_jobs_window()
+            messagebox.showinfo("Batch submitted", f"Submitted {len(jobs)} batch job(s): "
+                                                   f"{', '.join(job.batch_id for job in jobs)}")
+
+        self.runner.submit(lambda task: submit_batch_jobs(batches, locales_path, context),
+                           on_success=on_submitted,
+                           on_error=lambda e: messagebox.showerror("Error", f"Failed to submit the batch:\n{e}"))
+
+    def poll_batch_jobs(self, reschedule=True):
+        # Checks this folder's unfinished jobs on the background runner; finished ones are downloaded
+        # there and applied here. Reschedules itself unless called for a one-off refresh. Jobs are matched
+        # against the attached catalog, so nothing is polled until a folder load is done.
+        interval = self.load_config().get('batch_poll_interval', DEFAULT_POLL_INTERVAL)
+        jobs = [job for job in self.batch_jobs.for_folder(self.catalog.locales_path) if job.status != APPLIED]
+        if (self.batch_polling or self.folder_load is not None or not jobs
+                or not os.environ.get('OPENAI_API_KEY')):
+            if reschedule:
+                self.after(interval, self.poll_batch_jobs)
+            return
+        self.batch_polling = True
+
+        def work(task):
+            checked = []
+            for job in jobs:
+                job = refresh_batch_job(job)
+                results = download_batch_results(job) if job.status in FINISHED_STATUSES else None
+                checked.append((job, results))
+            return checked
+
+        def done():
+            self.batch_polling = False
+            self.refresh_batch_jobs_window()
+            if reschedule:
+                self.after(interval, self.poll_batch_jobs)
+
+        def on_checked(checked):
+            self.clear_problem('batch')
+            # A folder opened meanwhile gets the results on a later poll, once its catalog is attached
+            attached = self.folder_load is None and self.catalog.locales
+            for job, results in checked:
+                if (results is not None and attached
+                        and os.path.abspath(job.locales_path) == os.path.abspath(self.catalog.locales_path)):
+                    self.apply_batch_results(job, results)
+                else:
+                    self.batch_jobs.put(job)
+            done()
+
+        def on_failed(e):
+            self.report_problem('batch', f"Could not check batch jobs: {e}")
+            done()
+
+        self.runner.submit(work, on_success=on_checked, on_error=on_failed)
+
+    def apply_batch_results(self, job, results):
+        # Empty cells only, as with the interactive fill, so edits made meanwhile are kept
+        changed = self.catalog.fill_values(results.translations)
+        for file_name in {file_name for _, file_name in changed}:
+            self.refresh_table_keys(file_name, {key for (name, _), values in results.translations.items()
+                                                if name == file_name for key in values})
+        self.batch_jobs.put(job._replace(status=APPLIED))
+        filled = sum(len(values) for values in results.translations.values())
+        summary = f"Batch {job.batch_id} {job.status}: {filled} translation(s) applied as unsaved changes."
+        if results.failures:
+            details = '\n'.join(f"{locale}/{file_name}: {key} ({error})"
+                                for file_name, locale, key, error in results.failures[:10])
+            messagebox.showwarning("Batch incomplete", f"{summary}\n{len(results.failures)} failed:\n{details}")
+        else:
+            messagebox.showinfo("Batch complete", summary)
+
+    def show_batch_jobs(self):
+        if self.batch_jobs_window is not None and self.batch_jobs_window.winfo_exists():
+            self.batch_jobs_window.lift()
+            return
+        window = self.batch_jobs_window = tk.Toplevel(self)
+        window.title("Batch Jobs")
+        window.geometry("700x300")
+        jobs_view = ttk.Treeview(window, columns=['Batch', 'Folder', 'Submitted', 'Status', 'Requests', 'Done',
+                                                  'Failed'], show='headings')
+        for column, width in zip(jobs_view["columns"], [200, 120, 120, 90, 70, 50, 50]):
+            jobs_view.heading(column, text=column)
+            jobs_view.column(column, width=width, anchor='w')
+        jobs_view.pack(fill=tk.BOTH, expand=True)
+        self.batch_jobs_view = jobs_view
+
+        def cancel_selected():
+            selected = [self.batch_jobs.jobs[item] for item in jobs_view.selection() if item in self.batch_jobs.jobs]
+            running = [job for job in selected if job.status not in FINISHED_STATUSES | {APPLIED}]
+
+            def on_cancelled(jobs):
+                for job in jobs:
+                    self.batch_jobs.put(job)
+                self.refresh_batch_jobs_window()
+
+            if running:
+                self.runner.submit(lambda task: [cancel_batch_job(job) for job in running], on_success=on_cancelled,
+                                   on_error=lambda e: messagebox.showerror("Error", f"Failed to cancel:\n{e}",
+                                                                           parent=window))
+
+        def remove_selected():
+            # Only forgets the job here; it is not cancelled
+            for item in jobs_view.selection():
+                self.batch_jobs.remove(item)
+            self.refresh_batch_jobs_window()
+
+        button_frame = ttk.Frame(window)
+        button_frame.pack(side=tk.BOTTOM, pady=5)
+        ttk.Button(button_frame, text="Check Now",
+                   command=lambda: self.poll_batch_jobs(reschedule=False)).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Cancel Job", command=cancel_selected).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Remove from List", command=remove_selected).pack(side=tk.LEFT, padx=5)
+        self.refresh_batch_jobs_window()
+
+    def refresh_batch_jobs_window(self):
+        window = self.batch_jobs_window
+        if window is None or not window.winfo_exists():
+            return
+        jobs_view = self.batch_jobs_view
+        jobs_view.delete(*jobs_view.get_children())
+        for job in sorted(self.batch_jobs.jobs.values(), key=lambda job: job.created, reverse=True):
+            submitted = time.strftime('%Y-%m-%d %H:%M', time.localtime(job.created))
+            jobs_view.insert('', 'end', iid=job.batch_id, values=[
+                job.batch_id, os.path.basename(job.locales_path), submitted, job.status, len(job.requests),
+                job.completed, job.failed])
+
     def save_changes(self):
-        if not self.unsaved_changes:
+        if not self.catalog.unsaved_changes:
             messagebox.showinfo("No changes", "There are no changes to save.")
             return
-        for locale in self.locales:
-            locale_dir = os.path.join(self.locales_path, locale)
-            for file_name in self.locales[locale]:
-                file_path = os.path.join(locale_dir, file_name)
-                # Create locale directory if it doesn't exist
-                if not os.path.exists(locale_dir):
-                    os.makedirs(locale_dir)
-                # Write JSON data
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    json.dump(self.locales[locale][file_name], f, ensure_ascii=False, indent=2)
-        self.unsaved_changes = False
-        messagebox.showinfo("Saved", "Changes have been saved.")
+        with METRICS.span('editor.save_changes', files=len(self.catalog.dirty_files)) as span:
+            # Merge anything changed on disk first, so saving never overwrites edits made elsewhere
+            result = self.check_external_changes(before_save=True)
+            if result is not None and result.conflicts:
+                span['conflicts'] = len(result.conflicts)
+                return
+            dirty = set(self.catalog.dirty_files)
+            conflicts = list(self.catalog.conflicts.values())
+            files_written, bytes_written, failures = self.catalog.save()
+            self.watcher.record(dirty)
+            for conflict in conflicts:
+                if conflict not in self.catalog.conflicts.values():
+                    self.refresh_table_keys(conflict.file_name, [conflict.key])
+            self.seed_translation_memory({file_name for _, file_name in dirty - self.catalog.dirty_files})
+            span.update(bytes=bytes_written, failures=len(failures))
+        if failures:
+            details = '\n'.join(f"{locale}/{file_name}: {e}" for (locale, file_name), e in failures[:10])
+            messagebox.showerror("Save failed",
+                                 f"Saved {files_written} file(s), {len(failures)} failed:\n{details}")
+            return
+        messagebox.showinfo("Saved", f"Changes have been saved.\n"
+                                     f"{files_written} file(s) written, {bytes_written:,} bytes.")
+
+    def watch_external_changes(self):
+        # Checks the folder on the background runner and applies the result here, then reschedules
+        interval = self.load_config().get('watch_interval', DEFAULT_WATCH_INTERVAL)
+        watcher = self.watcher
+        if watcher is None or not self.watch_changes_var.get():
+            self.after(interval, self.watch_external_changes)
+            return
+
+        def on_snapshot(state):
+            if watcher is self.watcher:  # ignore results for a folder that was closed meanwhile
+                self.clear_problem('watcher')
+                self.apply_external_changes(watcher.diff(state))
+            self.after(interval, self.watch_external_changes)
+
+        def on_failed(e):
+            if watcher is self.watcher:
+                self.report_problem('watcher', f"Could not check {watcher.locales_path} for changes: {e}")
+            self.after(interval, self.watch_external_changes)
+
+        self.runner.submit(lambda task: watcher.snapshot(), on_success=on_snapshot, on_error=on_failed)
+
+    def check_external_changes(self, before_save=False):
+        # Synchronous check, used before saving; returns the reload result when something changed
+        if self.watcher is None:
+            return None
+        try:
+            changed = self.watcher.diff(self.watcher.snapshot())
+        except OSError as e:
+            self.report_problem('watcher', f"Could not check {self.locales_path} for changes: {e}")
+            return None
+        return self.apply_external_changes(changed, before_save)
+
+    def apply_external_changes(self, changed, before_save=False):
+        if not changed:
+            return None
+        result = self.catalog.reload_files(changed)
+        if result.added_files:
+            self.populate_tree()
+        for file_name in {file_name for _, file_name in changed}:
+            keys = set(result.changed_keys.get(file_name, ()))
+            keys |= {conflict.key for conflict in result.conflicts if conflict.file_name == file_name}
+            self.refresh_table_keys(file_name, keys)
+        self.seed_translation_memory(set(result.changed_keys))
+
+        if result.conflicts:
+            details = '\n'.join(f"{conflict.locale}/{conflict.file_name}: {conflict.key}"
+                                for conflict in result.conflicts[:10])
+            note = "\nNothing was saved; save again to keep your values." if before_save else ""
+            messagebox.showwarning("External changes conflict",
+                                   f"{len(result.conflicts)} value(s) were changed both on disk and in the editor. "
+                                   f"Your unsaved values were kept and are highlighted:\n{details}{note}")
+        if result.failures:
+            details = '\n'.join(f"{locale}/{file_name}: {e}" for (locale, file_name), e in result.failures[:10])
+            messagebox.showwarning("Reload failed", f"Could not read {len(result.failures)} changed file(s):\n{details}")
+        return result
 
     def highlight_cell(self, event):
-        region = self.table.identify("region", event.x, event.y)
-        if region == "cell":
-            column = self.table.identify_column(event.x)
-            row = self.table.identify_row(event.y)
-
-            # Reset the background of all rows
-            for item in self.table.get_children():
-                self.table.item(item, tags=('row',))
-
-            # Highlight the current row if the cell is empty
-            col_index = int(column[1:]) - 1  # Convert column id to index
-            cell_value = self.table.item(row, 'values')[col_index]
-            if not cell_value:
-                self.table.item(row, tags=('row', 'highlight'))
-
-            # Configure styles
-            self.table.tag_configure('row', background='white')
-            self.table.tag_configure('highlight', background='#FFA500')  # Brighter yellow for hover
+        # Highlight the hovered row if the cell under the pointer is empty
+        hover = None
+        if self.table.identify("region", event.x, event.y) == "cell":
+            col_index = int(self.table.identify_column(event.x)[1:]) - 1  # Convert column id to index
+            index = self.table_view.index_of_item(self.table.identify_row(event.y))
+            if index is not None and self.table_view.is_empty(index, col_index):
+                hover = index
+        self.table_view.set_hover(hover)
 
     def on_table_configure(self, event):
         self.table.unbind('<Motion>')
         self.table.after(100, lambda: self.table.bind('<Motion>', self.highlight_cell))
 
     def on_key_press(self, event):
-        selected = self.table.selection()
-        if not selected:
-            # If no selection, select the first item
-            items = self.table.get_children()
-            if items:
-                self.table.selection_set(items[0])
-        else:
-            index = self.table.index(selected[0])
-            if event.keysym == 'Up':
-                if index > 0:
-                    self.table.selection_set(self.table.get_children()[index - 1])
-            elif event.keysym == 'Down':
-                if index < len(self.table.get_children()) - 1:
-                    self.table.selection_set(self.table.get_children()[index + 1])
-        self.table.focus(self.table.selection())
+        # With no selection either key selects the first row; the view scrolls to keep it visible
+        return self.table_view.move_selection(-1 if event.keysym == 'Up' else 1)
 
     def show_tree_context_menu(self, event):
         selected_item = self.tree.identify_row(event.y)
@@ -447,6 +1456,8 @@ class LocalizationEditor(tk.Tk):
         menu = tk.Menu(self, tearoff=0)
         menu.add_command(label="Add File", command=self.add_file)
         menu.add_command(label="Add Key to File", command=self.add_key)
+        menu.add_command(label="Fill Missing Translations",
+                         command=lambda: self.fill_missing_translations(all_files=False))
         menu.post(event.x_root, event.y_root)
 
     def show_table_context_menu(self, event):
@@ -460,5 +1471,8 @@ class LocalizationEditor(tk.Tk):
 
 
 if __name__ == "__main__":
+    logging.basicConfig(format='%(asctime)s %(levelname)s %(name)s: %(message)s')
     app = LocalizationEditor()
-    app.mainloop()
\ No newline at end of file
+    app.mainloop()
+    if app.metrics_textfile is not None:
+        app.metrics_textfile.flush()  # the totals as of exit, not as of the last timed rewrite
\ No newline at end of file
@@ -0,0 +1,58 @@
+import json
+from types import SimpleNamespace
+
+from catalog.core import Catalog
+from clients.batch import BatchJob, BatchRequest, download_batch_results, parse_batch_response
+
+
+class FakeClient:
+    # Stands in for ApiClient: `files` maps a file id to its JSONL content
+    def __init__(self, files):
+        self.client = SimpleNamespace(files=SimpleNamespace(content=lambda file_id: SimpleNamespace(
+            text=files[file_id])))
+
+    def call(self, request):
+        return request()
+
+
+def output_line(custom_id, values=None, status_code=200, error=None):
+    body = {'choices': [{'message': {'content': json.dumps(values)}}]} if values is not None else {}
+    if error:
+        body = {'error': {'message': error}}
+    return json.dumps({'custom_id': custom_id, 'response': {'status_code': status_code, 'body': body}})
+
+
+def make_job(status='completed'):
+    requests = {
+        'fill-0': BatchRequest('common.json', 'fr', ['hello', 'bye']),
+        'fill-1': BatchRequest('common.json', 'de', ['hello']),
+        'fill-2': BatchRequest('errors.json', 'fr', ['oops']),
+    }
+    return BatchJob('batch_1', '/locales', 'en', 'gpt-4o', 0.0, status, requests,
+                    output_file_id='out', error_file_id='err')
+
+
+def test_results_are_grouped_by_file_and_locale_with_missing_keys_as_failures():
+    files = {
+        'out': output_line('fill-0', {'hello': 'Bonjour', 'bye': ''}) + '\n\n'
+               + output_line('unknown', {'hello': 'x'}) + '\n',
+        'err': output_line('fill-1', status_code=429, error="Rate limited") + '\n',
+    }
+    results = download_batch_results(make_job('expired'), client=FakeClient(files))
+    assert results.translations == {('common.json', 'fr'): {'hello': 'Bonjour'}, ('common.json', 'de'): {}}
+    assert sorted(results.failures) == [
+        ('common.json', 'de', 'hello', "Rate limited"),
+        ('common.json', 'fr', 'bye', "No translation returned"),
+        ('errors.json', 'fr', 'oops', "Batch expired"),
+    ]
+
+
+def test_unparseable_output_is_an_error():
+    record = json.loads(output_line('fill-0'))
+    record['response']['body'] = {'choices': [{'message': {'content': 'not json'}}]}
+    assert parse_batch_response(record, 'gpt-4o') == ({}, "Failed to parse output")
+    assert parse_batch_response({'error': {'message': "Expired"}}, 'gpt-4o') == ({}, "Expired")
+
+
+def test_results_for_locales_the_catalog_lacks_are_left_alone():
+    assert Catalog('/nonexistent').fill_values({('common.json', 'fr'): {'hello': 'Bonjour'}}) == []
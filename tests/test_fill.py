@@ -0,0 +1,100 @@
+import pytest
+
+from catalog.fill import FillBatch, run_fill_batches
+from clients.oai import RequestFailed
+
+
+class FakeTranslator:
+    # Answers from `answers` (key -> translation) and records the keys of every request; `errors`
+    # are raised by the first requests, one each
+    def __init__(self, answers, errors=()):
+        self.answers = answers
+        self.errors = list(errors)
+        self.requests = []
+
+    def __call__(self, phrases, source_locale, target_locale, context=None, on_translation=None):
+        self.requests.append(sorted(phrases))
+        if self.errors:
+            raise self.errors.pop(0)
+        return {key: self.answers[key] for key in phrases if key in self.answers}
+
+
+def batch(keys, locale='fr', file_name='common.json'):
+    return FillBatch(file_name, 'en', locale, {key: key.upper() for key in keys})
+
+
+def test_keys_left_out_are_retried_alone():
+    translate = FakeTranslator({'a': 'A', 'b': 'B'})
+    result = run_fill_batches([batch(['a', 'b', 'c'])], translate, retries=2)
+    assert result.translations == {('common.json', 'fr'): {'a': 'A', 'b': 'B'}}
+    assert translate.requests == [['a', 'b', 'c'], ['c'], ['c']]
+    assert [(key, str(error)) for _, _, key, error in result.failures] == [('c', "No translation returned")]
+    assert result.error is None
+
+
+def test_empty_value_is_retried_and_can_succeed():
+    responses = [{'a': ''}, {'a': 'A'}]
+    result = run_fill_batches([batch(['a'])], lambda phrases, *args, **kwargs: responses.pop(0))
+    assert result.translations == {('common.json', 'fr'): {'a': 'A'}}
+    assert result.failures == []
+
+
+def test_failed_batch_is_not_retried_key_by_key():
+    translate = FakeTranslator({'a': 'A', 'b': 'B'}, errors=[RequestFailed("Service unavailable", 503)])
+    result = run_fill_batches([batch(['a', 'b']), batch(['a', 'b'], locale='de')], translate)
+    assert translate.requests == [['a', 'b'], ['a', 'b']]
+    assert [(locale, key) for _, locale, key, _ in result.failures] == [('fr', 'a'), ('fr', 'b')]
+    assert result.translations[('common.json', 'de')] == {'a': 'A', 'b': 'B'}
+    assert result.error is None
+
+
+@pytest.mark.parametrize('status', [400, 401, 403])
+def test_request_that_can_never_succeed_stops_the_fill(status):
+    error = RequestFailed("Refused", status)
+    translate = FakeTranslator({}, errors=[error])
+    result = run_fill_batches([batch(['a', 'b']), batch(['a'], locale='de')], translate)
+    assert translate.requests == [['a', 'b']]
+    assert result.error is error
+    assert len(result.failures) == 2
+
+
+def test_fatal_error_on_a_retry_stops_the_fill():
+    error = RequestFailed("Unauthorized", 401)
+    translate = FakeTranslator({'a': 'A'})
+
+    def answer(phrases, *args, **kwargs):
+        if len(translate.requests) == 1:
+            translate.errors.append(error)
+        return translate(phrases, *args, **kwargs)
+
+    result = run_fill_batches([batch(['a', 'b']), batch(['c'], locale='de')], answer, retries=3)
+    assert translate.requests == [['a', 'b'], ['b']]
+    assert result.error is error
+    assert result.translations[('common.json', 'fr')] == {'a': 'A'}
+
+
+def test_should_stop_ends_between_requests():
+    translate = FakeTranslator({'a': 'A'})
+    result = run_fill_batches([batch(['a']), batch(['a'], locale='de')], translate,
+                              should_stop=lambda: len(translate.requests) >= 1)
+    assert translate.requests == [['a']]
+    assert result.failures == []
+
+
+def test_unauthorized_against_the_mock_endpoint_makes_one_request():
+    pytest.importorskip('openai')
+    from benchmarks.mock_openai import MockChatCompletions
+    from clients.oai import configure_client, generate_localization_batch
+
+    server = MockChatCompletions(latency=0, chunk_delay=0).start()
+    try:
+        configure_client(api_key='mock', base_url=server.base_url, max_retries=2)
+        server.fail_next(401, count=100)
+        batches = [batch([f'key{i}' for i in range(20)]), batch(['a'], locale='de')]
+        result = run_fill_batches(batches, generate_localization_batch)
+        assert result.requests == 1
+        assert isinstance(result.error, RequestFailed) and result.error.status == 401
+        assert len(result.failures) == 20
+    finally:
+        server.stop()
+        configure_client()
@@ -0,0 +1,65 @@
+import json
+import random
+
+import pytest
+
+from catalog.core import Catalog
+from catalog.index import ABSENT, CompletionIndex, FileStats
+
+
+def recount(catalog, file_name, locale):
+    # What the index should say, from walking the values
+    keys = set()
+    for files in catalog.locales.values():
+        keys |= set(files.get(file_name, {}).keys())
+    values = catalog.locales[locale].get(file_name, {})
+    return FileStats(len(keys), sum(1 for key in keys if not values.get(key)))
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    for locale, data in {'en': {'a': 'A', 'b': 'B'}, 'fr': {'a': 'A', 'b': ''}, 'de': {'a': ''}}.items():
+        (tmp_path / locale).mkdir()
+        (tmp_path / locale / 'common.json').write_text(json.dumps(data), encoding='utf-8')
+    catalog = Catalog(str(tmp_path))
+    catalog.scan()
+    return catalog
+
+
+def test_counts_after_scan(catalog):
+    assert catalog.index.stats('common.json', 'fr') == FileStats(2, 1)
+    assert catalog.index.stats('common.json', 'de') == FileStats(2, 2)  # b is absent in de
+    assert catalog.index.file_totals('common.json') == FileStats(6, 3)
+    assert catalog.index.locale_stats('en') == FileStats(2, 0)
+
+
+def test_counts_follow_random_edits(catalog):
+    rng = random.Random(7)
+    catalog.add_file('errors.json')
+    keys = ['a', 'b', 'c', 'd']
+    for _ in range(300):
+        file_name = rng.choice(['common.json', 'errors.json'])
+        locale = rng.choice(['en', 'fr', 'de'])
+        key = rng.choice(keys)
+        action = rng.random()
+        if action < 0.5:
+            catalog.set_value(locale, file_name, key, rng.choice(['', 'x', 'y']))
+        elif action < 0.7:
+            catalog.remove_key(locale, file_name, key)
+        elif action < 0.85:
+            new_key = rng.choice(keys)
+            catalog.update_key(file_name, key, new_key, {'en': rng.choice(['', 'z']), 'fr': 'w'})
+        else:
+            catalog.undo()
+        for name in ('common.json', 'errors.json'):
+            for check_locale in ('en', 'fr', 'de'):
+                assert catalog.index.stats(name, check_locale) == recount(catalog, name, check_locale)
+
+
+def test_reindexing_a_file_replaces_its_counts():
+    index = CompletionIndex(['en', 'fr'])
+    index.update('common.json', 'en', 'a', ABSENT, 'A')
+    index.index_file('common.json', {'en': {'common.json': {'a': 'A', 'b': 'B'}}, 'fr': {'common.json': {'a': ''}}})
+    assert index.file_totals('common.json') == FileStats(4, 2)
+    index.drop_file('common.json')
+    assert index.locale_stats('en') == FileStats(0, 0)
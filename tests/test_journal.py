@@ -0,0 +1,136 @@
+import json
+
+import pytest
+
+from catalog.core import Catalog
+from catalog.journal import Change, Edit, read_write_ahead_log
+
+
+def write_locales(root, files):
+    for locale, data in files.items():
+        (root / locale).mkdir(parents=True)
+        (root / locale / 'common.json').write_text(json.dumps(data), encoding='utf-8')
+
+
+def snapshot(catalog):
+    for file_name in catalog.all_files:
+        catalog.ensure_file_loaded(file_name)
+    return {locale: {file_name: dict(catalog.locales[locale][file_name].items())
+                     for file_name in sorted(catalog.all_files)}
+            for locale in sorted(catalog.locales)}
+
+
+@pytest.fixture
+def locales_path(tmp_path):
+    root = tmp_path / 'locales'
+    write_locales(root, {'en': {'hello': 'Hello', 'bye': 'Bye'}, 'fr': {'hello': '', 'bye': ''}})
+    return str(root)
+
+
+@pytest.fixture(params=[False, True], ids=['eager', 'lazy'])
+def catalog(request, locales_path, tmp_path):
+    catalog = Catalog(locales_path)
+    catalog.scan(lazy=request.param)
+    catalog.open_journal(str(tmp_path / 'journal.jsonl'))
+    yield catalog
+    catalog.journal.close()
+
+
+def make_edits(catalog):
+    catalog.set_value('fr', 'common.json', 'hello', 'Bonjour')
+    catalog.update_key('common.json', 'bye', 'goodbye', {'en': 'Goodbye', 'fr': 'Au revoir'})
+    catalog.add_file('errors.json')
+    catalog.add_key('errors.json', 'oops')
+    catalog.fill_values({('errors.json', 'fr'): {'oops': 'Oups'}})
+
+
+def test_undo_restores_each_edit_and_redo_reapplies_it(catalog):
+    original = snapshot(catalog)
+    make_edits(catalog)
+    edited = snapshot(catalog)
+    labels = [edit.label for edit in catalog.journal.undo_stack]
+    assert labels == ["Edit value", "Rename key", "Add file", "Add key", "Fill translations"]
+
+    while catalog.journal.can_undo:
+        assert catalog.undo().skipped == []
+    assert snapshot(catalog) == original
+    assert 'errors.json' not in catalog.all_files
+
+    while catalog.journal.can_redo:
+        catalog.redo()
+    assert snapshot(catalog) == edited
+
+
+def test_grouped_edit_is_one_undo_step(catalog):
+    catalog.update_key('common.json', 'bye', 'goodbye', {'en': 'Goodbye', 'fr': 'Au revoir'})
+    assert len(catalog.journal.undo_stack) == 1
+    catalog.undo()
+    assert dict(catalog.locales['fr']['common.json'].items()) == {'hello': '', 'bye': ''}
+
+
+def test_undo_skips_a_value_changed_since(catalog):
+    catalog.set_value('fr', 'common.json', 'hello', 'Bonjour')
+    catalog.replace_file('fr', 'common.json', {'hello': 'Salut', 'bye': ''})  # e.g. reloaded from disk
+    result = catalog.undo()
+    assert result.skipped == [Change('fr', 'common.json', 'hello', 'Bonjour', '')]
+    assert catalog.locales['fr']['common.json']['hello'] == 'Salut'
+
+
+def test_write_ahead_log_replays_unsaved_edits(catalog, locales_path, tmp_path):
+    make_edits(catalog)
+    catalog.undo()  # logged as the inverse edit
+    expected = snapshot(catalog)
+
+    recovered = Catalog(locales_path)
+    recovered.scan()
+    result = recovered.replay(read_write_ahead_log(str(tmp_path / 'journal.jsonl'), locales_path))
+    assert result.skipped == []
+    assert snapshot(recovered) == expected
+    assert recovered.dirty_files == catalog.dirty_files
+
+
+def test_log_of_another_folder_is_ignored(catalog, tmp_path):
+    catalog.set_value('fr', 'common.json', 'hello', 'Bonjour')
+    assert read_write_ahead_log(str(tmp_path / 'journal.jsonl'), str(tmp_path / 'elsewhere')) == []
+
+
+def test_line_cut_short_by_a_crash_ends_the_log(catalog, locales_path, tmp_path):
+    catalog.set_value('fr', 'common.json', 'hello', 'Bonjour')
+    catalog.set_value('fr', 'common.json', 'bye', 'Au revoir')
+    path = tmp_path / 'journal.jsonl'
+    with open(path, 'ab') as f:
+        f.write(b'{"label": "Edit value", "changes": [{"l": "fr", "f": "comm')
+    edits = read_write_ahead_log(str(path), locales_path)
+    assert edits == [Edit("Edit value", [Change('fr', 'common.json', 'hello', '', 'Bonjour')]),
+                     Edit("Edit value", [Change('fr', 'common.json', 'bye', '', 'Au revoir')])]
+
+
+def test_save_truncates_the_log_and_keeps_undo(catalog, locales_path, tmp_path):
+    catalog.set_value('fr', 'common.json', 'hello', 'Bonjour')
+    catalog.save()
+    path = str(tmp_path / 'journal.jsonl')
+    assert read_write_ahead_log(path, locales_path) == []
+    catalog.undo()
+    assert read_write_ahead_log(path, locales_path) == [
+        Edit("Edit value", [Change('fr', 'common.json', 'hello', 'Bonjour', '')])]
+
+
+def test_undoing_a_saved_file_does_not_remove_it(catalog):
+    catalog.add_file('errors.json')
+    catalog.save()
+    assert not any(catalog.is_file_missing(locale, 'errors.json') for locale in catalog.locales)
+    result = catalog.undo()
+    assert len(result.skipped) == 1
+    assert 'errors.json' in catalog.all_files
+
+
+def test_collected_changes_become_one_edit(catalog):
+    changes = []
+    with catalog.journal.collect(changes):
+        catalog.set_value('fr', 'common.json', 'hello', 'Bonjour')
+    with catalog.journal.collect(changes):
+        catalog.fill_values({('common.json', 'fr'): {'bye': 'Au revoir'}})
+    assert not catalog.journal.can_undo
+    catalog.journal.commit(Edit("Fill translations", changes))
+    catalog.undo()
+    assert dict(catalog.locales['fr']['common.json'].items()) == {'hello': '', 'bye': ''}
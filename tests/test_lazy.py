@@ -0,0 +1,65 @@
+import json
+import os
+
+import pytest
+
+from catalog.core import Catalog
+
+
+@pytest.fixture
+def locales_path(tmp_path):
+    # Three files of the same size in each of two locales
+    for locale in ('en', 'fr'):
+        (tmp_path / locale).mkdir()
+        for name in ('a', 'b', 'c'):
+            (tmp_path / locale / f'{name}.json').write_text(json.dumps({'key': name * 10}), encoding='utf-8')
+    return str(tmp_path)
+
+
+def lazy_catalog(locales_path, files_kept):
+    file_size = 2 * os.path.getsize(os.path.join(locales_path, 'en', 'a.json'))
+    catalog = Catalog(locales_path)
+    catalog.scan(lazy=True, memory_budget=files_kept * file_size)
+    return catalog
+
+
+def loaded(catalog):
+    return sorted(catalog.lazy_loader.loaded)
+
+
+def test_files_load_on_first_access_only(locales_path):
+    catalog = lazy_catalog(locales_path, 3)
+    assert loaded(catalog) == []
+    assert catalog.ensure_file_loaded('a.json')
+    assert not catalog.ensure_file_loaded('a.json')
+    assert catalog.locales['fr']['a.json']['key'] == 'a' * 10
+    assert loaded(catalog) == ['a.json']
+
+
+def test_least_recently_used_file_is_evicted(locales_path):
+    catalog = lazy_catalog(locales_path, 2)
+    catalog.ensure_file_loaded('a.json')
+    catalog.ensure_file_loaded('b.json')
+    catalog.ensure_file_loaded('a.json')  # a is now used more recently than b
+    catalog.ensure_file_loaded('c.json')
+    assert loaded(catalog) == ['a.json', 'c.json']
+    assert 'b.json' not in catalog.locales['en']
+    assert catalog.lazy_loader.evictions == 1
+
+
+def test_files_with_unsaved_edits_are_not_evicted(locales_path):
+    catalog = lazy_catalog(locales_path, 1)
+    catalog.set_value('fr', 'a.json', 'key', 'edited')
+    catalog.ensure_file_loaded('b.json')
+    catalog.ensure_file_loaded('c.json')
+    assert loaded(catalog) == ['a.json', 'c.json']
+    assert catalog.locales['fr']['a.json']['key'] == 'edited'
+
+
+def test_evicted_file_is_read_again(locales_path):
+    catalog = lazy_catalog(locales_path, 1)
+    catalog.ensure_file_loaded('a.json')
+    catalog.ensure_file_loaded('b.json')
+    assert loaded(catalog) == ['b.json']
+    assert catalog.ensure_file_loaded('a.json')
+    assert catalog.locales['en']['a.json']['key'] == 'a' * 10
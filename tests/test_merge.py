@@ -0,0 +1,45 @@
+from catalog.index import ABSENT
+from catalog.merge import merge_locale_file
+
+
+def test_change_on_one_side_takes_that_side():
+    base = {'a': '1', 'b': '2'}
+    result = merge_locale_file(base, {'a': 'mine', 'b': '2'}, {'a': '1', 'b': 'theirs'})
+    assert result.values == {'a': 'mine', 'b': 'theirs'}
+    assert result.conflicts == []
+
+
+def test_same_change_on_both_sides_is_resolved():
+    result = merge_locale_file({'a': '1'}, {'a': 'new'}, {'a': 'new'})
+    assert result.values == {'a': 'new'}
+    assert result.conflicts == []
+    assert result.resolved == ['a']
+
+
+def test_different_changes_keep_mine_and_conflict():
+    result = merge_locale_file({'a': '1'}, {'a': 'mine'}, {'a': 'theirs'})
+    assert result.values == {'a': 'mine'}
+    assert result.conflicts == [('a', 'mine', 'theirs')]
+
+
+def test_removed_on_disk_and_unchanged_in_memory_is_removed():
+    result = merge_locale_file({'a': '1', 'b': '2'}, {'a': '1', 'b': '2'}, {'b': '2'})
+    assert result.values == {'b': '2'}
+    assert result.conflicts == []
+
+
+def test_removed_in_memory_and_changed_on_disk_conflicts():
+    result = merge_locale_file({'a': '1'}, {}, {'a': 'theirs'})
+    assert result.values == {}
+    assert result.conflicts == [('a', ABSENT, 'theirs')]
+
+
+def test_added_on_both_sides_with_different_values_conflicts():
+    result = merge_locale_file({}, {'a': 'mine'}, {'a': 'theirs'})
+    assert result.values == {'a': 'mine'}
+    assert result.conflicts == [('a', 'mine', 'theirs')]
+
+
+def test_disk_order_first_then_keys_added_in_memory():
+    result = merge_locale_file({'a': '1', 'b': '2'}, {'b': '2', 'a': '1', 'new': 'x'}, {'c': '3', 'b': '2', 'a': '1'})
+    assert list(result.values) == ['c', 'b', 'a', 'new']
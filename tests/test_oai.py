@@ -0,0 +1,19 @@
+import clients.oai as oai
+
+
+class FakeClient:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_configure_client_closes_the_replaced_client(monkeypatch):
+    old_client = FakeClient()
+    monkeypatch.setattr(oai, 'shared_client', old_client)
+    monkeypatch.setattr(oai, 'client_settings', {})
+    oai.configure_client(timeout=5)
+    assert old_client.closed
+    assert oai.shared_client is None
+    assert oai.client_settings == {'timeout': 5}
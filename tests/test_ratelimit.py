@@ -0,0 +1,65 @@
+import email.utils
+import random
+import threading
+import time
+
+from clients.ratelimit import RateLimiter, backoff_delay, retry_after_seconds
+
+
+def test_retry_after_ms_wins_over_seconds():
+    assert retry_after_seconds({'retry-after-ms': '1500', 'retry-after': '9'}) == 1.5
+
+
+def test_retry_after_seconds_and_http_date():
+    assert retry_after_seconds({'retry-after': '3'}) == 3.0
+    when = email.utils.formatdate(time.time() + 10, usegmt=True)
+    assert 8 <= retry_after_seconds({'retry-after': when}) <= 10
+
+
+def test_retry_after_missing_or_unreadable():
+    assert retry_after_seconds(None) is None
+    assert retry_after_seconds({}) is None
+    assert retry_after_seconds({'retry-after': 'soon'}) is None
+    assert retry_after_seconds({'retry-after': '-5'}) == 0.0
+
+
+def test_backoff_grows_and_is_capped():
+    rng = random.Random(1)
+    for attempt in range(10):
+        delay = backoff_delay(attempt, base=0.5, maximum=4, rng=rng)
+        assert 0 <= delay <= min(4, 0.5 * 2 ** attempt)
+
+
+def test_backoff_never_shorter_than_retry_after():
+    rng = random.Random(1)
+    assert all(backoff_delay(0, retry_after=7, rng=rng) >= 7 for _ in range(20))
+
+
+def test_requests_per_minute_spaces_out_requests():
+    # 600 a minute is one every 0.1 s once the initial burst of 600 is used up
+    limiter = RateLimiter(requests_per_minute=600)
+    limiter.requests.level = 0
+    started = time.monotonic()
+    for _ in range(3):
+        limiter.acquire()
+    assert 0.25 <= time.monotonic() - started < 1
+
+
+def test_settle_returns_overestimated_tokens():
+    limiter = RateLimiter(tokens_per_minute=6000)
+    limiter.acquire(5000)
+    limiter.settle(5000, 100)
+    limiter.tokens.refill(time.monotonic())
+    assert limiter.tokens.level > 5000
+
+
+def test_pause_holds_back_every_caller():
+    limiter = RateLimiter()
+    limiter.pause(0.2)
+    waited = []
+    threads = [threading.Thread(target=lambda: waited.append(limiter.acquire())) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(0.15 <= seconds < 1 for seconds in waited)
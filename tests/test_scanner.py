@@ -0,0 +1,73 @@
+import json
+import os
+import pickle
+
+from catalog.scanner import CACHE_VERSION, ScanCache, scan_locales_folder
+
+
+def write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data), encoding='utf-8')
+
+
+def scan(root, cache_path):
+    cache = ScanCache.load(str(cache_path))
+    result = scan_locales_folder(str(root), cache)
+    cache.save()
+    return result, cache
+
+
+def test_unchanged_files_come_from_the_cache(tmp_path):
+    root = tmp_path / 'locales'
+    write(root / 'en' / 'common.json', {'hello': 'Hello'})
+    write(root / 'fr' / 'common.json', {'hello': 'Bonjour'})
+    cache_path = tmp_path / 'cache.pickle'
+
+    _, cache = scan(root, cache_path)
+    assert (cache.hits, cache.misses) == (0, 2)
+    result, cache = scan(root, cache_path)
+    assert (cache.hits, cache.misses) == (2, 0)
+    assert dict(result.locales['fr']['common.json'].items()) == {'hello': 'Bonjour'}
+
+
+def test_changed_file_is_parsed_again(tmp_path):
+    root = tmp_path / 'locales'
+    path = root / 'fr' / 'common.json'
+    write(path, {'hello': 'Bonjour'})
+    cache_path = tmp_path / 'cache.pickle'
+    scan(root, cache_path)
+
+    write(path, {'hello': 'Salut', 'bye': 'Au revoir'})
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    result, cache = scan(root, cache_path)
+    assert cache.misses == 1
+    assert dict(result.locales['fr']['common.json'].items()) == {'hello': 'Salut', 'bye': 'Au revoir'}
+
+
+def test_deleted_files_are_pruned_and_other_roots_kept(tmp_path):
+    cache_path = tmp_path / 'cache.pickle'
+    for name in ('one', 'two'):
+        write(tmp_path / name / 'fr' / 'common.json', {'hello': name})
+        scan(tmp_path / name, cache_path)
+    os.remove(tmp_path / 'one' / 'fr' / 'common.json')
+
+    _, cache = scan(tmp_path / 'one', cache_path)
+    assert sorted(os.path.relpath(path, tmp_path) for path in cache.entries) == [
+        os.path.join('two', 'fr', 'common.json')]
+
+
+def test_cache_of_another_version_or_corrupt_is_cold(tmp_path):
+    cache_path = tmp_path / 'cache.pickle'
+    cache_path.write_bytes(pickle.dumps({'version': CACHE_VERSION - 1, 'entries': {'x': (0, 0, {})}}))
+    assert ScanCache.load(str(cache_path)).entries == {}
+    cache_path.write_bytes(b'not a pickle')
+    assert ScanCache.load(str(cache_path)).entries == {}
+
+
+def test_files_missing_from_a_locale_are_back_filled(tmp_path):
+    write(tmp_path / 'en' / 'common.json', {'hello': 'Hello'})
+    (tmp_path / 'fr').mkdir()
+    result = scan_locales_folder(str(tmp_path))
+    assert result.file_locales == {'common.json': {'en'}}
+    assert dict(result.locales['fr']['common.json'].items()) == {}
@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from catalog.core import Catalog
+from catalog.search import SearchIndex
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    files = {
+        'en': {'save': 'Save', 'save_as': 'Save as...', 'autosave': 'Saved automatically', 'open': 'Open'},
+        'fr': {'save': 'Enregistrer', 'save_as': 'Enregistrer sous...', 'autosave': '', 'open': 'Ouvrir'},
+    }
+    for locale, data in files.items():
+        (tmp_path / locale).mkdir()
+        (tmp_path / locale / 'common.json').write_text(json.dumps(data), encoding='utf-8')
+    catalog = Catalog(str(tmp_path))
+    catalog.scan()
+    catalog.prepare_search_index()
+    catalog.attach_search_index(catalog.build_search_index(sorted(catalog.all_files)))
+    return catalog
+
+
+def found(catalog, query):
+    return [(hit.key, hit.locale) for hit in catalog.search.search(query)]
+
+
+def test_whole_field_before_prefix_before_word_start_before_anywhere(catalog):
+    assert found(catalog, 'save') == [('save', None), ('save_as', None), ('autosave', None)]
+    assert found(catalog, 'as...') == [('save_as', 'en')]
+    assert found(catalog, 'ouvrir') == [('open', 'fr')]
+
+
+def test_hits_are_substrings_and_case_insensitive(catalog):
+    assert found(catalog, 'ENREG') == [('save', 'fr'), ('save_as', 'fr')]
+    assert found(catalog, 'sous.') == [('save_as', 'fr')]
+    assert found(catalog, 'evas') == []  # shares trigrams with "save" but is not a substring
+    assert found(catalog, 'sa') == []  # shorter than a trigram
+
+
+def test_edits_renames_and_removals_are_searchable_at_once(catalog):
+    catalog.set_value('fr', 'common.json', 'autosave', 'Enregistré automatiquement')
+    assert ('autosave', 'fr') in found(catalog, 'automatiquement')
+
+    catalog.update_key('common.json', 'open', 'open_file', {'en': 'Open file', 'fr': 'Ouvrir un fichier'})
+    assert found(catalog, 'fichier') == [('open_file', 'fr')]
+    assert found(catalog, 'ouvrir') == [('open_file', 'fr')]
+    assert found(catalog, 'open') == [('open_file', None)]
+
+    catalog.undo()
+    assert found(catalog, 'fichier') == []
+    assert found(catalog, 'open') == [('open', None)]
+
+    for locale in catalog.locales:
+        catalog.remove_key(locale, 'common.json', 'open')
+    assert found(catalog, 'ouvrir') == []
+
+
+def test_edits_made_while_building_are_applied_when_attached(catalog):
+    file_names = catalog.prepare_search_index()
+    search = catalog.build_search_index(file_names)
+    catalog.set_value('en', 'common.json', 'open', 'Open folder')
+    catalog.attach_search_index(search)
+    assert found(catalog, 'folder') == [('open', 'en')]
+
+
+def test_updating_an_entry_replaces_its_text():
+    locales = {'en': {'a.json': {'k': 'Hello world'}}, 'fr': {'a.json': {'k': 'Bonjour'}}}
+    index = SearchIndex.build(locales, ['a.json'], lambda file_name: ['k'])
+    index.update('a.json', 'k', ['Hello there', 'Salut'])
+    assert index.search('world') == []
+    assert [hit.locale for hit in index.search('salut')] == ['fr']
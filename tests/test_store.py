@@ -0,0 +1,62 @@
+from catalog.core import Catalog
+from catalog.store import CompactStore
+from catalog.writer import serialize_locale_file
+
+
+def test_each_locale_keeps_its_own_key_order():
+    store = CompactStore(['en', 'fr'])
+    store['en']['common.json'] = {'a': 'A', 'b': 'B', 'c': 'C'}
+    store['fr']['common.json'] = {'c': 'C', 'a': 'A'}
+    assert list(store['en']['common.json']) == ['a', 'b', 'c']
+    assert list(store['fr']['common.json']) == ['c', 'a']
+    assert store.tables['common.json'].keys == ['a', 'b', 'c']  # stored once for both locales
+
+
+def test_added_keys_go_last_and_removed_keys_disappear():
+    store = CompactStore(['en', 'fr'])
+    store['en']['common.json'] = {'a': 'A', 'b': 'B'}
+    store['fr']['common.json'] = {'b': 'B'}
+    fr = store['fr']['common.json']
+    fr['a'] = 'A'  # earlier in the key table than b, but added after it
+    fr['z'] = 'Z'
+    del fr['b']
+    assert fr.items() == [('a', 'A'), ('z', 'Z')]
+    assert len(fr) == 2 and 'b' not in fr and fr.get('b', 'none') == 'none'
+    assert store.file_keys('common.json') == ['a', 'b', 'z']
+
+
+def test_values_that_are_not_strings_are_kept():
+    store = CompactStore(['en'])
+    data = {'n': 1, 'flag': False, 'nested': {'x': 'y'}, 'list': ['a'], 'none': None, 'empty': ''}
+    store['en']['common.json'] = data
+    assert dict(store['en']['common.json'].items()) == data
+
+
+def test_removing_the_last_locale_of_a_file_drops_its_key_table():
+    store = CompactStore(['en', 'fr'])
+    store['en']['common.json'] = {'a': 'A'}
+    store['fr']['common.json'] = {'a': 'A'}
+    del store['en']['common.json']
+    assert 'common.json' in store.tables
+    del store['fr']['common.json']
+    assert 'common.json' not in store.tables
+    assert list(store['fr']) == []
+
+
+def test_saving_an_edited_catalog_rewrites_untouched_files_byte_for_byte(tmp_path):
+    files = {
+        'en': {'z': 'Zed', 'a': 'Ä', 'nested': {'k': 'v'}, 'n': 3},
+        'fr': {'a': 'À', 'z': '', 'extra': 'Seulement ici'},
+    }
+    for locale, data in files.items():
+        (tmp_path / locale).mkdir()
+        (tmp_path / locale / 'common.json').write_bytes(serialize_locale_file(data))
+    catalog = Catalog(str(tmp_path))
+    catalog.scan()
+
+    for locale, data in files.items():
+        assert serialize_locale_file(catalog.locales[locale]['common.json']) == serialize_locale_file(data)
+    catalog.set_value('fr', 'common.json', 'z', 'Zède')
+    catalog.save()
+    assert (tmp_path / 'fr' / 'common.json').read_bytes() == serialize_locale_file(dict(files['fr'], z='Zède'))
+    assert (tmp_path / 'en' / 'common.json').read_bytes() == serialize_locale_file(files['en'])
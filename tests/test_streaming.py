@@ -0,0 +1,32 @@
+import json
+
+from clients.streaming import IncrementalObjectParser
+
+
+def feed_all(parser, chunks):
+    completed = []
+    for chunk in chunks:
+        completed.extend(parser.feed(chunk))
+    return completed
+
+
+def test_values_complete_at_their_closing_quote():
+    parser = IncrementalObjectParser()
+    assert parser.feed('{"fr": "Bonj') == []
+    assert parser.feed('our", "de"') == [('fr', 'Bonjour')]
+    assert parser.feed(': "Hallo"}') == [('de', 'Hallo')]
+
+
+def test_escapes_split_across_chunks():
+    text = json.dumps({'a': 'say "hi"\\n', 'b': 'café \\\\ end', 'c\\"': 'x'}, ensure_ascii=True)
+    expected = list(json.loads(text).items())
+    # Every split point, so each escape sequence is cut in every possible place
+    for split in range(1, len(text)):
+        assert feed_all(IncrementalObjectParser(), [text[:split], text[split:]]) == expected
+    assert feed_all(IncrementalObjectParser(), list(text)) == expected
+
+
+def test_nested_values_stop_incremental_output():
+    parser = IncrementalObjectParser()
+    assert feed_all(parser, ['{"a": "1", "b": {"c": "2"}, "d": "3"}']) == [('a', '1')]
+    assert not parser.supported
@@ -0,0 +1,69 @@
+from catalog.scanner import ScanCache
+from catalog.usage import (Reference, SourceUsage, build_usage_report, extract_references, resolve_reference,
+                           scan_source_usage)
+
+COMPONENT = '''
+import { useTranslation } from 'next-i18next';
+
+export function Chat() {
+  const { t } = useTranslation(['chat', 'common']);
+  return <div title={t('Send')}>{t("Say \\"hi\\"")} {i18n.t(`Stop`)} {format(value)}</div>;
+}
+'''
+
+
+def test_keys_quotes_and_namespace_from_use_translation():
+    references, dynamic = extract_references(COMPONENT)
+    assert references == [Reference('chat', 'Send', 6), Reference('chat', 'Say "hi"', 6),
+                          Reference('chat', 'Stop', 6)]
+    assert dynamic == 0
+
+
+def test_default_namespace_and_no_namespace():
+    assert extract_references("useTranslation([]); t('a')")[0] == [Reference('common', 'a', 1)]
+    assert extract_references("t('a')")[0] == [Reference(None, 'a', 1)]
+
+
+def test_computed_keys_are_counted_not_referenced():
+    references, dynamic = extract_references("t(name); t( prefix + 'x'); t(`${kind}.title`); t(); t('ok')")
+    assert [reference.key for reference in references] == ['ok']
+    assert dynamic == 3
+
+
+def test_colon_is_a_namespace_only_for_a_known_file():
+    files = {'common.json', 'chat.json'}
+    assert resolve_reference(Reference(None, 'chat:Send', 1), files) == Reference('chat', 'Send', 1)
+    assert resolve_reference(Reference(None, 'Error: {{msg}}', 1), files) == Reference(None, 'Error: {{msg}}', 1)
+
+
+def test_report_lists_unused_and_undefined_keys():
+    usage = SourceUsage({
+        'a.tsx': [Reference('chat', 'Send', 1), Reference('chat', 'Missing', 2),
+                  Reference(None, 'common:Hello', 3), Reference(None, 'Error: {{msg}}', 4)],
+    }, dynamic=2, files_parsed=1)
+    catalog_keys = {'chat.json': {'Send', 'Old'}, 'common.json': {'Hello', 'Error: {{msg}}', 'Unused'}}
+    report = build_usage_report(catalog_keys, usage, set(catalog_keys))
+    assert report.unused == {'chat.json': {'Old'}, 'common.json': {'Unused'}}
+    assert [(path, reference.key) for path, reference in report.undefined] == [('a.tsx', 'Missing')]
+    assert (report.references, report.dynamic) == (4, 2)
+
+
+def test_references_to_files_not_loaded_are_not_judged_but_unknown_files_are_undefined():
+    usage = SourceUsage({'a.tsx': [Reference('errors', 'Oops', 1), Reference('nowhere', 'x', 2)]}, 0, 1)
+    report = build_usage_report({'common.json': set()}, usage, {'common.json', 'errors.json'})
+    assert [reference.namespace for _, reference in report.undefined] == ['nowhere']
+
+
+def test_unchanged_source_files_come_from_the_cache(tmp_path):
+    source = tmp_path / 'src'
+    (source / 'node_modules' / 'lib').mkdir(parents=True)
+    (source / 'node_modules' / 'lib' / 'index.js').write_text("t('ignored')")
+    (source / 'chat.tsx').write_text(COMPONENT)
+    (source / 'notes.md').write_text("t('not code')")
+    cache = ScanCache()
+
+    usage = scan_source_usage(str(source), cache)
+    assert usage.files_parsed == 1
+    assert [reference.key for reference in usage.references[str(source / 'chat.tsx')]] == ['Send', 'Say "hi"',
+                                                                                              'Stop']
+    assert scan_source_usage(str(source), cache).files_parsed == 0
@@ -0,0 +1,77 @@
+import threading
+
+from ui.worker import BackgroundRunner
+
+
+class StubRoot:
+    # Records what the runner schedules instead of running a Tk main loop
+    def __init__(self):
+        self.scheduled = []
+        self.errors = []
+
+    def after(self, delay, callback):
+        self.scheduled.append(callback)
+
+    def report_callback_exception(self, exc_type, exc_value, traceback):
+        self.errors.append(exc_value)
+
+
+def drain(runner):
+    runner.executor.shutdown(wait=True)
+    runner.root.scheduled.clear()
+    runner.poll()
+
+
+def test_a_raising_callback_does_not_stop_later_results():
+    root = StubRoot()
+    runner = BackgroundRunner(root)
+    results = []
+
+    def fail(result):
+        raise RuntimeError("callback failed")
+
+    runner.submit(lambda task: 1, on_success=fail)
+    runner.submit(lambda task: 2, on_success=results.append)
+    drain(runner)
+
+    assert results == [2]
+    assert [str(e) for e in root.errors] == ["callback failed"]
+    assert runner.active == 0 and not runner.polling
+
+
+def test_polling_is_rescheduled_after_a_raising_callback():
+    root = StubRoot()
+    runner = BackgroundRunner(root)
+    release = threading.Event()
+
+    def fail(result):
+        raise RuntimeError("callback failed")
+
+    runner.submit(lambda task: 1, on_success=fail)
+    runner.submit(lambda task: release.wait(5))
+    while runner.messages.empty():
+        release.wait(0.01)
+    root.scheduled.clear()
+    runner.poll()
+
+    assert root.scheduled == [runner.poll]
+    release.set()
+    drain(runner)
+    assert runner.active == 0
+
+
+def test_progress_is_not_delivered_after_cancel():
+    root = StubRoot()
+    runner = BackgroundRunner(root)
+    progress, cancelled = [], []
+
+    def work(task):
+        task.report(1)
+        task.cancel()
+        task.report(2)
+
+    runner.submit(work, on_progress=progress.append, on_cancel=lambda: cancelled.append(True))
+    drain(runner)
+
+    assert progress == []
+    assert cancelled == [True]
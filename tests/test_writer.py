@@ -0,0 +1,72 @@
+import json
+import os
+import stat
+
+import pytest
+
+from catalog.core import Catalog
+from catalog.writer import UMASK, write_bytes_atomic, write_dirty_files, write_json_atomic
+
+
+def mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_layout_and_no_temp_files_left(tmp_path):
+    path = tmp_path / 'fr' / 'common.json'
+    write_json_atomic(str(path), {'hello': 'Bonjour', 'quote': '«»'})
+    assert path.read_text(encoding='utf-8') == '{\n  "hello": "Bonjour",\n  "quote": "«»"\n}'
+    assert os.listdir(path.parent) == ['common.json']
+
+
+def test_new_file_gets_the_usual_mode(tmp_path):
+    path = tmp_path / 'new.json'
+    write_bytes_atomic(str(path), b'{}')
+    assert mode(path) == 0o666 & ~UMASK
+
+
+def test_existing_mode_is_kept(tmp_path):
+    path = tmp_path / 'common.json'
+    path.write_bytes(b'{}')
+    os.chmod(path, 0o640)
+    write_bytes_atomic(str(path), b'{"a": 1}')
+    assert mode(path) == 0o640
+    assert path.read_bytes() == b'{"a": 1}'
+
+
+def test_failed_write_leaves_the_target_and_no_temp_file(tmp_path, monkeypatch):
+    path = tmp_path / 'common.json'
+    path.write_bytes(b'{"a": 1}')
+
+    def fail(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, 'replace', fail)
+    with pytest.raises(OSError):
+        write_bytes_atomic(str(path), b'{"a": 2}')
+    assert path.read_bytes() == b'{"a": 1}'
+    assert os.listdir(tmp_path) == ['common.json']
+
+
+def test_write_dirty_files_reports_failures_per_file(tmp_path):
+    (tmp_path / 'de').write_text('not a directory')
+    locales = {'fr': {'common.json': {'a': 'A'}}, 'de': {'common.json': {'a': 'A'}}}
+    written, size, failures = write_dirty_files(str(tmp_path), locales, [('fr', 'common.json'),
+                                                                         ('de', 'common.json')])
+    assert written == 1 and size > 0
+    assert [target for target, _ in failures] == [('de', 'common.json')]
+
+
+def test_save_writes_only_dirty_files(tmp_path):
+    for locale in ('en', 'fr'):
+        (tmp_path / locale).mkdir()
+        for name in ('a.json', 'b.json'):
+            (tmp_path / locale / name).write_text(json.dumps({'key': ''}), encoding='utf-8')
+    catalog = Catalog(str(tmp_path))
+    catalog.scan()
+    catalog.set_value('fr', 'a.json', 'key', 'Clé')
+    result = catalog.save()
+    assert result.files_written == 1 and result.failures == []
+    assert json.loads((tmp_path / 'fr' / 'a.json').read_text(encoding='utf-8')) == {'key': 'Clé'}
+    assert (tmp_path / 'en' / 'a.json').read_text(encoding='utf-8') == json.dumps({'key': ''})
+    assert not catalog.unsaved_changes
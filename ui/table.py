@@ -0,0 +1,217 @@
+import tkinter as tk
+from tkinter import ttk
+from typing import Dict, List, Optional, Sequence
+
+DEFAULT_ROW_HEIGHT = 20
+
+
+class VirtualTable(ttk.Frame):
+    # Treeview that only materializes the rows currently in view. The row items form a pool
+    # that is re-filled from `rows` as the view scrolls, so Tcl only ever holds one page of cells.
+    def __init__(self, master, **kwargs):
+        super().__init__(master, **kwargs)
+        self.tree = ttk.Treeview(self, columns=[], show='headings', selectmode='browse')
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.columns: List[str] = []
+        self.rows: List[List[str]] = []
+        self.row_tags: List[Sequence[str]] = []
+        self.empty_cells: List[int] = []  # per row, bit n set when column n is empty
+        self.items: List[str] = []  # pooled item ids, in display order
+        self.item_offsets: Dict[str, int] = {}  # item id -> position in the pool
+        self.hover: Optional[int] = None  # row currently carrying the hover highlight
+        self.first = 0  # index of the row shown in the first pooled item
+        self.selected: Optional[int] = None
+        self.row_height = 0
+        self.header_height = 0
+
+        self.bind('<Configure>', lambda event: self.scroll_rows(0))
+        self.tree.bind('<MouseWheel>', self.on_mouse_wheel)
+        self.tree.bind('<Button-4>', lambda event: self.scroll_rows(-3))
+        self.tree.bind('<Button-5>', lambda event: self.scroll_rows(3))
+        self.tree.bind('<Prior>', lambda event: self.move_selection(-self.page_size()))
+        self.tree.bind('<Next>', lambda event: self.move_selection(self.page_size()))
+        self.tree.bind('<Leave>', lambda event: self.set_hover(None))
+
+    def set_columns(self, columns: Sequence[str], widths: Sequence[int]):
+        columns = list(columns)
+        if columns == self.columns:
+            return
+        # Items carry values per column, so the pool is rebuilt when the columns change
+        self.tree.delete(*self.items)
+        self.items = []
+        self.item_offsets = {}
+        self.tree['columns'] = columns
+        for column, width in zip(columns, widths):
+            self.tree.column(column, width=width, anchor='w')
+            self.tree.heading(column, text=column)
+        self.columns = columns
+
+    def set_rows(self, rows: List[List[str]], row_tags: List[Sequence[str]], empty_cells: List[int]):
+        self.rows = rows
+        self.row_tags = row_tags
+        self.empty_cells = empty_cells
+        self.first = 0
+        self.selected = None
+        self.hover = None
+        self.tree.selection_remove(*self.tree.selection())
+        self.render()
+
+    def update_row(self, index: int, values: List[str], tags: Sequence[str], empty: int):
+        self.rows[index] = values
+        self.row_tags[index] = tags
+        self.empty_cells[index] = empty
+        if self.hover == index:
+            self.hover = None
+        item = self.item_for_index(index)
+        if item is not None:
+            self.tree.item(item, values=values, tags=tags)
+
+    def insert_row(self, index: int, values: List[str], tags: Sequence[str], empty: int):
+        selected = self.selected_index()
+        self.rows.insert(index, values)
+        self.row_tags.insert(index, tags)
+        self.empty_cells.insert(index, empty)
+        self.hover = None
+        self.selected = selected + 1 if selected is not None and selected >= index else selected
+        self.render()
+
+    def delete_row(self, index: int):
+        selected = self.selected_index()
+        del self.rows[index]
+        del self.row_tags[index]
+        del self.empty_cells[index]
+        self.hover = None
+        if selected == index:
+            selected = None
+        elif selected is not None and selected > index:
+            selected -= 1
+        self.selected = selected
+        self.render()
+
+    def page_size(self) -> int:
+        self.measure()
+        visible = (self.tree.winfo_height() - self.header_height) // self.row_height
+        return max(1, visible)
+
+    def measure(self):
+        # The heading and row heights are only known once an item has been drawn
+        if self.items:
+            bbox = self.tree.bbox(self.items[0])
+            if bbox:
+                self.header_height, self.row_height = bbox[1], bbox[3]
+                return
+        if not self.row_height:
+            style_height = ttk.Style(self).lookup('Treeview', 'rowheight')
+            self.row_height = int(style_height) if style_height else DEFAULT_ROW_HEIGHT
+            self.header_height = self.row_height
+
+    def render(self):
+        page = self.page_size()
+        self.first = max(0, min(self.first, len(self.rows) - page))
+        count = min(page, len(self.rows) - self.first)
+
+        while len(self.items) < count:
+            item = self.tree.insert('', 'end')
+            self.item_offsets[item] = len(self.items)
+            self.items.append(item)
+        if len(self.items) > count:
+            self.tree.delete(*self.items[count:])
+            for item in self.items[count:]:
+                del self.item_offsets[item]
+            del self.items[count:]
+
+        for offset, item in enumerate(self.items):
+            index = self.first + offset
+            self.tree.item(item, values=self.rows[index], tags=self.tags_for(index))
+
+        item = self.item_for_index(self.selected) if self.selected is not None else None
+        if item is not None:
+            self.tree.selection_set(item)
+            self.tree.focus(item)
+        elif self.tree.selection():
+            self.tree.selection_remove(*self.tree.selection())
+
+        if self.rows:
+            self.scrollbar.set(self.first / len(self.rows), (self.first + count) / len(self.rows))
+        else:
+            self.scrollbar.set(0, 1)
+
+    def item_for_index(self, index: int) -> Optional[str]:
+        offset = index - self.first
+        if 0 <= offset < len(self.items):
+            return self.items[offset]
+        return None
+
+    def index_of_item(self, item: str) -> Optional[int]:
+        offset = self.item_offsets.get(item)
+        return None if offset is None else self.first + offset
+
+    def tags_for(self, index: int) -> Sequence[str]:
+        if index == self.hover:
+            return tuple(self.row_tags[index]) + ('highlight',)
+        return self.row_tags[index]
+
+    def is_empty(self, index: int, column: int) -> bool:
+        return bool(self.empty_cells[index] >> column & 1)
+
+    def set_hover(self, index: Optional[int]):
+        # Only the previously and newly highlighted rows are touched
+        if index == self.hover:
+            return
+        previous, self.hover = self.hover, index
+        for row in (previous, index):
+            item = self.item_for_index(row) if row is not None else None
+            if item is not None:
+                self.tree.item(item, tags=self.tags_for(row))
+
+    def selected_index(self) -> Optional[int]:
+        # A selection scrolled out of view has no item, so it is remembered by row index
+        selection = self.tree.selection()
+        if selection:
+            return self.index_of_item(selection[0])
+        if self.selected is not None and self.selected < len(self.rows):
+            return self.selected
+        return None
+
+    def see(self, index: int):
+        page = self.page_size()
+        if index < self.first:
+            self.first = index
+        elif index >= self.first + page:
+            self.first = index - page + 1
+        self.render()
+
+    def select(self, index: int):
+        if not self.rows:
+            return
+        self.selected = max(0, min(index, len(self.rows) - 1))
+        self.see(self.selected)
+
+    def move_selection(self, delta: int):
+        selected = self.selected_index()
+        self.select(0 if selected is None else selected + delta)
+        return 'break'
+
+    def scroll_rows(self, delta: int):
+        self.selected = self.selected_index()
+        self.first += delta
+        self.render()
+        return 'break'
+
+    def on_mouse_wheel(self, event):
+        # Windows reports multiples of 120, macOS reports small deltas
+        step = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        return self.scroll_rows(-step * 3)
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == 'moveto':
+            self.selected = self.selected_index()
+            self.first = int(float(amount) * len(self.rows))
+            self.render()
+        elif unit == 'pages':
+            self.scroll_rows(int(amount) * self.page_size())
+        else:
+            self.scroll_rows(int(amount))
@@ -0,0 +1,100 @@
+import queue
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+POLL_INTERVAL = 50  # ms between checks for finished work on the Tk thread
+
+
+class Task:
+    # Handle shared by the worker function and the UI. The worker reports progress and checks
+    # `cancelled`; an in-flight request cannot be interrupted, its result is discarded instead.
+    def __init__(self, runner: 'BackgroundRunner',
+                 on_success: Optional[Callable[[Any], None]] = None,
+                 on_error: Optional[Callable[[Exception], None]] = None,
+                 on_progress: Optional[Callable[[Any], None]] = None,
+                 on_cancel: Optional[Callable[[], None]] = None):
+        self.runner = runner
+        self.on_success = on_success
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.on_cancel = on_cancel
+        self.cancel_event = threading.Event()
+        self.done = False
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def report(self, progress: Any):
+        # Called from the worker thread; delivered to on_progress on the Tk thread
+        self.runner.messages.put((self, 'progress', progress))
+
+
+class BackgroundRunner:
+    # Runs work on a thread pool and hands results back to Tk callbacks. Worker threads never touch
+    # Tk: they post to a queue that the main loop drains through after().
+    def __init__(self, root, max_workers: int = 4):
+        self.root = root
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='translate')
+        self.messages: 'queue.Queue' = queue.Queue()
+        self.active = 0
+        self.polling = False
+
+    def submit(self, work: Callable[[Task], Any], **callbacks) -> Task:
+        task = Task(self, **callbacks)
+
+        def run():
+            try:
+                self.messages.put((task, 'success', work(task)))
+            except Exception as e:
+                self.messages.put((task, 'error', e))
+
+        self.active += 1
+        self.executor.submit(run)
+        if not self.polling:
+            self.polling = True
+            self.root.after(POLL_INTERVAL, self.poll)
+        return task
+
+    def poll(self):
+        # A callback that raises is reported like any Tk callback error; the queue keeps draining and
+        # polling is always rescheduled, otherwise every later result would be dropped
+        try:
+            while True:
+                try:
+                    task, kind, payload = self.messages.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    self.deliver(task, kind, payload)
+                except Exception:
+                    self.root.report_callback_exception(*sys.exc_info())
+        finally:
+            if self.active:
+                self.root.after(POLL_INTERVAL, self.poll)
+            else:
+                self.polling = False
+
+    def deliver(self, task: Task, kind: str, payload: Any):
+        if kind == 'progress':
+            if task.on_progress is not None and not task.done and not task.cancelled:
+                task.on_progress(payload)
+            return
+        task.done = True
+        self.active -= 1
+        if task.cancelled:
+            callback, args = task.on_cancel, ()
+        elif kind == 'success':
+            callback, args = task.on_success, (payload,)
+        else:
+            callback, args = task.on_error, (payload,)
+        if callback is not None:
+            callback(*args)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)